@@ -1,21 +1,81 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
-def softmax(x, axis=-1):
+# Score given to masked-out positions (exp(-1e9 - max) underflows to exactly 0)
+MASK_VALUE = -1e9
+
+# Smallest query tile of sliding_window_attention (tiny windows would mean one Python step per query)
+MIN_QUERY_TILE = 64
+
+def softmax(x, axis=-1, out=None):
     """
     Compute the softmax of vector x in a numerically stable way.
     
     Args:
         x (np.array): Input array.
         axis (int): Axis along which to compute softmax.
+        out (np.array, optional): Array of x's shape to write the result into.
+                                  It may be x itself (in-place softmax); then only the
+                                  reduced max and sum arrays are allocated.
         
     Returns:
         np.array: Softmax output of the same shape as x.
     """
-    # Subtract max for numerical stability (prevents overflow with exp)
-    e_x = np.exp(x - np.max(x, axis=axis, keepdims=True))
-    return e_x / np.sum(e_x, axis=axis, keepdims=True)
+    if out is None:
+        # Subtract max for numerical stability (prevents overflow with exp)
+        e_x = np.exp(x - np.max(x, axis=axis, keepdims=True))
+        return e_x / np.sum(e_x, axis=axis, keepdims=True)
+    
+    # Same steps, each one writing into `out`
+    np.subtract(x, np.max(x, axis=axis, keepdims=True), out=out)
+    np.exp(out, out=out)
+    out /= np.sum(out, axis=axis, keepdims=True)
+    return out
 
-def scaled_dot_product_attention(Q, K, V, mask=None):
+def attention_dtype(Q, K, V, dtype=None):
+    """
+    The floating dtype attention is computed in.
+    
+    An explicit `dtype` wins; otherwise floating inputs keep their precision
+    (float32 stays float32) and integer inputs are computed in float64.
+    """
+    if dtype is not None:
+        return np.dtype(dtype)
+    dtype = np.result_type(Q, K, V)
+    if not np.issubdtype(dtype, np.floating):
+        return np.dtype(np.float64)
+    return dtype
+
+def check_buffer(buffer, shape, dtype, name):
+    """Raises ValueError unless a caller-supplied buffer has exactly this shape and dtype."""
+    if buffer.shape != shape or buffer.dtype != dtype:
+        raise ValueError(f"{name} must have shape {shape} and dtype {dtype}, "
+                         f"got {buffer.shape} and {buffer.dtype}")
+
+def apply_causal_mask(scores, query_offset, key_start=0):
+    """
+    Mask future keys in place, without building a mask array.
+    
+    Query row i (at absolute position i + query_offset) may only see keys at positions
+    <= i + query_offset. `scores` holds the keys key_start ... key_start + scores.shape[-1] - 1,
+    which lets the blocked mode apply the mask one key block at a time.
+    Rows that see the whole block are left alone, rows that see none of it are filled with
+    one slice assignment, and only the rows crossing the diagonal are visited one by one.
+    """
+    seq_len_q, n_keys = scores.shape[-2:]
+    # Rows before `first_visible` see nothing of this block, rows from `all_visible` on see all of it
+    first_visible = min(max(key_start - query_offset, 0), seq_len_q)
+    all_visible = min(max(key_start + n_keys - 1 - query_offset, 0), seq_len_q)
+    scores[..., :first_visible, :] = MASK_VALUE
+    for row in range(first_visible, all_visible):
+        scores[..., row, row + query_offset - key_start + 1:] = MASK_VALUE
+
+def scaled_dot_product_attention(Q, K, V, mask=None, block_size=None, return_weights=True,
+                                 causal=False, dtype=None, out=None, workspace=None,
+                                 chunk_size=None, num_threads=None):
     """
     Calculate the Scaled Dot-Product Attention.
     
@@ -29,17 +89,59 @@ def scaled_dot_product_attention(Q, K, V, mask=None):
         mask (np.array, optional): Mask array. Elements with 1 (or True) are KEPT, 
                                    elements with 0 (or False) are MASKED OUT (set to -inf).
                                    Shape should be broadcastable to (batch_size, seq_len_q, seq_len_k).
+        block_size (int, optional): If given, walk over the keys in blocks of this size
+                                    with an online softmax (see blocked_attention), so the
+                                    full score matrix is never built.
+        return_weights (bool): If False, the attention weights are not returned (None instead).
+                               Together with block_size this keeps peak memory at
+                               O(seq_len_q * block_size) instead of O(seq_len_q * seq_len_k).
+        causal (bool): If True, query i only attends to keys up to position i (the queries
+                       are aligned with the last seq_len_q keys, as in incremental decoding).
+                       No mask array is built. Can be combined with `mask`.
+        dtype (np.dtype, optional): Computation dtype, e.g. np.float32. Defaults to the input
+                                    dtype for floating inputs and float64 for integer inputs.
+        out (np.array, optional): Buffer of shape (batch_size, seq_len_q, d_v) and dtype `dtype`
+                                  that receives the output.
+        workspace (np.array, optional): Buffer of shape (batch_size, seq_len_q, seq_len_k) and
+                                        dtype `dtype` for the scores. Scaling, masking and softmax
+                                        all run in place in it, so with `out` and `workspace`
+                                        reused across calls the hot loop allocates almost nothing.
+                                        The returned weights are this buffer.
+        chunk_size (int, optional): If given, split the batch into chunks of this many rows and
+                                    run them on a thread pool of `num_threads` threads (see
+                                    batched_attention). Cannot be combined with block_size or
+                                    workspace.
+        num_threads (int, optional): Threads for chunk_size; defaults to os.cpu_count().
                                    
     Returns:
         output (np.array): The attended output of shape (batch_size, seq_len_q, d_v).
         attention_weights (np.array): The attention weights (after softmax) 
-                                      of shape (batch_size, seq_len_q, seq_len_k).
+                                      of shape (batch_size, seq_len_q, seq_len_k),
+                                      or None if return_weights is False.
     """
+    dtype = attention_dtype(Q, K, V, dtype)
+    # No-ops when the inputs already have the computation dtype
+    Q = np.asarray(Q, dtype=dtype)
+    K = np.asarray(K, dtype=dtype)
+    V = np.asarray(V, dtype=dtype)
+    
+    if chunk_size is not None:
+        if block_size is not None or workspace is not None:
+            raise ValueError("chunk_size cannot be combined with block_size or workspace")
+        return batched_attention(Q, K, V, mask=mask, chunk_size=chunk_size, num_threads=num_threads,
+                                 return_weights=return_weights, causal=causal, out=out)
+    
+    if block_size is not None:
+        return blocked_attention(Q, K, V, mask=mask, block_size=block_size,
+                                 return_weights=return_weights, causal=causal, out=out)
     
     # 1. Dimensions
     # d_k is the dimensionality of the keys (and queries).
     # We get it from the last dimension of K.
     d_k = K.shape[-1]
+    # A mask may have more batch dimensions than Q, K and V; the result then has its batch shape
+    batch_shape = np.broadcast_shapes(Q.shape[:-2], K.shape[:-2], V.shape[:-2], np.shape(mask)[:-2])
+    seq_len_q, seq_len_k = Q.shape[-2], K.shape[-2]
     
     # 2. Score Calculation (Dot Product)
     # We perform matrix multiplication between Q and K transposed.
@@ -49,13 +151,19 @@ def scaled_dot_product_attention(Q, K, V, mask=None):
     
     # Note on numpy matmul: specifically supports stacks of matrices (batches).
     # We transpose only the last two dimensions of K for the dot product.
-    scores = np.matmul(Q, K.swapaxes(-2, -1))
+    # The scores are written straight into the workspace when one is given.
+    if workspace is None:
+        workspace = np.empty(batch_shape + (seq_len_q, seq_len_k), dtype=dtype)
+    else:
+        check_buffer(workspace, batch_shape + (seq_len_q, seq_len_k), dtype, "workspace")
+    scores = np.matmul(Q, K.swapaxes(-2, -1), out=workspace)
     
     # 3. Scaling
     # We divide by the square root of the dimension of the keys.
     # This prevents the dot products from growing too large in magnitude, 
     # which pushes the softmax function into regions where it has extremely small gradients.
-    scores = scores / np.sqrt(d_k)
+    # (In place: no scaled copy of the scores.)
+    scores *= dtype.type(1.0 / np.sqrt(d_k))
     
     # 4. Masking (Optional)
     # If a mask is provided, we set the masked positions to a very large negative number (-inf).
@@ -63,23 +171,327 @@ def scaled_dot_product_attention(Q, K, V, mask=None):
     if mask is not None:
         # Assuming mask has 0 for positions to mask out and 1 for valid positions.
         # We use a large negative number like -1e9 to simulate -infinity.
-        scores = np.where(mask == 0, -1e9, scores)
+        np.copyto(scores, MASK_VALUE, where=(mask == 0))
+    if causal:
+        apply_causal_mask(scores, query_offset=seq_len_k - seq_len_q)
         
     # 5. Softmax
     # Apply softmax to the last axis (seq_len_k) to obtain attention weights.
     # The weights represent how much focus each query should put on each key.
     # They sum to 1 along the last axis.
-    attention_weights = softmax(scores, axis=-1)
+    attention_weights = softmax(scores, axis=-1, out=scores)
     
     # 6. Weighted Sum
     # Multiply the attention weights by the Value matrix V.
     # Weights shape: (..., seq_len_q, seq_len_k)
     # V shape: (..., seq_len_v, d_v)  (Note: seq_len_k usually == seq_len_v)
     # Output shape: (..., seq_len_q, d_v)
-    output = np.matmul(attention_weights, V)
+    if out is not None:
+        check_buffer(out, batch_shape + (seq_len_q, V.shape[-1]), dtype, "out")
+    output = np.matmul(attention_weights, V, out=out)
     
+    if not return_weights:
+        return output, None
     return output, attention_weights
 
+def blocked_attention(Q, K, V, mask=None, block_size=128, return_weights=False,
+                      causal=False, out=None):
+    """
+    Scaled Dot-Product Attention computed block by block over the keys (online softmax).
+    
+    Instead of materializing all (seq_len_q, seq_len_k) scores at once, the keys and values
+    are visited in blocks of `block_size`. For every query we keep a running maximum m,
+    a running softmax denominator l and a running weighted sum of values acc. When a new
+    block raises the maximum from m to m_new, everything accumulated so far is rescaled
+    by exp(m - m_new), so at the end acc / l equals softmax(scores) @ V exactly.
+    
+    Args:
+        Q, K, V, mask, causal, out: As in scaled_dot_product_attention. The computation
+                                    runs in the dtype of the inputs (see attention_dtype).
+        block_size (int): Number of keys processed per step.
+        return_weights (bool): If True, also return the full attention weights. They are
+                               rebuilt in a second pass and need O(seq_len_q * seq_len_k)
+                               memory, so leave this off for long sequences.
+    
+    Returns:
+        output (np.array): Same as scaled_dot_product_attention, within float tolerance.
+        attention_weights (np.array or None): Full weights if return_weights, else None.
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be a positive integer")
+    
+    # 1. Shapes and the running statistics
+    # m: running max of the scores, l: running sum of exp(score - m), acc: running sum of exp(...) * V
+    dtype = attention_dtype(Q, K, V)
+    Q, K, V = (np.asarray(x, dtype=dtype) for x in (Q, K, V))
+    d_k = K.shape[-1]
+    seq_len_q, seq_len_k = Q.shape[-2], K.shape[-2]
+    scale = dtype.type(1.0 / np.sqrt(d_k))
+    batch_shape = np.broadcast_shapes(Q.shape[:-2], K.shape[:-2], V.shape[:-2], np.shape(mask)[:-2])
+    query_offset = seq_len_k - seq_len_q
+    
+    m = np.full(batch_shape + (seq_len_q, 1), -np.inf, dtype=dtype)
+    l = np.zeros(batch_shape + (seq_len_q, 1), dtype=dtype)
+    if out is None:
+        acc = np.zeros(batch_shape + (seq_len_q, V.shape[-1]), dtype=dtype)
+    else:
+        check_buffer(out, batch_shape + (seq_len_q, V.shape[-1]), dtype, "out")
+        acc = out
+        acc.fill(0)
+    
+    # A broadcast view of the mask costs no memory; each block slices its columns out of it
+    if mask is not None:
+        mask = np.asarray(mask)
+        mask = np.broadcast_to(mask, mask.shape[:-1] + (seq_len_k,))
+    
+    def block_scores(start, stop):
+        scores = np.matmul(Q, K[..., start:stop, :].swapaxes(-2, -1),
+                           out=np.empty(batch_shape + (seq_len_q, stop - start), dtype=dtype))
+        scores *= scale
+        if mask is not None:
+            np.copyto(scores, MASK_VALUE, where=(mask[..., start:stop] == 0))
+        if causal:
+            apply_causal_mask(scores, query_offset, key_start=start)
+        return scores
+    
+    # 2. One pass over the key blocks
+    for start in range(0, seq_len_k, block_size):
+        stop = min(start + block_size, seq_len_k)
+        scores = block_scores(start, stop)
+        
+        # New maximum, then rescale what was accumulated under the old one
+        m_new = np.maximum(m, np.max(scores, axis=-1, keepdims=True))
+        correction = np.exp(m - m_new)
+        p = np.exp(np.subtract(scores, m_new, out=scores), out=scores)
+        
+        l *= correction
+        l += np.sum(p, axis=-1, keepdims=True)
+        acc *= correction
+        acc += np.matmul(p, V[..., start:stop, :])
+        m = m_new
+    
+    acc /= l
+    output = acc
+    
+    if not return_weights:
+        return output, None
+    
+    # 3. Optional second pass: with the final m and l every block's weights are exact
+    attention_weights = np.empty(batch_shape + (seq_len_q, seq_len_k), dtype=dtype)
+    for start in range(0, seq_len_k, block_size):
+        stop = min(start + block_size, seq_len_k)
+        attention_weights[..., start:stop] = np.exp(block_scores(start, stop) - m) / l
+    return output, attention_weights
+
+def batched_attention(Q, K, V, mask=None, chunk_size=1, num_threads=None, split_heads=False,
+                      return_weights=False, causal=False, dtype=None, out=None):
+    """
+    Scaled Dot-Product Attention over a large batch, one chunk of the batch at a time,
+    with the chunks spread over a thread pool.
+    
+    The monolithic call builds the scores of the whole batch at once and runs the
+    element-wise scaling, masking and softmax steps on one thread. Here the batch axis
+    (and with split_heads the head axis, for inputs of shape (batch, heads, seq, d)) is cut
+    into chunks of `chunk_size` rows. Every chunk is a plain scaled_dot_product_attention
+    call that writes straight into its slice of the preallocated output, and NumPy releases
+    the GIL inside matmul and the ufuncs, so the chunks run in parallel. Each thread reuses
+    one score workspace of chunk_size rows, so without weights the extra memory is
+    O(num_threads * chunk_size * seq_len_q * seq_len_k) instead of O(batch * seq_len_q * seq_len_k).
+    
+    Args:
+        Q, K, V, mask, causal, dtype, out: As in scaled_dot_product_attention. Q, K, V and
+                                           mask are broadcast to the common batch shape.
+        chunk_size (int): Rows of the split axis per chunk.
+        num_threads (int, optional): Worker threads; defaults to os.cpu_count(). With one
+                                     thread (or one chunk) the chunks run in the calling thread.
+        split_heads (bool): Split the second axis (heads) instead of the first, one batch
+                            element at a time, for batches smaller than the thread count.
+        return_weights (bool): Also return the full weights. The chunks then write their
+                               scores into slices of one (batch, ..., seq_len_q, seq_len_k)
+                               array, so the memory saving is lost.
+    
+    Returns:
+        output (np.array): Same as scaled_dot_product_attention, within float tolerance.
+        attention_weights (np.array or None): Full weights if return_weights, else None.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    
+    # 1. Shapes, broadcast views of the inputs and the preallocated results
+    dtype = attention_dtype(Q, K, V, dtype)
+    Q, K, V = (np.asarray(x, dtype=dtype) for x in (Q, K, V))
+    batch_shape = np.broadcast_shapes(Q.shape[:-2], K.shape[:-2], V.shape[:-2], np.shape(mask)[:-2])
+    split_axis = 1 if split_heads else 0
+    if len(batch_shape) <= split_axis:
+        raise ValueError(f"inputs need at least {split_axis + 3} dimensions to split axis {split_axis}")
+    seq_len_q, seq_len_k = Q.shape[-2], K.shape[-2]
+    Q, K, V = (np.broadcast_to(x, batch_shape + x.shape[-2:]) for x in (Q, K, V))
+    if mask is not None:
+        mask = np.broadcast_to(mask, batch_shape + (seq_len_q, seq_len_k))
+    
+    if out is None:
+        out = np.empty(batch_shape + (seq_len_q, V.shape[-1]), dtype=dtype)
+    else:
+        check_buffer(out, batch_shape + (seq_len_q, V.shape[-1]), dtype, "out")
+    weights = np.empty(batch_shape + (seq_len_q, seq_len_k), dtype=dtype) if return_weights else None
+    
+    # 2. The chunks: an index prefix (the batch element when splitting heads) plus a row range
+    n_rows = batch_shape[split_axis]
+    chunks = [prefix + (slice(start, min(start + chunk_size, n_rows)),)
+              for prefix in np.ndindex(batch_shape[:split_axis])
+              for start in range(0, n_rows, chunk_size)]
+    
+    # One score workspace per thread, sized for a full chunk and sliced for the last one
+    workspace_shape = (min(chunk_size, n_rows),) + batch_shape[split_axis + 1:] + (seq_len_q, seq_len_k)
+    local = threading.local()
+    
+    def run_chunk(index):
+        if weights is not None:
+            workspace = weights[index]
+        else:
+            if not hasattr(local, "workspace"):
+                local.workspace = np.empty(workspace_shape, dtype=dtype)
+            rows = index[-1].stop - index[-1].start
+            workspace = local.workspace[:rows]
+        scaled_dot_product_attention(Q[index], K[index], V[index],
+                                     mask=None if mask is None else mask[index],
+                                     causal=causal, dtype=dtype, out=out[index], workspace=workspace)
+    
+    # 3. Run them; list() re-raises the first exception of any chunk
+    num_threads = min(num_threads or os.cpu_count() or 1, len(chunks))
+    if num_threads <= 1:
+        for index in chunks:
+            run_chunk(index)
+    else:
+        with ThreadPoolExecutor(max_workers=num_threads) as pool:
+            list(pool.map(run_chunk, chunks))
+    return out, weights
+
+def sliding_window_mask(seq_len_q, seq_len_k, window, causal=True):
+    """
+    Dense (seq_len_q, seq_len_k) mask equivalent to sliding_window_attention.
+    
+    Query i sits at key position p = i + seq_len_k - seq_len_q (queries are aligned with
+    the last keys). It sees keys j with p - window < j <= p when causal, and keys with
+    |j - p| < window otherwise.
+    """
+    positions = np.arange(seq_len_q)[:, None] + (seq_len_k - seq_len_q)
+    distance = positions - np.arange(seq_len_k)[None, :]
+    if causal:
+        return (distance >= 0) & (distance < window)
+    return np.abs(distance) < window
+
+def block_sparse_mask(layout, block_size, seq_len_q, seq_len_k):
+    """
+    Dense (seq_len_q, seq_len_k) mask equivalent to block_sparse_attention:
+    every True entry of `layout` becomes a block_size x block_size block of ones.
+    """
+    layout = np.asarray(layout, dtype=bool)
+    mask = np.repeat(np.repeat(layout, block_size, axis=0), block_size, axis=1)
+    return mask[:seq_len_q, :seq_len_k]
+
+def attend_query_tile(Q, K, V, rows, keys, tile_mask, output, weights):
+    """
+    Dense attention of the queries in `rows` (a slice) over the keys in `keys`
+    (a slice or an index array), written into `output` (and `weights` if given).
+    """
+    tile_out, tile_weights = scaled_dot_product_attention(
+        Q[..., rows, :], K[..., keys, :], V[..., keys, :], mask=tile_mask,
+        return_weights=weights is not None)
+    output[..., rows, :] = tile_out
+    if weights is not None:
+        weights[..., rows, keys] = tile_weights
+
+def sliding_window_attention(Q, K, V, window, causal=True, return_weights=False):
+    """
+    Local attention: each query only sees the `window` keys around its own position
+    (see sliding_window_mask for the exact rule).
+    
+    The queries are processed in tiles of T = max(window, MIN_QUERY_TILE) rows. A tile can
+    only reach a band of at most T + 2 * window keys, so only that band's scores are computed:
+    compute and memory are O(seq_len * window) instead of O(seq_len^2). The result equals dense attention
+    with mask=sliding_window_mask(...).
+    
+    Args:
+        Q, K, V: As in scaled_dot_product_attention, with seq_len_q <= seq_len_k.
+        window (int): Number of keys each query sees on each side it looks at.
+        causal (bool): Only look back (True) or both back and ahead (False).
+        return_weights (bool): Also return the full (seq_len_q, seq_len_k) weights,
+                               zero outside the window. This costs O(seq_len^2) memory.
+    
+    Returns:
+        output (np.array): (batch_size, seq_len_q, d_v)
+        attention_weights (np.array or None)
+    """
+    if window < 1:
+        raise ValueError("window must be a positive integer")
+    seq_len_q, seq_len_k = Q.shape[-2], K.shape[-2]
+    if seq_len_q > seq_len_k:
+        raise ValueError("sliding_window_attention needs seq_len_q <= seq_len_k")
+    
+    dtype = attention_dtype(Q, K, V)
+    batch_shape = np.broadcast_shapes(Q.shape[:-2], K.shape[:-2], V.shape[:-2])
+    output = np.empty(batch_shape + (seq_len_q, V.shape[-1]), dtype=dtype)
+    weights = np.zeros(batch_shape + (seq_len_q, seq_len_k), dtype=dtype) if return_weights else None
+    query_offset = seq_len_k - seq_len_q
+    ahead = 0 if causal else window - 1
+    tile = max(window, MIN_QUERY_TILE)
+    
+    for start in range(0, seq_len_q, tile):
+        stop = min(start + tile, seq_len_q)
+        # Key band reachable from this tile, and the window rule inside it
+        key_start = max(start + query_offset - window + 1, 0)
+        key_stop = min(stop + query_offset + ahead, seq_len_k)
+        positions = np.arange(start, stop)[:, None] + query_offset
+        distance = positions - np.arange(key_start, key_stop)[None, :]
+        tile_mask = (distance < window) & (distance > -1 - ahead)
+        attend_query_tile(Q, K, V, slice(start, stop), slice(key_start, key_stop),
+                          tile_mask, output, weights)
+    return output, weights
+
+def block_sparse_attention(Q, K, V, layout, block_size, return_weights=False):
+    """
+    Block-sparse attention: queries and keys are cut into blocks of `block_size` and
+    query block qb only attends to the key blocks kb with layout[qb, kb] True.
+    
+    Each query block gathers just its allowed key blocks, so compute and memory scale
+    with the number of True blocks instead of seq_len^2. The result equals dense
+    attention with mask=block_sparse_mask(...).
+    
+    Args:
+        Q, K, V: As in scaled_dot_product_attention.
+        layout (np.array): Boolean (ceil(seq_len_q / block_size), ceil(seq_len_k / block_size)).
+                           Every query block needs at least one key block.
+        block_size (int): Rows/columns per block.
+        return_weights (bool): Also return the full weights (zero outside the layout).
+    
+    Returns:
+        output (np.array): (batch_size, seq_len_q, d_v)
+        attention_weights (np.array or None)
+    """
+    seq_len_q, seq_len_k = Q.shape[-2], K.shape[-2]
+    layout = np.asarray(layout, dtype=bool)
+    n_query_blocks = -(-seq_len_q // block_size)
+    n_key_blocks = -(-seq_len_k // block_size)
+    if layout.shape != (n_query_blocks, n_key_blocks):
+        raise ValueError(f"layout must have shape {(n_query_blocks, n_key_blocks)}, got {layout.shape}")
+    if not layout.any(axis=1).all():
+        raise ValueError("every query block needs at least one key block")
+    
+    dtype = attention_dtype(Q, K, V)
+    batch_shape = np.broadcast_shapes(Q.shape[:-2], K.shape[:-2], V.shape[:-2])
+    output = np.empty(batch_shape + (seq_len_q, V.shape[-1]), dtype=dtype)
+    weights = np.zeros(batch_shape + (seq_len_q, seq_len_k), dtype=dtype) if return_weights else None
+    block_offsets = np.arange(block_size)
+    
+    for query_block in range(n_query_blocks):
+        rows = slice(query_block * block_size, min((query_block + 1) * block_size, seq_len_q))
+        # Positions of all allowed keys (the last block may be shorter)
+        keys = (np.flatnonzero(layout[query_block])[:, None] * block_size + block_offsets).ravel()
+        keys = keys[keys < seq_len_k]
+        attend_query_tile(Q, K, V, rows, keys, None, output, weights)
+    return output, weights
+
 # ==========================================
 # Demonstration
 # ==========================================
@@ -1,6 +1,8 @@
 import numpy as np
 import pytest
-from attention_task import scaled_dot_product_attention, softmax
+from attention_task import (batched_attention, blocked_attention, block_sparse_attention, block_sparse_mask,
+                            scaled_dot_product_attention, sliding_window_attention,
+                            sliding_window_mask, softmax)
 
 # Set a seed for reproducibility
 np.random.seed(42)
@@ -97,6 +99,197 @@ def test_attention_values():
     # Since w1 is high, output should be closer to [1, 1, 1, 1]
     assert np.all(output < 1.5), "Output should be dominated by V1"
 
+@pytest.mark.parametrize("block_size", [1, 3, 7, 64])
+def test_blocked_attention_matches_dense(block_size):
+    """
+    Test that the online-softmax mode gives the dense result, including block sizes
+    that do not divide the sequence length and a mask.
+    """
+    Q = np.random.randn(2, 5, 8)
+    K = np.random.randn(2, 13, 8)
+    V = np.random.randn(2, 13, 6)
+    mask = np.random.rand(2, 5, 13) > 0.3
+    mask[..., 0] = True  # keep at least one key per query
+    
+    for m in (None, mask):
+        expected_out, expected_w = scaled_dot_product_attention(Q, K, V, mask=m)
+        output, weights = scaled_dot_product_attention(Q, K, V, mask=m, block_size=block_size)
+        
+        assert np.allclose(output, expected_out), "Blocked output should match dense attention"
+        assert np.allclose(weights, expected_w), "Blocked weights should match dense attention"
+
+def test_attention_without_weights():
+    """
+    Test that return_weights=False skips the weights but keeps the output.
+    """
+    Q = np.random.randn(1, 4, 8)
+    K = np.random.randn(1, 10, 8)
+    V = np.random.randn(1, 10, 8)
+    expected, _ = scaled_dot_product_attention(Q, K, V)
+    
+    for block_size in (None, 4):
+        output, weights = scaled_dot_product_attention(Q, K, V, block_size=block_size, return_weights=False)
+        assert weights is None
+        assert np.allclose(output, expected)
+    
+    with pytest.raises(ValueError):
+        blocked_attention(Q, K, V, block_size=0)
+
+def test_attention_dtype_control():
+    """
+    Test that float32 inputs stay float32 and integer inputs can be computed in float32.
+    """
+    Q = np.random.rand(1, 4, 8).astype(np.float32)
+    output, weights = scaled_dot_product_attention(Q, Q, Q)
+    assert output.dtype == np.float32 and weights.dtype == np.float32
+    
+    Q_int = np.random.randint(0, 5, size=(1, 4, 8))
+    output, _ = scaled_dot_product_attention(Q_int, Q_int, Q_int)
+    assert output.dtype == np.float64, "Integer inputs default to float64"
+    output32, _ = scaled_dot_product_attention(Q_int, Q_int, Q_int, dtype=np.float32)
+    assert output32.dtype == np.float32
+    assert np.allclose(output32, output, atol=1e-5)
+
+def test_attention_out_and_workspace_buffers():
+    """
+    Test that caller-supplied buffers are filled and returned, and that a call
+    with both buffers allocates far less than the score matrix.
+    """
+    import tracemalloc
+    
+    Q = np.random.randn(2, 256, 16)
+    K = np.random.randn(2, 320, 16)
+    V = np.random.randn(2, 320, 16)
+    mask = np.random.rand(2, 256, 320) > 0.2
+    expected_out, expected_w = scaled_dot_product_attention(Q, K, V, mask=mask)
+    
+    out = np.empty((2, 256, 16))
+    workspace = np.empty((2, 256, 320))
+    output, weights = scaled_dot_product_attention(Q, K, V, mask=mask, out=out, workspace=workspace)
+    assert output is out and weights is workspace
+    assert np.allclose(output, expected_out) and np.allclose(weights, expected_w)
+    
+    tracemalloc.start()
+    scaled_dot_product_attention(Q, K, V, causal=True, out=out, workspace=workspace)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # Only NumPy's fixed-size ufunc buffer and the per-row max/sum remain
+    assert peak < workspace.nbytes / 10, f"Expected almost no allocations, got {peak} bytes"
+    
+    with pytest.raises(ValueError):
+        scaled_dot_product_attention(Q, K, V, out=np.empty((2, 256, 8)))
+    with pytest.raises(ValueError):
+        scaled_dot_product_attention(Q, K, V, workspace=np.empty((2, 256, 320), dtype=np.float32))
+
+def test_mask_with_larger_batch_than_inputs():
+    """
+    Test that a mask with more batch entries than Q, K and V broadcasts the output
+    to the mask's batch shape in every mode, and that out= must have that shape.
+    """
+    Q = np.random.randn(1, 3, 4)
+    K = np.random.randn(1, 5, 4)
+    V = np.random.randn(1, 5, 2)
+    mask = np.random.rand(2, 3, 5) > 0.3
+    mask[..., 0] = True
+    expected = np.stack([scaled_dot_product_attention(Q, K, V, mask=mask[i:i + 1])[0][0] for i in range(2)])
+    
+    for options in ({}, {'block_size': 2}, {'chunk_size': 1}):
+        output, _ = scaled_dot_product_attention(Q, K, V, mask=mask, **options)
+        assert output.shape == (2, 3, 2)
+        assert np.allclose(output, expected)
+    out, workspace = np.empty((2, 3, 2)), np.empty((2, 3, 5))
+    output, _ = scaled_dot_product_attention(Q, K, V, mask=mask, out=out, workspace=workspace)
+    assert output is out and np.allclose(output, expected)
+    with pytest.raises(ValueError):
+        scaled_dot_product_attention(Q, K, V, mask=mask, out=np.empty((1, 3, 2)))
+
+@pytest.mark.parametrize("chunk_size, num_threads", [(1, 1), (2, 3), (3, 4), (10, 2)])
+def test_batched_attention_matches_dense(chunk_size, num_threads):
+    """
+    Test that running the batch in chunks on a thread pool gives the monolithic result,
+    splitting either the batch or the head axis, and fills a caller-supplied output.
+    """
+    Q = np.random.randn(5, 3, 6, 4)
+    K = np.random.randn(5, 3, 8, 4)
+    V = np.random.randn(1, 3, 8, 5)  # Broadcast over the batch
+    mask = np.random.rand(5, 1, 6, 8) > 0.3
+    expected_out, expected_w = scaled_dot_product_attention(Q, K, V, mask=mask, causal=True)
+    
+    for split_heads in (False, True):
+        output, weights = batched_attention(Q, K, V, mask=mask, causal=True, chunk_size=chunk_size,
+                                            num_threads=num_threads, split_heads=split_heads)
+        assert weights is None
+        assert np.allclose(output, expected_out)
+    
+    out = np.empty((5, 3, 6, 5))
+    output, weights = scaled_dot_product_attention(Q, K, V, mask=mask, causal=True, out=out,
+                                                   chunk_size=chunk_size, num_threads=num_threads)
+    assert output is out
+    assert np.allclose(output, expected_out) and np.allclose(weights, expected_w)
+    
+    with pytest.raises(ValueError):
+        batched_attention(Q, K, V, chunk_size=0)
+
+@pytest.mark.parametrize("seq_len_q, seq_len_k", [(6, 6), (3, 7), (7, 3)])
+def test_causal_matches_triangular_mask(seq_len_q, seq_len_k):
+    """
+    Test that causal=True equals an explicit lower-triangular mask, with the queries
+    aligned to the last keys, in both the dense and the blocked mode.
+    """
+    Q = np.random.randn(2, seq_len_q, 4)
+    K = np.random.randn(2, seq_len_k, 4)
+    V = np.random.randn(2, seq_len_k, 5)
+    mask = np.tril(np.ones((seq_len_q, seq_len_k)), k=seq_len_k - seq_len_q)
+    expected_out, expected_w = scaled_dot_product_attention(Q, K, V, mask=mask)
+    
+    for block_size in (None, 2):
+        output, weights = scaled_dot_product_attention(Q, K, V, causal=True, block_size=block_size)
+        assert np.allclose(output, expected_out)
+        assert np.allclose(weights, expected_w)
+
+@pytest.mark.parametrize("window", [1, 4, 70, 500])
+@pytest.mark.parametrize("causal", [True, False])
+def test_sliding_window_matches_dense_with_mask(window, causal):
+    """
+    Test that local attention equals dense attention with the equivalent window mask,
+    including query tiles that do not divide the sequence and seq_len_q < seq_len_k.
+    """
+    Q = np.random.randn(2, 150, 8)
+    K = np.random.randn(2, 160, 8)
+    V = np.random.randn(2, 160, 5)
+    mask = sliding_window_mask(150, 160, window, causal=causal)
+    expected_out, expected_w = scaled_dot_product_attention(Q, K, V, mask=mask)
+    
+    output, weights = sliding_window_attention(Q, K, V, window, causal=causal, return_weights=True)
+    assert np.allclose(output, expected_out)
+    assert np.allclose(weights, expected_w)
+    
+    if causal and window == 1:
+        # Each query only sees its own position
+        assert np.allclose(output, V[:, 10:])
+
+def test_block_sparse_matches_dense_with_mask():
+    """
+    Test that block-sparse attention equals dense attention with the expanded block mask.
+    """
+    Q = np.random.randn(2, 37, 8)
+    K = np.random.randn(2, 41, 8)
+    V = np.random.randn(2, 41, 5)
+    layout = np.random.rand(5, 6) > 0.5
+    layout[:, 0] = True  # every query block keeps the first key block
+    mask = block_sparse_mask(layout, 8, 37, 41)
+    expected_out, expected_w = scaled_dot_product_attention(Q, K, V, mask=mask)
+    
+    output, weights = block_sparse_attention(Q, K, V, layout, block_size=8, return_weights=True)
+    assert np.allclose(output, expected_out)
+    assert np.allclose(weights, expected_w)
+    
+    layout[2] = False
+    with pytest.raises(ValueError):
+        block_sparse_attention(Q, K, V, layout, block_size=8)
+    with pytest.raises(ValueError):
+        block_sparse_attention(Q, K, V, layout[:4], block_size=8)
+
 if __name__ == "__main__":
     # Allow running this script directly to see passes
     import sys
@@ -105,6 +298,20 @@ if __name__ == "__main__":
         test_attention_shapes()
         test_attention_masking()
         test_attention_values()
+        for block_size in (1, 3, 7, 64):
+            test_blocked_attention_matches_dense(block_size)
+        test_attention_without_weights()
+        test_attention_dtype_control()
+        test_attention_out_and_workspace_buffers()
+        test_mask_with_larger_batch_than_inputs()
+        for chunk_size, num_threads in ((1, 1), (2, 3), (3, 4), (10, 2)):
+            test_batched_attention_matches_dense(chunk_size, num_threads)
+        for seq_len_q, seq_len_k in ((6, 6), (3, 7), (7, 3)):
+            test_causal_matches_triangular_mask(seq_len_q, seq_len_k)
+        for window in (1, 4, 70, 500):
+            for causal in (True, False):
+                test_sliding_window_matches_dense_with_mask(window, causal)
+        test_block_sparse_matches_dense_with_mask()
         print("All tests passed!")
     except AssertionError as e:
         print(f"Test failed: {e}")
@@ -0,0 +1,144 @@
+import numpy as np
+
+from attention_task import scaled_dot_product_attention
+
+class KVCache:
+    """
+    Keys and values of every token seen so far, for incremental (token by token) decoding.
+
+    The arrays are preallocated for `max_len` positions, so appending a token is a
+    slice assignment instead of a concatenate. `valid` marks which positions hold a real
+    token; padding positions of a batched, variable-length prompt stay False and are
+    masked out of every later attention step.
+
+    Shapes:
+        keys, values: (batch_size, num_heads, max_len, d_head)
+        valid:        (batch_size, max_len)
+    """
+
+    def __init__(self, batch_size, num_heads, max_len, d_head, dtype=np.float64):
+        self.keys = np.zeros((batch_size, num_heads, max_len, d_head), dtype=dtype)
+        self.values = np.zeros((batch_size, num_heads, max_len, d_head), dtype=dtype)
+        self.valid = np.zeros((batch_size, max_len), dtype=bool)
+        self.length = 0
+
+    @property
+    def max_len(self):
+        return self.keys.shape[2]
+
+    def append(self, keys, values, valid=None):
+        """
+        Stores the keys/values of new tokens (shape (batch, heads, n, d_head)) at the end.
+
+        Returns:
+            (keys, values, valid): Views over all cached positions, new ones included.
+        """
+        n = keys.shape[2]
+        start, stop = self.length, self.length + n
+        if stop > self.max_len:
+            raise ValueError(f"KV cache is full ({self.max_len} positions)")
+        self.keys[:, :, start:stop] = keys
+        self.values[:, :, start:stop] = values
+        self.valid[:, start:stop] = True if valid is None else valid
+        self.length = stop
+        return self.keys[:, :, :stop], self.values[:, :, :stop], self.valid[:, :stop]
+
+    def reset(self):
+        """Forgets every cached token (the buffers are kept for reuse)."""
+        self.valid[:] = False
+        self.length = 0
+
+class MultiHeadAttention:
+    """
+    Multi-Head Attention built on scaled_dot_product_attention.
+
+        MultiHead(Q, K, V) = Concat(head_1, ..., head_h) @ W_o
+        head_i = Attention(Q @ W_q_i, K @ W_k_i, V @ W_v_i)
+
+    The h heads are computed together: after projecting with the full (d_model, d_model)
+    matrices, the last axis is split into (num_heads, d_head) and moved next to the batch
+    axis, so one call to scaled_dot_product_attention handles all heads of all sequences.
+
+    For autoregressive decoding pass a KVCache (see init_cache): every call appends the
+    keys/values of its tokens to the cache and attends over everything cached, so a new
+    token costs O(seq) instead of recomputing the whole O(seq^2) score matrix.
+    """
+
+    def __init__(self, d_model, num_heads, seed=None, dtype=np.float64):
+        """
+        Args:
+            d_model (int): Model (embedding) dimension. Must be divisible by num_heads.
+            num_heads (int): Number of attention heads.
+            seed (int, optional): Seed for the random projection weights.
+            dtype (np.dtype): dtype of the weights and of the computation.
+        """
+        if d_model % num_heads != 0:
+            raise ValueError("d_model must be divisible by num_heads")
+        self.d_model = d_model
+        self.num_heads = num_heads
+        self.d_head = d_model // num_heads
+        self.dtype = np.dtype(dtype)
+
+        # Xavier/Glorot uniform initialization of the four projections
+        rng = np.random.default_rng(seed)
+        limit = np.sqrt(6.0 / (2 * d_model))
+        self.W_q, self.W_k, self.W_v, self.W_o = (
+            rng.uniform(-limit, limit, size=(d_model, d_model)).astype(self.dtype) for _ in range(4)
+        )
+
+    def split_heads(self, x):
+        """(batch, seq, d_model) -> (batch, num_heads, seq, d_head)"""
+        batch_size, seq_len, _ = x.shape
+        return x.reshape(batch_size, seq_len, self.num_heads, self.d_head).transpose(0, 2, 1, 3)
+
+    def merge_heads(self, x):
+        """(batch, num_heads, seq, d_head) -> (batch, seq, d_model)"""
+        batch_size, _, seq_len, _ = x.shape
+        return x.transpose(0, 2, 1, 3).reshape(batch_size, seq_len, self.d_model)
+
+    def init_cache(self, batch_size, max_len):
+        """Returns an empty KVCache for `batch_size` sequences of up to `max_len` tokens."""
+        return KVCache(batch_size, self.num_heads, max_len, self.d_head, dtype=self.dtype)
+
+    def __call__(self, query, key=None, value=None, padding_mask=None, causal=False,
+                 cache=None, return_weights=False):
+        """
+        Args:
+            query (np.array): (batch_size, seq_len_q, d_model)
+            key, value (np.array, optional): (batch_size, seq_len_k, d_model).
+                                             Default to `query` (self-attention).
+            padding_mask (np.array, optional): (batch_size, seq_len_k), 1 for real tokens and
+                                               0 for padding. Padded keys get zero weight.
+            causal (bool): Each query only sees keys up to its own position.
+            cache (KVCache, optional): Append this call's keys/values to the cache and attend
+                                       over all cached tokens. With a cache, padding_mask
+                                       refers to the new tokens only.
+            return_weights (bool): Also return the per-head attention weights.
+
+        Returns:
+            output (np.array): (batch_size, seq_len_q, d_model)
+            attention_weights (np.array or None): (batch_size, num_heads, seq_len_q, seq_len_k)
+        """
+        key = query if key is None else key
+        value = key if value is None else value
+
+        # 1. Linear projections, then split the last axis into heads
+        Q = self.split_heads(np.matmul(query, self.W_q, dtype=self.dtype))
+        K = self.split_heads(np.matmul(key, self.W_k, dtype=self.dtype))
+        V = self.split_heads(np.matmul(value, self.W_v, dtype=self.dtype))
+
+        # 2. With a cache, attend over every cached token instead of just the new ones
+        valid = None if padding_mask is None else np.asarray(padding_mask, dtype=bool)
+        if cache is not None:
+            K, V, valid = cache.append(K, V, valid)
+
+        # 3. Padding mask (batch, seq_len_k) -> (batch, 1 head, 1 query, seq_len_k)
+        mask = None if valid is None else valid[:, None, None, :]
+
+        # 4. All heads of all sequences in one call; causal queries are aligned with the last keys
+        heads, weights = scaled_dot_product_attention(Q, K, V, mask=mask, causal=causal,
+                                                      dtype=self.dtype, return_weights=return_weights)
+
+        # 5. Concatenate the heads and apply the output projection
+        output = np.matmul(self.merge_heads(heads), self.W_o)
+        return output, weights
@@ -0,0 +1,78 @@
+"""
+Peak memory and run time of dense, buffered, blocked (online-softmax) and
+sparse (sliding-window / block-sparse) attention.
+
+Peak memory is the largest amount NumPy allocated during one call, measured
+with tracemalloc. Inputs are random float64 arrays of shape (1, seq, 64);
+the "reused buffers" rows pass preallocated out= and workspace= arrays, as a
+hot loop would, so their peak excludes those buffers. The block-sparse layout
+is a causal band: every query block sees the first block, itself and the
+previous block.
+
+Usage:
+    python benchmarks/bench_attention.py [--block-size N] [--window N] [--seq 512 1024 ...]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+from common import PROJECT_DIR, format_bytes, time_call
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "attention_implementation"))
+from attention_task import (  # noqa: E402
+    block_sparse_attention, scaled_dot_product_attention, sliding_window_attention)
+
+
+def peak_bytes(fn):
+    """Largest traced allocation total while `fn()` runs."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--block-size", type=int, default=128)
+    parser.add_argument("--window", type=int, default=128)
+    parser.add_argument("--seq", type=int, nargs="+", default=[512, 1024, 2048, 4096])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'seq':>6}  {'mode':<26}{'peak memory':>14}{'time':>12}")
+    for seq in args.seq:
+        Q, K, V = (rng.standard_normal((1, seq, 64)) for _ in range(3))
+        Q32, K32, V32 = (x.astype(np.float32) for x in (Q, K, V))
+        out, workspace = np.empty((1, seq, 64)), np.empty((1, seq, seq))
+        out32, workspace32 = out.astype(np.float32), workspace.astype(np.float32)
+        n_blocks = -(-seq // args.block_size)
+        layout = np.eye(n_blocks, dtype=bool) | np.eye(n_blocks, k=-1, dtype=bool)
+        layout[:, 0] = True
+        modes = [
+            ("dense", lambda: scaled_dot_product_attention(Q, K, V)),
+            ("dense, no weights", lambda: scaled_dot_product_attention(Q, K, V, return_weights=False)),
+            ("dense, reused buffers",
+             lambda: scaled_dot_product_attention(Q, K, V, out=out, workspace=workspace)),
+            ("float32, reused buffers",
+             lambda: scaled_dot_product_attention(Q32, K32, V32, out=out32, workspace=workspace32)),
+            ("causal, reused buffers",
+             lambda: scaled_dot_product_attention(Q, K, V, causal=True, out=out, workspace=workspace)),
+            (f"blocked ({args.block_size}), no weights",
+             lambda: scaled_dot_product_attention(Q, K, V, block_size=args.block_size, return_weights=False)),
+            (f"sliding window ({args.window})", lambda: sliding_window_attention(Q, K, V, args.window)),
+            (f"block-sparse ({args.block_size})",
+             lambda: block_sparse_attention(Q, K, V, layout, args.block_size)),
+        ]
+        for name, fn in modes:
+            peak = peak_bytes(fn)
+            best = time_call(fn, repeat=3)["best"]
+            print(f"{seq:>6}  {name:<26}{format_bytes(peak):>14}{best * 1e3:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Run time and peak memory of batched (chunked, thread-pool) attention against the monolithic call.
+
+Inputs are random float32 arrays of shape (--batch, --heads, --seq, 64).
+"monolithic" is one scaled_dot_product_attention call without weights, which
+builds the scores of the whole batch at once; the other rows are
+batched_attention with the given chunk size and thread count, writing into a
+preallocated output. Peak memory is the largest amount NumPy allocated during
+one call, measured with tracemalloc (the output buffer is excluded for every
+row). Speedups from extra threads need as many free CPU cores.
+
+Usage:
+    python benchmarks/bench_batched_attention.py [--batch 16] [--heads 8] [--seq 512] [--chunk-sizes 1 4 16] [--threads 1 2 4]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+from common import PROJECT_DIR, format_bytes, time_call
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "attention_implementation"))
+from attention_task import batched_attention, scaled_dot_product_attention  # noqa: E402
+
+
+def peak_bytes(fn):
+    """Largest traced allocation total while `fn()` runs."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--heads", type=int, default=8)
+    parser.add_argument("--seq", type=int, default=512)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--causal", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    shape = (args.batch, args.heads, args.seq, 64)
+    Q, K, V = (rng.standard_normal(shape, dtype=np.float32) for _ in range(3))
+    out = np.empty(shape, dtype=np.float32)
+    print(f"Q/K/V {shape} float32, {os.cpu_count()} CPU(s)\n")
+
+    modes = [("monolithic", lambda: scaled_dot_product_attention(
+        Q, K, V, causal=args.causal, return_weights=False, out=out))]
+    for chunk_size in args.chunk_sizes:
+        for threads in args.threads:
+            modes.append((f"chunk_size={chunk_size} threads={threads}",
+                          lambda chunk_size=chunk_size, threads=threads: batched_attention(
+                              Q, K, V, causal=args.causal, chunk_size=chunk_size,
+                              num_threads=threads, out=out)))
+
+    print(f"{'mode':<28}{'peak memory':>14}{'time':>12}{'speedup':>10}")
+    baseline = None
+    for name, fn in modes:
+        peak = peak_bytes(fn)
+        best = time_call(fn, repeat=args.repeat)["best"]
+        baseline = baseline or best
+        print(f"{name:<28}{format_bytes(peak):>14}{best * 1e3:>10.1f}ms{baseline / best:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Text-cleaning throughput (MB/s): preprocess_text vs preprocess_text_fast.
+
+Cleans the lines of FRANKENSTEIN.txt (replicated --scale times) with the
+reference per-row function, with the fast engine, and with the fast
+engine spread across worker processes, after checking the outputs match.
+
+Usage:
+    python benchmarks/bench_cleaning.py [--scale N] [--workers 2 4]
+"""
+import argparse
+
+from common import load_lines, time_call
+from data.data_preprocessing import clean_texts, preprocess_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="*", default=[2, 4])
+    args = parser.parse_args()
+
+    lines = load_lines(args.scale)
+    megabytes = sum(len(line.encode("utf-8")) for line in lines) / 1e6
+    expected = [preprocess_text(line) for line in lines]
+    assert clean_texts(lines) == expected
+
+    runs = {"preprocess_text": lambda: [preprocess_text(line) for line in lines],
+            "preprocess_text_fast": lambda: clean_texts(lines)}
+    for n_jobs in args.workers:
+        assert clean_texts(lines, n_jobs=n_jobs) == expected
+        runs[f"fast, {n_jobs} processes"] = lambda n_jobs=n_jobs: clean_texts(lines, n_jobs=n_jobs)
+
+    print(f"{len(lines)} lines, {megabytes:.1f} MB")
+    base = None
+    for name, fn in runs.items():
+        best = time_call(fn, repeat=3)["best"]
+        base = base or best
+        print(f"  {name:<24}{megabytes / best:>8.1f} MB/s  ({base / best:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Throughput of the parallel chunked corpus reader (data/corpus_reader.py).
+
+Writes FRANKENSTEIN.txt replicated --scale times to a temporary file and
+times, best of --repeat, how fast padded training sentences are produced by
+    stream_training_sentences (one process, one sentence per line),
+    parallel_training_sentences with 1, 2, 4 ... --max-jobs processes.
+The parallel reader segments paragraphs into sentences; its output does not
+depend on the number of processes.
+
+Usage:
+    python benchmarks/bench_corpus_reader.py [--scale 20] [--max-jobs 8] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import CORPUS_PATH
+from data.corpus_reader import parallel_training_sentences
+from data.data_preprocessing import stream_training_sentences
+
+
+def best_of(repeat, make_sentences):
+    best, sentences = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sentences = sum(1 for _ in make_sentences())
+        best = min(best, time.perf_counter() - start)
+    return best, sentences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=20)
+    parser.add_argument("--max-jobs", type=int, default=8)
+    parser.add_argument("--chunk-bytes", type=int, default=1 << 20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, "rb") as f:
+        data = f.read()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.txt")
+        with open(path, "wb") as f:
+            for _ in range(args.scale):
+                f.write(data)
+        megabytes = os.path.getsize(path) / 1e6
+        print(f"{megabytes:.1f} MB corpus, {os.cpu_count()} CPU(s)\n")
+        print(f"{'reader':<36}{'seconds':>10}{'MB/s':>10}{'sentences':>12}")
+
+        runs = [("stream_training_sentences", lambda: stream_training_sentences(path))]
+        jobs = 1
+        while jobs <= args.max_jobs:
+            runs.append((f"parallel_training_sentences n_jobs={jobs}",
+                         lambda jobs=jobs: parallel_training_sentences(path, n_jobs=jobs,
+                                                                       chunk_bytes=args.chunk_bytes)))
+            jobs *= 2
+
+        for name, make_sentences in runs:
+            seconds, sentences = best_of(args.repeat, make_sentences)
+            print(f"{name:<36}{seconds:>10.2f}{megabytes / seconds:>10.1f}{sentences:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares the 'dict' and 'compact' TrigramModel backends on the same corpus.
+
+Reports the memory retained by the trained counts (measured with tracemalloc)
+and the time to look up trigram counts, both one at a time and in one batch.
+
+Usage:
+    python benchmarks/bench_count_store.py [--scale N]
+"""
+import argparse
+import random
+import tracemalloc
+
+import numpy as np
+
+from common import format_bytes, load_training_sentences, time_call
+from src.ngram_model import TrigramModel
+
+
+def train(backend, sentences):
+    """Trains a model and returns it with the bytes it keeps alive."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    model = TrigramModel(backend=backend)
+    model.fit(sentences)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return model, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="replicate the corpus N times")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    sentences = load_training_sentences(args.scale)
+    dict_model, dict_bytes = train("dict", sentences)
+    compact_model, compact_bytes = train("compact", sentences)
+
+    # Query trigrams sampled from the corpus itself (all hits)
+    rng = random.Random(0)
+    trigrams = []
+    while len(trigrams) < args.lookups:
+        sentence = rng.choice(sentences)
+        if len(sentence) >= 3:
+            i = rng.randrange(len(sentence) - 2)
+            trigrams.append(tuple(sentence[i:i + 3]))
+
+    table = dict_model.model
+    store, vocab = compact_model.store, compact_model.vocab
+    ids = np.array([[vocab.token_to_id[t] for t in tri] for tri in trigrams], dtype=np.int32)
+    w1, w2, w3 = ids[:, 0], ids[:, 1], ids[:, 2]
+    id_triples = ids.tolist()
+
+    def dict_lookups():
+        for a, b, c in trigrams:
+            table[(a, b)].get(c, 0)
+
+    def compact_lookups():
+        for a, b, c in id_triples:
+            store.count(a, b, c)
+
+    def compact_batch_lookups():
+        store.count_batch(w1, w2, w3)
+
+    print()
+    print(f"Corpus: {len(sentences)} sentences, {store.num_contexts} contexts, "
+          f"{store.num_trigrams} distinct trigrams")
+    print(f"{'backend':<10}{'memory':>14}{'bytes/trigram':>16}")
+    for name, nbytes in (("dict", dict_bytes), ("compact", compact_bytes)):
+        print(f"{name:<10}{format_bytes(nbytes):>14}{nbytes / store.num_trigrams:>16.1f}")
+    print(f"memory reduction: {dict_bytes / compact_bytes:.1f}x")
+
+    print()
+    print(f"{args.lookups} lookups (ns per lookup, best of 5):")
+    results = {}
+    for name, fn in (("dict", dict_lookups),
+                     ("compact (one by one)", compact_lookups),
+                     ("compact (batched)", compact_batch_lookups)):
+        results[name] = time_call(fn)["best"] / args.lookups * 1e9
+    dict_ns = results["dict"]
+    for name, ns in results.items():
+        print(f"  {name:<22}{ns:>10.1f} ns   ({dict_ns / ns:.1f}x vs dict)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Decoding latency per strategy on a frozen model trained on FRANKENSTEIN.txt.
+
+    sampling           generate() on the frozen model (count-weighted)
+    greedy             generate(temperature=0)
+    top-k / top-p      generate(top_k=...) / generate(top_p=...)
+    temperature        generate(temperature=...)
+    beam search        beam_search(beam_width=...) from an empty prompt
+
+The count-sorted successor lists are built once before timing (the
+"build" line), so every strategy only slices and searches presorted rows.
+
+Usage:
+    python benchmarks/bench_decoding.py [--samples N] [--max-length N]
+"""
+import argparse
+import contextlib
+import io
+import random
+
+from common import load_training_sentences, time_call
+from src.ngram_model import TrigramModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--max-length", type=int, default=30)
+    args = parser.parse_args()
+
+    model = TrigramModel(backend="compact")
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.fit(load_training_sentences())
+    model.freeze()
+
+    def rebuild():
+        model.tables.decoding = None
+        model._decoding_tables()
+
+    build = time_call(rebuild, repeat=3)["best"]
+    print(f"build count-sorted successor lists: {build * 1e3:.1f} ms")
+
+    strategies = [
+        ("sampling", {}),
+        ("greedy", {"temperature": 0}),
+        ("top-k (k=10)", {"top_k": 10}),
+        ("top-p (p=0.9)", {"top_p": 0.9}),
+        ("temperature 0.7", {"temperature": 0.7}),
+        ("top-k 40 + T 0.8", {"top_k": 40, "temperature": 0.8}),
+    ]
+    print(f"\n{'strategy':<22}{'per sample':>12}{'per token':>12}")
+    for name, options in strategies:
+        random.seed(0)
+        texts = [model.generate(args.max_length, **options) for _ in range(args.samples)]
+        tokens = sum(len(text.split()) + 1 for text in texts)
+
+        def run():
+            random.seed(0)
+            for _ in range(args.samples):
+                model.generate(args.max_length, **options)
+
+        best = time_call(run, repeat=3)["best"]
+        print(f"{name:<22}{best / args.samples * 1e6:>10.1f}us{best / tokens * 1e6:>10.2f}us")
+
+    for width in (1, 5, 10):
+        best = time_call(lambda: model.beam_search(beam_width=width, max_length=args.max_length),
+                         repeat=5)["best"]
+        print(f"{f'beam search (w={width})':<22}{best * 1e6:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
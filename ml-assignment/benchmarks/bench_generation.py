@@ -0,0 +1,51 @@
+"""
+Compares the generation paths of TrigramModel on FRANKENSTEIN.txt:
+
+    generate() on an unfrozen model (rebuilds candidate lists every step)
+    generate() on a frozen model    (precomputed cumulative tables)
+    generate_batch()                (all samples advance in lockstep)
+
+Usage:
+    python benchmarks/bench_generation.py [--samples N]
+"""
+import argparse
+import random
+
+from common import load_training_sentences, time_call
+from src.ngram_model import TrigramModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--max-length", type=int, default=50)
+    args = parser.parse_args()
+
+    sentences = load_training_sentences()
+    results = {}
+    for backend in ("dict", "compact"):
+        model = TrigramModel(backend=backend)
+        model.fit(sentences)
+
+        def generate_loop():
+            random.seed(0)
+            for _ in range(args.samples):
+                model.generate(args.max_length)
+
+        results[f"{backend}: generate()"] = time_call(generate_loop, repeat=3)
+        model.freeze()
+        results[f"{backend}: frozen generate()"] = time_call(generate_loop, repeat=3)
+        results[f"{backend}: generate_batch()"] = time_call(
+            lambda: model.generate_batch(args.samples, args.max_length, seed=0), repeat=3)
+
+    print()
+    print(f"{args.samples} samples, max_length={args.max_length} (best of 3):")
+    baseline = results["dict: generate()"]["best"]
+    for name, timing in results.items():
+        best = timing["best"]
+        print(f"  {name:<28}{best * 1e3:>10.1f} ms  {args.samples / best:>10.0f} samples/s"
+              f"  ({baseline / best:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
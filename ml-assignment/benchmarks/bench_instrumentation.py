@@ -0,0 +1,57 @@
+"""
+Overhead of the opt-in instrumentation layer (src/instrumentation.py).
+
+Runs the preprocessing pipeline, fit and generate on FRANKENSTEIN.txt with
+instrumentation off (the default) and on, and prints the recorded metrics
+summary of the instrumented run.
+
+Usage:
+    python benchmarks/bench_instrumentation.py [--samples N]
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+
+import pandas as pd
+
+from common import load_lines, time_call
+from data.data_preprocessing import preprocess_dataframe, prepare_ngrams
+from src.instrumentation import Metrics
+from src.ngram_model import TrigramModel
+
+
+def pipeline(lines, metrics):
+    df = preprocess_dataframe(pd.DataFrame(lines, columns=["text"]), "text", metrics=metrics)
+    sentences = prepare_ngrams(df, "text", metrics=metrics)["tokens"].tolist()
+    model = TrigramModel(backend="compact", metrics=metrics)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.fit(sentences)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5000)
+    args = parser.parse_args()
+
+    lines = load_lines()
+    for name, metrics in (("off", None), ("on", Metrics())):
+        model = pipeline(lines, metrics)
+        train = time_call(lambda: pipeline(lines, metrics), repeat=3)["best"]
+
+        def generate_loop():
+            random.seed(0)
+            for _ in range(args.samples):
+                model.generate()
+
+        generate = time_call(generate_loop, repeat=3)["best"]
+        print(f"instrumentation {name:<4} pipeline {train * 1e3:8.1f} ms   "
+              f"generate {generate / args.samples * 1e6:7.1f} us/sample")
+
+    print(json.dumps(metrics.summary(), indent=2, default=float))
+
+
+if __name__ == "__main__":
+    main()
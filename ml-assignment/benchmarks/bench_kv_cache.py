@@ -0,0 +1,66 @@
+"""
+Per-token decode latency of MultiHeadAttention with and without a KV cache.
+
+After a prompt of --prompt tokens, --steps more tokens are decoded one at a
+time. Without a cache every step re-runs causal attention over the whole
+sequence (O(seq^2)); with the cache only the new token's query attends over
+the cached keys/values (O(seq)).
+
+Usage:
+    python benchmarks/bench_kv_cache.py [--d-model 256] [--heads 8] [--steps 64]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from common import PROJECT_DIR
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "attention_implementation"))
+from multi_head_attention import MultiHeadAttention  # noqa: E402
+
+
+def decode_latencies(mha, prompt, tokens, use_cache):
+    """Seconds spent producing each of the new tokens' outputs."""
+    latencies = []
+    if use_cache:
+        cache = mha.init_cache(prompt.shape[0], prompt.shape[1] + tokens.shape[1])
+        mha(prompt, causal=True, cache=cache)
+        for t in range(tokens.shape[1]):
+            start = time.perf_counter()
+            mha(tokens[:, [t]], cache=cache)
+            latencies.append(time.perf_counter() - start)
+    else:
+        sequence = prompt
+        for t in range(tokens.shape[1]):
+            start = time.perf_counter()
+            sequence = np.concatenate([sequence, tokens[:, [t]]], axis=1)
+            mha(sequence, causal=True)[0][:, -1]
+            latencies.append(time.perf_counter() - start)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--d-model", type=int, default=256)
+    parser.add_argument("--heads", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=64)
+    parser.add_argument("--prompt", type=int, nargs="+", default=[128, 512, 2048])
+    args = parser.parse_args()
+
+    mha = MultiHeadAttention(args.d_model, args.heads, seed=0)
+    rng = np.random.default_rng(0)
+    print(f"{'prompt':>7}  {'mode':<10}{'mean':>10}{'p50':>10}{'p99':>10}  (ms per token)")
+    for length in args.prompt:
+        prompt = rng.standard_normal((1, length, args.d_model))
+        tokens = rng.standard_normal((1, args.steps, args.d_model))
+        for name, use_cache in (("no cache", False), ("kv cache", True)):
+            ms = decode_latencies(mha, prompt, tokens, use_cache) * 1e3
+            print(f"{length:>7}  {name:<10}{ms.mean():>10.3f}{np.percentile(ms, 50):>10.3f}"
+                  f"{np.percentile(ms, 99):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Start-up cost of a generation worker: retrain vs TrigramModel.load().
+
+Trains a compact model on FRANKENSTEIN.txt replicated --scale times, saves
+it, and then times (in fresh processes, best of --repeat) how long it
+takes until the first sentence is generated when the worker
+    retrains from the raw text (stream_training_sentences + fit_stream),
+    loads the saved file into memory (mmap=False),
+    memory-maps the saved file (mmap=True).
+
+Usage:
+    python benchmarks/bench_model_io.py [--scale N] [--repeat N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import PROJECT_DIR, format_bytes, load_lines
+from data.data_preprocessing import stream_training_sentences
+from src.ngram_model import TrigramModel
+
+WORKER = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {project!r})
+from src.ngram_model import TrigramModel
+imported = time.perf_counter()
+{setup}
+model.generate()
+print(imported - start, time.perf_counter() - imported)
+"""
+
+SETUPS = {
+    "retrain": "from data.data_preprocessing import stream_training_sentences\n"
+               "import contextlib, io\n"
+               "model = TrigramModel(backend='compact')\n"
+               "with contextlib.redirect_stdout(io.StringIO()):\n"
+               "    model.fit_stream(stream_training_sentences({corpus!r}))",
+    "load (mmap=False)": "model = TrigramModel.load({model!r}, mmap=False)",
+    "load (mmap=True)": "model = TrigramModel.load({model!r}, mmap=True)",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "corpus.txt")
+        with open(corpus, "w", encoding="utf-8") as f:
+            f.write("\n".join(load_lines(args.scale)))
+        model_path = os.path.join(tmp, "model.bin")
+        model = TrigramModel(backend="compact")
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.fit_stream(stream_training_sentences(corpus))
+        model.save(model_path)
+        print(f"corpus {format_bytes(os.path.getsize(corpus))}, "
+              f"model file {format_bytes(os.path.getsize(model_path))}")
+
+        print(f"{'worker start-up':<20}{'import':>10}{'ready + 1st sample':>22}")
+        for name, setup in SETUPS.items():
+            code = WORKER.format(project=PROJECT_DIR,
+                                 setup=setup.format(corpus=corpus, model=model_path))
+            runs = []
+            for _ in range(args.repeat):
+                out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                                     text=True, check=True).stdout.split()
+                runs.append((float(out[0]), float(out[1])))
+            import_s, ready_s = min(runs, key=lambda run: run[1])
+            print(f"{name:<20}{import_s * 1e3:>8.1f} ms{ready_s * 1e3:>19.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
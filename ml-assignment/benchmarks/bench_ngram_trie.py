@@ -0,0 +1,90 @@
+"""
+One NGramTrie versus one dictionary per order: memory and lookup speed.
+
+Trains on FRANKENSTEIN.txt padded for order --n and builds, for every order
+k = 1..n, the dict layout TrigramModel uses for k = 3 (context tuple ->
+Counter of next words). Then looks up the successors of --queries contexts
+of every length (contexts taken from the corpus, so all of them exist):
+    dict          orders[k].get(context)
+    trie          NGramTrie.find + children, one context at a time
+    trie (batch)  NGramTrie.find_batch over all contexts at once
+
+Usage:
+    python benchmarks/bench_ngram_trie.py [--n 4] [--queries N]
+"""
+import argparse
+import contextlib
+import io
+import random
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from common import format_bytes, load_lines, time_call
+from data.data_preprocessing import preprocess_dataframe, prepare_ngrams
+from src.ngram_model import NGramModel
+from src.utils import estimate_nested_counts_bytes, estimate_vocab_bytes
+
+
+def per_order_dicts(sentences, n):
+    orders = {}
+    for k in range(1, n + 1):
+        counts = defaultdict(Counter)
+        for sentence in sentences:
+            for i in range(len(sentence) - k + 1):
+                counts[tuple(sentence[i:i + k - 1])][sentence[i + k - 1]] += 1
+        orders[k] = counts
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    df = preprocess_dataframe(pd.DataFrame(load_lines(), columns=["text"]), "text")
+    sentences = prepare_ngrams(df, "text", n=args.n)["tokens"].tolist()
+
+    orders = per_order_dicts(sentences, args.n)
+    model = NGramModel(args.n)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.fit(sentences)
+    trie = model.trie
+
+    dict_bytes = sum(estimate_nested_counts_bytes(counts) for counts in orders.values())
+    trie_bytes = trie.nbytes + estimate_vocab_bytes(model.vocab)
+    print(f"order {args.n}: {sum(trie.num_nodes(k) for k in range(1, args.n + 1))} n-grams of all orders")
+    print(f"  per-order dicts  {format_bytes(dict_bytes):>12}")
+    print(f"  one trie         {format_bytes(trie_bytes):>12}  ({dict_bytes / trie_bytes:.1f}x smaller)")
+
+    rng = random.Random(0)
+    token_to_id = model.vocab.token_to_id
+    print(f"\nsuccessor lookups, {args.queries} contexts per length (us per lookup):")
+    print(f"  {'context':<10}{'dict':>10}{'trie':>10}{'trie (batch)':>14}")
+    for length in range(1, args.n):
+        contexts = []
+        while len(contexts) < args.queries:
+            sentence = rng.choice(sentences)
+            if len(sentence) > length:
+                i = rng.randrange(len(sentence) - length)
+                contexts.append(tuple(sentence[i:i + length]))
+        ids = np.array([[token_to_id[t] for t in context] for context in contexts])
+        table = orders[length + 1]
+
+        def dict_lookups():
+            for context in contexts:
+                table.get(context)
+
+        def trie_lookups():
+            for row in ids.tolist():
+                trie.children(trie.find(row), length)
+
+        timings = [time_call(fn, repeat=3)["best"] / args.queries * 1e6
+                   for fn in (dict_lookups, trie_lookups, lambda: trie.find_batch(ids))]
+        print(f"  {length:<10}{timings[0]:>10.2f}{timings[1]:>10.2f}{timings[2]:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
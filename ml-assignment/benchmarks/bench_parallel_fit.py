@@ -0,0 +1,60 @@
+"""
+Scaling benchmark for TrigramModel.fit(sentences, n_jobs=...).
+
+Trains on FRANKENSTEIN.txt replicated --scale times with 1/2/4/8 worker
+processes, checks that every parallel model equals the serial one and
+reports wall time and speedup.
+
+Usage:
+    python benchmarks/bench_parallel_fit.py [--scale N] [--workers 1 2 4 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+
+import numpy as np
+
+from common import load_training_sentences, time_call
+from src.ngram_model import TrigramModel
+
+
+def fit(backend, sentences, n_jobs):
+    model = TrigramModel(backend=backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.fit(sentences, n_jobs=n_jobs)
+    return model
+
+
+def same_model(a, b):
+    if a.backend == 'compact':
+        return a.vocab.id_to_token == b.vocab.id_to_token and all(
+            np.array_equal(getattr(a.store, name), getattr(b.store, name))
+            for name in ('context_keys', 'offsets', 'successors', 'counts'))
+    return list(a.model.items()) == list(b.model.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    sentences = load_training_sentences(args.scale)
+    tokens = sum(len(s) for s in sentences)
+    print(f"\n{len(sentences)} sentences, {tokens} tokens, {os.cpu_count()} CPUs available")
+
+    for backend in ("dict", "compact"):
+        reference = fit(backend, sentences, 1)
+        print(f"\nbackend={backend}")
+        baseline = None
+        for n_jobs in args.workers:
+            assert same_model(reference, fit(backend, sentences, n_jobs)), "parallel fit differs"
+            best = time_call(lambda: fit(backend, sentences, n_jobs), repeat=3)["best"]
+            baseline = baseline or best
+            print(f"  workers={n_jobs:<3}{best:>8.2f} s  {tokens / best / 1e6:>6.2f} M tokens/s"
+                  f"  speedup {baseline / best:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
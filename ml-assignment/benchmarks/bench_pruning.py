@@ -0,0 +1,60 @@
+"""
+Memory footprint versus quality for the count pruning policies.
+
+Trains a compact model on FRANKENSTEIN.txt (replicated --scale times), applies
+each policy to a fresh copy and reports what it removed, the resulting memory
+footprint and the perplexity on the training text (Kneser-Ney backs off to
+lower orders, so pruned trigrams cost probability but never make it zero).
+
+Usage:
+    python benchmarks/bench_pruning.py [--scale N]
+"""
+import argparse
+import contextlib
+import io
+
+from common import format_bytes, load_training_sentences
+from src.ngram_model import TrigramModel
+
+
+POLICIES = [
+    ("none", {}),
+    ("min_count=2", {"min_count": 2}),
+    ("min_count=3", {"min_count": 3}),
+    ("top_k=5", {"top_k": 5}),
+    ("top_k=1", {"top_k": 1}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    args = parser.parse_args()
+
+    sentences = load_training_sentences(args.scale)
+    full = TrigramModel(backend="compact")
+    with contextlib.redirect_stdout(io.StringIO()):
+        full.fit(sentences)
+    dict_model = TrigramModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dict_model.fit(sentences)
+    print(f"dict backend: {format_bytes(dict_model.memory_footprint())}, "
+          f"{dict_model.num_contexts} contexts, {dict_model.num_trigrams} trigrams")
+
+    policies = list(POLICIES)
+    for fraction in (0.5, 0.25):
+        cap = int(full.store.nbytes * fraction)
+        policies.append((f"max_bytes={format_bytes(cap)}", {"max_bytes": cap}))
+
+    print(f"{'policy':<22}{'contexts -':>12}{'trigrams -':>12}{'memory':>14}{'perplexity':>12}")
+    for name, kwargs in policies:
+        model = TrigramModel(backend="compact")
+        model.vocab, model.store = full.vocab, full.store
+        before = (model.num_contexts, model.num_trigrams)
+        model.prune(**kwargs)
+        print(f"{name:<22}{before[0] - model.num_contexts:>12}{before[1] - model.num_trigrams:>12}"
+              f"{format_bytes(model.memory_footprint()):>14}{model.perplexity(sentences):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Scoring throughput of the Kneser-Ney API (tokens per second).
+
+Trains on FRANKENSTEIN.txt, then scores the training sentences replicated
+--scale times:
+    score_ids    sentences already encoded as flat ID arrays
+    score_batch  list of token lists (includes encoding them)
+    logprob      one call per sentence
+
+Usage:
+    python benchmarks/bench_scoring.py [--scale N]
+"""
+import argparse
+import contextlib
+import io
+
+from common import load_training_sentences, time_call
+from src.ngram_model import TrigramModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    args = parser.parse_args()
+
+    sentences = load_training_sentences()
+    model = TrigramModel(backend="compact")
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.fit(sentences)
+    build = time_call(model._scoring_tables, repeat=1)["best"]
+    scoring = model._scoring_tables()
+
+    texts = sentences * args.scale
+    ids, offsets = scoring.encode_sentences(texts)
+    tokens = int(scoring.score_ids(ids, offsets)[1].sum())
+    few = texts[:2000]
+    few_tokens = int(scoring.score_ids(*scoring.encode_sentences(few))[1].sum())
+
+    print(f"tables built in {build * 1e3:.1f} ms; scoring {len(texts)} sentences, {tokens} tokens")
+    for name, fn, n in (
+            ("score_ids", lambda: scoring.score_ids(ids, offsets), tokens),
+            ("score_batch", lambda: model.score_batch(texts), tokens),
+            ("logprob (per sentence)", lambda: [model.logprob(t) for t in few], few_tokens)):
+        best = time_call(fn, repeat=3)["best"]
+        print(f"  {name:<24}{n / best / 1e6:>8.2f} M tokens/s")
+    print(f"perplexity on the training text: {model.perplexity(sentences):.2f}")
+
+
+if __name__ == "__main__":
+    main()
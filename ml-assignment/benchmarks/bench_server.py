@@ -0,0 +1,106 @@
+"""
+Load test for src/server.py: request coalescing and multi-worker mode.
+
+Trains a compact model on FRANKENSTEIN.txt, saves it, starts the server
+on a Unix socket with each configuration below and fires --requests
+generate requests (n=1) from --clients concurrent keep-alive connections:
+    --max-batch 1       no coalescing, one generate_batch() call per request,
+    default batching    requests within 2 ms share one call,
+    --workers 2         two forked processes sharing the mmap-ed model.
+Reports throughput, client-side latency percentiles and the mean batch
+size the server saw.
+
+Usage:
+    python benchmarks/bench_server.py [--clients 64] [--requests 2000]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import PROJECT_DIR, load_training_sentences
+from src.ngram_model import TrigramModel
+from src.server import request
+
+CONFIGS = {
+    "no batching": ["--max-batch", "1"],
+    "batching": [],
+    "batching, 2 workers": ["--workers", "2"],
+}
+
+
+async def wait_for_socket(path, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            _, writer = await asyncio.open_unix_connection(path)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError(f"server did not start on {path}")
+
+
+async def load_test(path, clients, requests):
+    latencies = []
+    batch_sizes = {}
+    per_client = requests // clients
+
+    async def client():
+        reader, writer = await asyncio.open_unix_connection(path)
+        for _ in range(per_client):
+            start = time.perf_counter()
+            await request(reader, writer, "POST", "/generate", {"n": 1, "max_length": 30})
+            latencies.append(time.perf_counter() - start)
+        # Each worker keeps its own statistics; collect whichever answer
+        _, stats = await request(reader, writer, "GET", "/stats")
+        batch_sizes[stats["pid"]] = stats["generate_mean_batch_size"]
+        writer.close()
+
+    await wait_for_socket(path)
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, np.array(latencies) * 1e3, batch_sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model.bin")
+        model = TrigramModel(backend="compact")
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.fit(load_training_sentences())
+        model.save(model_path)
+        print(f"{args.clients} clients, {args.requests} generate requests, {os.cpu_count()} CPU(s)\n")
+        print(f"{'configuration':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}  mean batch size per worker")
+
+        for name, options in CONFIGS.items():
+            socket_path = os.path.join(tmp, "server.sock")
+            server = subprocess.Popen(
+                [sys.executable, "-m", "src.server", "--model", model_path, "--unix", socket_path] + options,
+                cwd=PROJECT_DIR, stdout=subprocess.DEVNULL)
+            try:
+                throughput, latencies, batch_sizes = asyncio.run(
+                    load_test(socket_path, args.clients, args.requests))
+            finally:
+                server.terminate()
+                server.wait()
+            sizes = ", ".join(f"{size:.1f}" for size in batch_sizes.values())
+            print(f"{name:<22}{throughput:>10,.0f}{np.percentile(latencies, 50):>10.2f}"
+                  f"{np.percentile(latencies, 99):>10.2f}  {sizes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Peak memory of the DataFrame training path vs the streaming path.
+
+Writes FRANKENSTEIN.txt replicated --scale times to a temporary file, then
+measures (with tracemalloc) the peak memory of
+    DataFrame:  read lines -> preprocess_dataframe -> prepare_ngrams -> fit
+    streaming:  stream_training_sentences -> fit_stream
+for both model backends.
+
+Usage:
+    python benchmarks/bench_streaming.py [--scale N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from common import format_bytes, load_lines
+from data.data_preprocessing import preprocess_dataframe, prepare_ngrams, stream_training_sentences
+from src.ngram_model import TrigramModel
+
+
+def dataframe_path(path, backend):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    df = preprocess_dataframe(pd.DataFrame(lines, columns=["text"]), "text")
+    model = TrigramModel(backend=backend)
+    model.fit(prepare_ngrams(df, "text", n=3)["tokens"])
+    return model
+
+
+def streaming_path(path, backend):
+    model = TrigramModel(backend=backend)
+    model.fit_stream(stream_training_sentences(path, n=3))
+    return model
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(load_lines(args.scale)))
+        print(f"corpus: {format_bytes(os.path.getsize(path))}")
+
+        for backend in ("dict", "compact"):
+            for name, fn in (("DataFrame", dataframe_path), ("streaming", streaming_path)):
+                peak, elapsed = measure(fn, path, backend)
+                print(f"  {backend:<8}{name:<11} peak {format_bytes(peak):>12}  {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Load-time benchmark: training_data.csv + ast.literal_eval vs the token corpus.
+
+Writes the padded FRANKENSTEIN.txt sentences (replicated --scale times) in
+both formats, then times loading each one and training a compact model
+from it.
+
+Usage:
+    python benchmarks/bench_token_corpus.py [--scale N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+
+import pandas as pd
+
+from common import format_bytes, load_training_sentences, time_call
+from data.token_corpus import load_token_corpus, save_token_corpus
+from src.ngram_model import TrigramModel, load_training_data
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    args = parser.parse_args()
+
+    sentences = load_training_sentences(args.scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "training_data.csv")
+        corpus_dir = os.path.join(tmp, "training_data")
+        pd.DataFrame({"tokens": sentences}).to_csv(csv_path, index=False)
+        save_token_corpus(sentences, corpus_dir)
+        print(f"{len(sentences)} sentences: CSV {format_bytes(os.path.getsize(csv_path))}, "
+              f"token corpus {format_bytes(dir_size(corpus_dir))}")
+
+        missing = os.path.join(tmp, "missing")
+        loaders = {
+            "CSV + literal_eval": lambda: load_training_data(missing, csv_path),
+            "token corpus (read)": lambda: load_token_corpus(corpus_dir, mmap=False),
+            "token corpus (mmap)": lambda: load_token_corpus(corpus_dir, mmap=True),
+        }
+
+        def train(load):
+            model = TrigramModel(backend="compact")
+            with contextlib.redirect_stdout(io.StringIO()):
+                model.fit(load())
+
+        print(f"{'':<22}{'load':>12}{'load + fit':>14}")
+        base = None
+        for name, load in loaders.items():
+            load_s = time_call(load)["best"]
+            fit_s = time_call(lambda: train(load), repeat=3)["best"]
+            base = base or load_s
+            print(f"{name:<22}{load_s * 1e3:>9.1f} ms{fit_s * 1e3:>11.1f} ms"
+                  f"   load {base / load_s:,.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Every benchmark runs fully offline on FRANKENSTEIN.txt (optionally
+replicated to simulate a bigger corpus).
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Make `src` and `data` importable when a benchmark is run as a script
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+from data.data_preprocessing import preprocess_dataframe, prepare_ngrams  # noqa: E402
+from src.utils import format_bytes  # noqa: E402,F401
+
+CORPUS_PATH = os.path.join(os.path.dirname(PROJECT_DIR), "FRANKENSTEIN.txt")
+
+
+def load_lines(scale=1):
+    """Returns the non-empty lines of FRANKENSTEIN.txt, replicated `scale` times."""
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return lines * scale
+
+
+def load_training_sentences(scale=1):
+    """Runs the normal preprocessing pipeline and returns padded token lists."""
+    df = pd.DataFrame(load_lines(scale), columns=["text"])
+    df = preprocess_dataframe(df, "text")
+    return prepare_ngrams(df, "text", n=3)["tokens"].tolist()
+
+
+def time_call(fn, repeat=5):
+    """
+    Calls `fn` `repeat` times and returns a dict with the timings in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings)
+    return {
+        "best": float(timings.min()),
+        "mean": float(timings.mean()),
+        "p50": float(np.percentile(timings, 50)),
+        "p90": float(np.percentile(timings, 90)),
+        "p99": float(np.percentile(timings, 99)),
+    }
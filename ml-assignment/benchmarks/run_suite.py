@@ -0,0 +1,231 @@
+"""
+Reproducible benchmark suite: preprocessing, training, generation and attention.
+
+Times preprocess_dataframe, prepare_ngrams, TrigramModel.fit and
+TrigramModel.generate on FRANKENSTEIN.txt replicated --scales times, and
+scaled_dot_product_attention over a range of sequence lengths. Everything
+runs offline.
+
+Each case runs in a fresh Python process so its peak RSS is its own:
+`setup_peak_rss_bytes` is the peak after building the inputs (e.g. loading
+and cleaning the corpus for a fit case) and `peak_rss_bytes` the peak after
+the measured calls. Results (latency percentiles, throughput, peak RSS and
+the commit/machine they were measured on) are written as JSON; pass an older
+file to --compare to print the speedup of every case.
+
+Usage:
+    python benchmarks/run_suite.py [--scales 1 10 100] [--backends dict compact]
+                                   [--seq 128 512 1024 2048]
+                                   [--repeat 3] [--output FILE] [--compare OLD.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import PROJECT_DIR, format_bytes, load_lines, load_training_sentences, time_call
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# ru_maxrss is in KiB on Linux and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+# generate cases time GENERATE_SAMPLES single-sample calls per repeat
+GENERATE_SAMPLES = 1000
+GENERATE_MAX_LENGTH = 50
+ATTENTION_BATCH, ATTENTION_DIM = 4, 64
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+
+# ------------------------------------------------------------------
+# Cases. Each one builds its inputs and returns (call, units): `call` is
+# the operation being timed and `units` maps a throughput name to the
+# amount of work one call does.
+# ------------------------------------------------------------------
+
+def quiet(fn, *args):
+    """Runs fn(*args) without its progress prints."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def case_preprocess_dataframe(scale):
+    from data.data_preprocessing import preprocess_dataframe
+
+    lines = load_lines(scale)
+    df = pd.DataFrame(lines, columns=["text"])
+    n_bytes = sum(len(line.encode("utf-8")) for line in lines)
+    # preprocess_dataframe cleans the column in place, so every call gets a
+    # fresh copy of the raw frame (copying the object column costs < 1% of cleaning)
+    return (lambda: preprocess_dataframe(df.copy(), "text")), {"lines": len(lines), "MB": n_bytes / 1e6}
+
+
+def case_prepare_ngrams(scale):
+    from data.data_preprocessing import preprocess_dataframe, prepare_ngrams
+
+    df = preprocess_dataframe(pd.DataFrame(load_lines(scale), columns=["text"]), "text")
+    return (lambda: prepare_ngrams(df, "text", n=3)), {"sentences": len(df)}
+
+
+def case_fit(scale, backend):
+    from src.ngram_model import TrigramModel
+
+    sentences = load_training_sentences(scale)
+    tokens = sum(len(sentence) for sentence in sentences)
+    return (lambda: quiet(TrigramModel(backend=backend).fit, sentences),
+            {"sentences": len(sentences), "tokens": tokens})
+
+
+def case_generate(scale, backend):
+    from src.ngram_model import TrigramModel
+
+    model = TrigramModel(backend=backend)
+    quiet(model.fit, load_training_sentences(scale))
+    random.seed(0)
+    # One call is one sample, so the percentiles are per-sample latencies
+    return (lambda: model.generate(GENERATE_MAX_LENGTH)), {"samples": 1}
+
+
+def case_attention(seq):
+    sys.path.insert(0, os.path.join(PROJECT_DIR, "attention_implementation"))
+    from attention_task import scaled_dot_product_attention
+
+    rng = np.random.default_rng(0)
+    Q, K, V = (rng.standard_normal((ATTENTION_BATCH, seq, ATTENTION_DIM)) for _ in range(3))
+    return (lambda: scaled_dot_product_attention(Q, K, V)), {"queries": ATTENTION_BATCH * seq}
+
+
+CASES = {
+    "preprocess_dataframe": case_preprocess_dataframe,
+    "prepare_ngrams": case_prepare_ngrams,
+    "fit": case_fit,
+    "generate": case_generate,
+    "scaled_dot_product_attention": case_attention,
+}
+
+
+def run_case(stage, params, calls):
+    """Builds one case in this process, times `calls` calls and returns its record."""
+    call, units = CASES[stage](**params)
+    setup_peak = peak_rss()
+
+    latency = time_call(call, repeat=calls)
+    return {
+        "stage": stage,
+        "params": params,
+        "calls": calls,
+        "latency_s": latency,
+        "throughput_per_s": {name: amount / latency["mean"] for name, amount in units.items()},
+        "setup_peak_rss_bytes": setup_peak,
+        "peak_rss_bytes": peak_rss(),
+    }
+
+
+def plan(args):
+    """Every (stage, params, calls) the suite runs."""
+    cases = []
+    for scale in args.scales:
+        cases.append(("preprocess_dataframe", {"scale": scale}, args.repeat))
+        cases.append(("prepare_ngrams", {"scale": scale}, args.repeat))
+        for backend in args.backends:
+            cases.append(("fit", {"scale": scale, "backend": backend}, args.repeat))
+            cases.append(("generate", {"scale": scale, "backend": backend},
+                          args.repeat * GENERATE_SAMPLES))
+    for seq in args.seq:
+        cases.append(("scaled_dot_product_attention", {"seq": seq}, args.repeat * 5))
+    return cases
+
+
+def run_in_subprocess(stage, params, calls):
+    """Runs one case in a fresh interpreter, so peak RSS is not shared between cases."""
+    command = [sys.executable, os.path.abspath(__file__), "--case",
+               json.dumps({"stage": stage, "params": params, "calls": calls})]
+    result = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_DIR, check=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def case_key(record):
+    return record["stage"], json.dumps(record["params"], sort_keys=True)
+
+
+def compare(results, old_path):
+    """Prints mean-latency speedups against an older results file."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {case_key(record): record for record in json.load(f)["results"]}
+    print(f"\nspeedup vs {old_path} (old mean / new mean):")
+    for record in results:
+        before = old.get(case_key(record))
+        if before is None:
+            continue
+        ratio = before["latency_s"]["mean"] / record["latency_s"]["mean"]
+        print(f"  {record['stage']:<30}{case_key(record)[1]:<40}{ratio:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--backends", nargs="+", default=["dict", "compact"])
+    parser.add_argument("--seq", type=int, nargs="+", default=[128, 512, 1024, 2048])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="JSON file to write (default: results/suite-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        case = json.loads(args.case)
+        print(json.dumps(run_case(case["stage"], case["params"], case["calls"])))
+        return
+
+    meta = metadata()
+    results = []
+    for stage, params, calls in plan(args):
+        record = run_in_subprocess(stage, params, calls)
+        results.append(record)
+        throughput = ", ".join(f"{value:,.0f} {name}/s" for name, value in record["throughput_per_s"].items())
+        print(f"{stage:<30}{json.dumps(params):<38}p50 {record['latency_s']['p50'] * 1e3:>10.2f} ms"
+              f"  {throughput}  peak RSS {format_bytes(record['peak_rss_bytes'])}", flush=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{(meta['git_commit'] or 'local')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
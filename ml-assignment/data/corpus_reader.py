@@ -0,0 +1,260 @@
+"""
+Parallel, chunked reader for large raw text files.
+
+The file is cut into byte ranges of about `chunk_bytes` that end on a
+paragraph break (a blank line) or, if there is none nearby, on a line break,
+so that no sentence or line is split between two chunks. Each chunk is then
+read, segmented into sentences, cleaned and tokenized by a process pool, and
+the results come back in file order:
+
+    for sentence in parallel_training_sentences("FRANKENSTEIN.txt", n_jobs=4):
+        ...                                    # ['<s>', '<s>', 'it', 'was', ..., '</s>']
+    model.fit_stream(parallel_training_sentences(path, n_jobs=4))
+
+Like stream_training_sentences this makes two passes over the file (word
+counts for the <UNK> vocabulary, then padded sentences), holding only a few
+chunks in memory at a time.
+"""
+import io
+import os
+import re
+from collections import Counter, deque
+
+from data.data_preprocessing import preprocess_text_fast
+
+DEFAULT_CHUNK_BYTES = 1 << 20
+
+# A sentence ends at '.', '!' or '?' (plus closing quotes/brackets) followed by
+# whitespace or the end of the paragraph.
+SENTENCE_PATTERN = re.compile(r'\S.*?(?:[.!?]+["\'”’)\]]*(?=\s|$)|$)', re.S)
+PARAGRAPH_BREAK = re.compile(r'\n[ \t\r]*\n')
+# Sentences ending with one of these words continue with the next one
+ABBREVIATIONS = {'mr.', 'mrs.', 'ms.', 'dr.', 'st.', 'prof.', 'sr.', 'jr.', 'vs.', 'etc.', 'e.g.', 'i.e.'}
+
+SEGMENTS = ('sentence', 'line')
+
+
+def split_sentences(text):
+    """
+    Rule-based sentence segmentation of raw text.
+
+    Paragraphs (separated by blank lines) are unwrapped into one line each
+    and split after sentence-ending punctuation; a sentence never spans two
+    paragraphs, so headings stay on their own.
+
+    Returns:
+        list of str: The sentences, whitespace-normalized.
+    """
+    sentences = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = ' '.join(paragraph.split())
+        pending = ''
+        for match in SENTENCE_PATTERN.finditer(paragraph):
+            sentence = pending + match.group()
+            words = sentence.split()
+            if words and words[-1].lower() in ABBREVIATIONS:
+                pending = sentence + ' '
+                continue
+            pending = ''
+            sentences.append(sentence)
+        if pending:
+            sentences.append(pending.strip())
+    return sentences
+
+
+# Chunk boundaries, searched in raw bytes decoded as latin-1 (one character
+# per byte). Only ASCII whitespace is used: in latin-1, bytes such as \x85 and
+# \xa0 look like whitespace but are parts of multi-byte UTF-8 characters.
+ASCII_SPACE = re.compile(r'[ \t\n\r\f\v]')
+# A word containing '.', '!' or '?' and the whitespace after it
+PUNCTUATED_WORD = re.compile(r'([^ \t\n\r\f\v]*[.!?][^ \t\n\r\f\v]*)[ \t\n\r\f\v]')
+SENTENCE_END = re.compile(r'[.!?]+["\'”’)\]]*$')
+# Bytes read before the proposed end of a range
+LOOK_BEHIND = 64
+
+
+def _ends_sentence(word):
+    """Whether split_sentences ends a sentence after `word` (raw latin-1 text)."""
+    word = word.encode('latin-1').decode('utf-8', errors='ignore')
+    return word.lower() not in ABBREVIATIONS and bool(SENTENCE_END.search(word))
+
+
+def _sentence_boundary(text, pos):
+    """Position right after the first whitespace past `pos` that ends a sentence, or None."""
+    for match in PUNCTUATED_WORD.finditer(text):
+        if match.end() > pos and _ends_sentence(match.group(1)):
+            return match.end()
+    return None
+
+
+def chunk_ranges(path, chunk_bytes=DEFAULT_CHUNK_BYTES, segment='sentence'):
+    """
+    Byte ranges (start, end) covering the file, each about `chunk_bytes`
+    long. Within the next `chunk_bytes` a range ends, in order of preference,
+    right after
+        a paragraph break (a blank line),
+        the end of the file,
+        a sentence end (only for segment='sentence'),
+        a line break,
+        a space,
+    and otherwise before the next UTF-8 character, so that ranges always
+    decode. Unless a single sentence (or line) is longer than `chunk_bytes`,
+    none is split between two ranges, and the segmented output does not
+    depend on `chunk_bytes`.
+    """
+    size = os.path.getsize(path)
+    ranges, start = [], 0
+    with open(path, 'rb') as f:
+        while start < size:
+            end = min(start + chunk_bytes, size)
+            if end < size:
+                # Look ahead (at most another chunk) for the next boundary, and
+                # a little behind, so the word in front of `end` is seen whole
+                back = min(end - start, LOOK_BEHIND)
+                f.seek(end - back)
+                window = f.read(chunk_bytes + back)
+                text = window.decode('latin-1')
+                match = PARAGRAPH_BREAK.search(text, back)
+                if match:
+                    cut = match.end()
+                elif end + len(window) - back >= size:
+                    cut = None
+                else:
+                    cut = _sentence_boundary(text, back) if segment == 'sentence' else None
+                    if cut is None:
+                        newline = text.find('\n', back)
+                        space = ASCII_SPACE.search(text, back)
+                        if newline >= 0:
+                            cut = newline + 1
+                        elif space:
+                            cut = space.end()
+                        else:
+                            # Back up to the first byte of a UTF-8 character
+                            cut = back
+                            while cut > 1 and 0x80 <= window[cut] < 0xC0:
+                                cut -= 1
+                end = size if cut is None else end - back + cut
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_text(path, start, end, encoding='utf-8'):
+    """Decoded text of one byte range."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start).decode(encoding)
+
+
+def read_chunk(path, start, end, segment='sentence', encoding='utf-8'):
+    """
+    Token lists of the sentences (or lines) in one byte range, cleaned with
+    the same rules as preprocess_dataframe. Empty results are skipped.
+    """
+    text = read_text(path, start, end, encoding)
+    if segment == 'line':
+        # StringIO(newline=None) splits lines like a file opened in text mode
+        texts = (line.strip() for line in io.StringIO(text, newline=None))
+    else:
+        texts = split_sentences(text)
+    token_lists = []
+    for text in texts:
+        tokens = preprocess_text_fast(text).split()
+        if tokens:
+            token_lists.append(tokens)
+    return token_lists
+
+
+# ------------------------------------------------------------------
+# Process-pool workers. The vocabulary of pass 2 is sent once per worker
+# process through the pool initializer instead of with every chunk.
+# ------------------------------------------------------------------
+
+_VOCAB = None
+
+
+def _set_vocab(vocab):
+    global _VOCAB
+    _VOCAB = vocab
+
+
+def _count_chunk(task):
+    """
+    Pass 1: word counts of one chunk.
+
+    Cleaning works token by token and sentences and lines only end at
+    whitespace, so cleaning the whole chunk at once gives the same words as
+    cleaning its sentences one by one, without segmenting.
+    """
+    path, start, end, _, encoding = task
+    return Counter(preprocess_text_fast(read_text(path, start, end, encoding)).split())
+
+
+def _unk_chunk(task):
+    """
+    Pass 2: the sentences of one chunk with words outside _VOCAB replaced by
+    <UNK>, as one newline-separated string (a single str pickles far faster
+    than a list of token lists; the parent splits and pads it).
+    """
+    return '\n'.join(' '.join(token if token in _VOCAB else '<UNK>' for token in tokens)
+                     for tokens in read_chunk(*task))
+
+
+def ordered_map(fn, tasks, n_jobs=1, initializer=None, initargs=()):
+    """
+    Yields fn(task) for every task in order. With n_jobs > 1 the calls run
+    in a process pool that keeps at most 2 * n_jobs chunks in flight, so
+    memory stays bounded however large the file is.
+    """
+    if n_jobs <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for task in tasks:
+            yield fn(task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(fn, task))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def parallel_training_sentences(path, n=3, min_count=2, n_jobs=1, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                                segment='sentence', encoding='utf-8'):
+    """
+    Streams the padded training sentences of a raw text file, cleaning and
+    tokenizing its chunks on `n_jobs` processes.
+
+    Args:
+        path (str): Raw text file.
+        n (int): Model order; sentences get n - 1 '<s>' tokens.
+        min_count (int): Words seen fewer times become <UNK>.
+        n_jobs (int): Worker processes (1 = no pool).
+        chunk_bytes (int): Approximate bytes per chunk.
+        segment (str): 'sentence' splits paragraphs into sentences;
+            'line' keeps one sentence per line, exactly like
+            stream_training_sentences.
+        encoding (str): File encoding.
+
+    Yields:
+        list: Padded sentences, in file order.
+    """
+    if segment not in SEGMENTS:
+        raise ValueError(f"segment must be one of {SEGMENTS}, got {segment!r}")
+    tasks = [(path, start, end, segment, encoding) for start, end in chunk_ranges(path, chunk_bytes, segment)]
+
+    word_counts = Counter()
+    for counts in ordered_map(_count_chunk, tasks, n_jobs):
+        word_counts.update(counts)
+    vocab = {word for word, count in word_counts.items() if count >= min_count}
+
+    padding_start, padding_end = ['<s>'] * (n - 1), ['</s>']
+    for text in ordered_map(_unk_chunk, tasks, n_jobs, _set_vocab, (vocab,)):
+        for sentence in text.split('\n') if text else ():
+            yield padding_start + sentence.split() + padding_end
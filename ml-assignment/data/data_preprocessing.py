@@ -1,21 +1,116 @@
-import nltk
+import io
+import json
 import re
-import pandas as pd
 import os
+import shutil
 import string
 from collections import Counter
+from itertools import chain
+from data.preprocessing_cache import DEFAULT_MAX_BYTES, PreprocessingCache, hash_bytes, split_chunks
+from data.token_corpus import TokenCorpus, save_token_corpus
+from src.count_store import BOS, BOS_ID, EOS, EOS_ID, ID_DTYPE, UNK, UNK_ID
+from src.instrumentation import NULL_METRICS
+# pandas (and nltk, if the stop-word / lemmatization steps below are turned
+# back on) are imported inside the functions that use them: the streaming
+# path and the CLI must not pay their import time at start-up.
+#import nltk
 #from nltk.corpus import stopwords
 #from nltk.stem import WordNetLemmatizer
 #nltk.download('wordnet')
 #nltk.download('stopwords')
 
-def preprocess_dataframe(df, col='text'):
+def preprocess_text(text):
+    """Helper function to preprocess a single text string."""
+    # Remove URLs
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    # Remove numbers
+    text = ''.join([char for char in text if not char.isdigit()])
+    # Convert to lowercase
+    text = text.lower()
+    # Remove punctuations
+    text = re.sub('[%s]' % re.escape(string.punctuation), ' ', text)
+    text = text.replace('؛', "")
+    text = re.sub(r'\s+', ' ', text).strip()
+    # Remove stop words
+    #text = " ".join([word for word in text.split() if word not in stop_words])
+    # Lemmatization
+    #text = " ".join([lemmatizer.lemmatize(word) for word in text.split()])
+    return text
+
+# ==========================================
+# Fast cleaning engine
+# ==========================================
+# preprocess_text_fast produces exactly the same output as preprocess_text
+# (checked for every Unicode code point, alone and next to cased letters, in
+# tests/test_cleaning.py):
+#   - the URL regex is compiled once
+#   - digit removal, punctuation -> space and '؛' removal are fused into a
+#     single str.translate pass after .lower() (no character in Unicode
+#     becomes a digit or punctuation when lowercased)
+#   - except that non-ASCII text first gets a digit-only translate pass:
+#     lowercasing is context-sensitive (a final 'Σ' becomes 'ς' only when no
+#     letter follows it), so digits must be gone before .lower() runs, as in
+#     the original; e.g. "a9Σ" -> "aς", not "aσ". ASCII text lowercases
+#     character by character and skips that pass.
+#   - ' '.join(text.split()) collapses whitespace like re.sub(r'\s+', ' ').strip()
+
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+
+class _DigitTable(dict):
+    """
+    str.translate table that deletes digits and keeps everything else. Any
+    character not in the table yet is classified on first sight and cached,
+    so each distinct character is checked once.
+    """
+    def __missing__(self, codepoint):
+        value = None if chr(codepoint).isdigit() else codepoint
+        self[codepoint] = value
+        return value
+
+DIGIT_TABLE = _DigitTable()
+# Digits (classified lazily as above), punctuation and '؛'
+CLEANING_TABLE = _DigitTable({ord(char): ' ' for char in string.punctuation})
+CLEANING_TABLE[ord('؛')] = None
+
+# Identifies the cleaning rules in the preprocessing cache keys
+# (data/preprocessing_cache.py): bump the version whenever the output of
+# preprocess_text_fast changes, so that stale cleaned chunks are not reused.
+CLEANING_OPTIONS = {'function': 'preprocess_text_fast', 'version': 2}
+
+def preprocess_text_fast(text):
+    """Same result as preprocess_text, computed in three or four C-level passes."""
+    text = URL_PATTERN.sub('', text)
+    if not text.isascii():
+        text = text.translate(DIGIT_TABLE)
+    return ' '.join(text.lower().translate(CLEANING_TABLE).split())
+
+def _clean_chunk(texts):
+    """Process-pool worker: cleans one chunk of texts."""
+    return [preprocess_text_fast(text) for text in texts]
+
+def clean_texts(texts, n_jobs=1, chunk_size=10_000):
+    """
+    Cleans a list of texts with preprocess_text_fast, optionally spreading
+    chunks of `chunk_size` texts across `n_jobs` processes (order is kept).
+    """
+    texts = list(texts)
+    if n_jobs <= 1 or len(texts) <= chunk_size:
+        return _clean_chunk(texts)
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return [text for chunk in pool.map(_clean_chunk, chunks) for text in chunk]
+
+def preprocess_dataframe(df, col='text', n_jobs=1, metrics=None):
     """
     Preprocess a DataFrame by applying text preprocessing to a specific column.
 
     Args:
         df (pd.DataFrame): The DataFrame to preprocess.
         col (str): The name of the column containing text.
+        n_jobs (int): Number of processes used for cleaning.
+        metrics (Metrics, optional): Times the 'clean' stage (src/instrumentation.py).
 
     Returns:
         pd.DataFrame: The preprocessed DataFrame.
@@ -24,27 +119,11 @@ def preprocess_dataframe(df, col='text'):
     #lemmatizer = WordNetLemmatizer()
     #stop_words = set(stopwords.words("english"))
 
-    def preprocess_text(text):
-        """Helper function to preprocess a single text string."""
-        # Remove URLs
-        text = re.sub(r'https?://\S+|www\.\S+', '', text)
-        # Remove numbers
-        text = ''.join([char for char in text if not char.isdigit()])
-        # Convert to lowercase
-        text = text.lower()
-        # Remove punctuations
-        text = re.sub('[%s]' % re.escape(string.punctuation), ' ', text)
-        text = text.replace('؛', "")
-        text = re.sub('\s+', ' ', text).strip()
-        # Remove stop words
-        #text = " ".join([word for word in text.split() if word not in stop_words])
-        # Lemmatization
-        #text = " ".join([lemmatizer.lemmatize(word) for word in text.split()])
-        return text
-    
-    
     # Apply preprocessing to the specified column
-    df[col] = df[col].apply(preprocess_text)
+    # (preprocess_text_fast gives the same result as preprocess_text, faster)
+    metrics = metrics if metrics is not None else NULL_METRICS
+    with metrics.stage('clean', rows=len(df), n_jobs=n_jobs):
+        df[col] = clean_texts(df[col], n_jobs=n_jobs)
     
     # Remove small sentences (less than 3 words)
     # df[col] = df[col].apply(lambda x: np.nan if len(str(x).split()) < 3 else x)
@@ -53,77 +132,247 @@ def preprocess_dataframe(df, col='text'):
     df = df.dropna(subset=[col])
     return df
 
-def prepare_ngrams(df, col='text', n=3):
+def encode_ngrams(df, col='text', n=3, min_count=2, metrics=None):
+    """
+    Vectorized prepare_ngrams: the same padded sentences as integer token IDs.
+
+    Every row is split once; pd.factorize then gives each token an index into
+    the distinct words, np.bincount their frequencies, and the <UNK> mapping
+    and the padding are applied as array operations:
+
+        vocab    '<s>', '</s>', '<UNK>' (IDs 0, 1, 2 as in src/count_store.py),
+                 then the kept words in first-seen order
+        tokens   int32 IDs of every padded sentence back to back
+        offsets  sentence i is tokens[offsets[i]:offsets[i + 1]]
+
+    Args:
+        min_count (int): Words seen fewer times become <UNK>.
+        metrics (Metrics, optional): Times the 'tokenize', 'vocab' and 'pad'
+            stages (src/instrumentation.py).
+
+    Returns:
+        TokenCorpus: Iterating it gives exactly prepare_ngrams(...)['tokens'];
+        TrigramModel(backend='compact').fit() counts it without decoding.
+    """
+    import numpy as np
+    import pandas as pd
+
+    metrics = metrics if metrics is not None else NULL_METRICS
+
+    # 1. Tokenize every row once; rows without tokens are dropped
+    with metrics.stage('tokenize') as fields:
+        token_lists = list(filter(None, map(str.split, df[col].tolist())))
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        words = np.array(list(chain.from_iterable(token_lists)), dtype=object)
+        fields['tokens'] = len(words)
+
+    # 2. Distinct words and their counts; rare words map to <UNK>
+    with metrics.stage('vocab', tokens=len(words)) as fields:
+        codes, uniques = pd.factorize(words)
+        keep = np.bincount(codes, minlength=len(uniques)) >= min_count
+        kept_words = uniques[keep].tolist()
+        remap = np.full(len(uniques), UNK_ID, dtype=ID_DTYPE)
+        vocab = [BOS, EOS, UNK]
+        reserved = {token: token_id for token_id, token in enumerate(vocab)}
+        # A literal '<s>' / '</s>' / '<UNK>' in the text keeps its reserved ID
+        new_ids = [reserved.get(word, -1) for word in kept_words]
+        for i, word in enumerate(kept_words):
+            if new_ids[i] < 0:
+                new_ids[i] = len(vocab)
+                vocab.append(word)
+        remap[keep] = new_ids
+        fields['vocab_size'] = len(kept_words)
+
+    # 3. Padded ID array: every sentence grows by n - 1 '<s>' and one '</s>'
+    with metrics.stage('pad', tokens=len(words), sentences=len(token_lists)):
+        offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum(lengths + n, out=offsets[1:])
+        tokens = np.full(offsets[-1], BOS_ID, dtype=ID_DTYPE)
+        tokens[offsets[1:] - 1] = EOS_ID
+        sentence_of_word = np.repeat(np.arange(len(token_lists), dtype=np.int64), lengths)
+        positions = np.arange(len(words), dtype=np.int64) + n * sentence_of_word + (n - 1)
+        tokens[positions] = remap[codes]
+
+    return TokenCorpus(vocab, tokens, offsets)
+
+def prepare_ngrams(df, col='text', n=3, min_count=2, metrics=None):
     """
     Takes the preprocessed DataFrame and creates padded token lists.
     Also handles Unknown Words (<UNK>).
+
+    Padding for an order-n model: (n - 1) '<s>' start tokens and one '</s>'.
+    If a word appears fewer than min_count times, it is treated as unknown
+    to help the model generalize. Computed by encode_ngrams; this returns
+    the same sentences as lists of strings.
+
+    Args:
+        min_count (int): Words seen fewer times become <UNK>. Use 1 to keep
+            every word, e.g. for TrigramModel.partial_fit with a model-level
+            min_count applied at freeze time instead.
+        metrics (Metrics, optional): Times the 'tokenize', 'vocab' and 'pad'
+            stages (src/instrumentation.py).
     """
-    tokenized_sentences = []
-    all_words = []
+    import pandas as pd
 
-    # First pass: Tokenize and collect all words to build vocabulary
-    temp_tokenized = []
-    for text in df[col]:
+    corpus = encode_ngrams(df, col, n=n, min_count=min_count, metrics=metrics)
+    return pd.DataFrame({'tokens': corpus.to_lists()})
+
+
+
+# ==========================================
+# Streaming pipeline
+# ==========================================
+# The functions below are generators: each one consumes the previous stage
+# lazily, so only one line / sentence is held in memory at a time.
+#   iter_lines -> iter_cleaned -> iter_tokens -> iter_padded_sentences
+# The <UNK> vocabulary needs global counts, so stream_training_sentences
+# scans the file twice instead of keeping every token list in memory.
+
+def iter_lines(path, encoding='utf-8'):
+    """Yields the stripped, non-empty lines of a text file (like main() reads them)."""
+    with open(path, 'r', encoding=encoding) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def iter_cleaned(texts):
+    """Yields each text cleaned with the same rules as preprocess_dataframe."""
+    for text in texts:
+        yield preprocess_text_fast(text)
+
+def iter_tokens(texts):
+    """Yields the token list of every text, skipping texts with no tokens."""
+    for text in texts:
         tokens = text.split()
-        if not tokens: continue
-        temp_tokenized.append(tokens)
-        all_words.extend(tokens)
-
-    # Build Vocabulary
-    # If a word appears only once, we treat it as unknown to help the model generalize
-    word_counts = Counter(all_words)
-    vocab = {word for word, count in word_counts.items() if count > 1}
-    
-    final_sentences = []
-    
-    for tokens in temp_tokenized:
-        # Padding for Trigrams (N=3)
-        # We need (N-1) start tokens.
-        # We use '<s>' for start and '</s>' for end.
-        padding_start = ['<s>'] * (n - 1)
-        padding_end = ['</s>']
-        
-        # Handle Unknown Words
-        processed_tokens = []
-        for token in tokens:
-            if token in vocab:
-                processed_tokens.append(token)
-            else:
-                processed_tokens.append('<UNK>')
-        
-        # Combine Padding + Processed Tokens
-        full_sentence = padding_start + processed_tokens + padding_end
-        final_sentences.append(full_sentence)
-        
-    return pd.DataFrame({'tokens': final_sentences})
+        if tokens:
+            yield tokens
 
+def build_vocab(token_lists, min_count=2):
+    """
+    Counts tokens in one pass and returns the set of words kept in the vocabulary.
 
+    Memory grows with the number of *distinct* words, not with the corpus size.
 
-def main():
-    try:
+    Args:
+        token_lists (iterable of lists): Tokenized sentences.
+        min_count (int): Words seen fewer times than this become <UNK>
+                         (the default of 2 matches prepare_ngrams).
+    """
+    word_counts = Counter()
+    for tokens in token_lists:
+        word_counts.update(tokens)
+    return {word for word, count in word_counts.items() if count >= min_count}
 
-        with open('FRANKENSTEIN.txt', 'r', encoding='utf-8') as f:
-            # Read lines and remove empty lines if you want
-            lines = [line.strip() for line in f if line.strip()]
+def iter_padded_sentences(token_lists, vocab, n=3):
+    """Yields padded sentences with out-of-vocabulary words replaced by <UNK>."""
+    padding_start = ['<s>'] * (n - 1)
+    padding_end = ['</s>']
+    for tokens in token_lists:
+        processed_tokens = [token if token in vocab else '<UNK>' for token in tokens]
+        yield padding_start + processed_tokens + padding_end
 
-        df = pd.DataFrame(lines, columns=['text'])
-        print(df.head())
-        #logging.info('data loaded properly')
+def stream_training_sentences(path, n=3, min_count=2, encoding='utf-8'):
+    """
+    Streams the padded training sentences of a raw text file.
 
-        # Transform the data
-        processed_data = preprocess_dataframe(df, 'text')
+    Produces exactly what main() writes to training_data.csv, but never
+    materialises the file, a DataFrame or the token lists in memory.
 
-        # Store the data inside data/processed
-        data_path = os.path.join("./data", "interim")
-        os.makedirs(data_path, exist_ok=True)
-        processed_data.to_csv(os.path.join(data_path, "processed.csv"), index=False)
+    Pass 1 builds the vocabulary, pass 2 re-reads the file and yields
+    padded sentences one at a time.
+    """
+    vocab = build_vocab(iter_tokens(iter_cleaned(iter_lines(path, encoding))), min_count)
+    yield from iter_padded_sentences(iter_tokens(iter_cleaned(iter_lines(path, encoding))), vocab, n)
+
+# ==========================================
+# Cached artifacts
+# ==========================================
+ARTIFACTS = ('processed.csv', 'training_data.csv', 'training_data')
+MANIFEST_FILE = 'manifest.json'
 
-        print("Preparing N-Grams (Padding & Handling Unknowns)...")
-        training_data = prepare_ngrams(processed_data, 'text', n=3)
-        training_data.to_csv(os.path.join(data_path, "training_data.csv"), index=False)
-        print(f"Sample padded sentence: {training_data.head()}")
+def _clean_text_block(text):
+    """Cleans a block of raw text line by line, exactly like main() reads the file."""
+    # StringIO(newline=None) splits lines like a file opened in text mode
+    return [preprocess_text_fast(line.strip()) for line in io.StringIO(text, newline=None) if line.strip()]
 
-        
+def _write_artifacts(lines, directory, n, min_count):
+    """Writes processed.csv, training_data.csv and training_data/ for cleaned lines."""
+    import pandas as pd
+
+    processed_data = pd.DataFrame(lines, columns=['text'])
+    processed_data.to_csv(os.path.join(directory, "processed.csv"), index=False)
+    print("Preparing N-Grams (Padding & Handling Unknowns)...")
+    corpus = encode_ngrams(processed_data, 'text', n=n, min_count=min_count)
+    pd.DataFrame({'tokens': corpus.to_lists()}).to_csv(os.path.join(directory, "training_data.csv"), index=False)
+    # Same sentences as integer token IDs; much faster to load than the CSV
+    save_token_corpus(corpus, os.path.join(directory, "training_data"))
+
+def build_training_artifacts(source, data_path, n=3, min_count=2, cache_dir=None,
+                             max_cache_bytes=DEFAULT_MAX_BYTES):
+    """
+    Writes processed.csv, training_data.csv and the training_data/ token
+    corpus for a raw text file into `data_path`, reusing earlier work.
+
+    The artifacts are cached under a hash of the file content, n, min_count
+    and CLEANING_OPTIONS:
+      - if `data_path` already holds them (see manifest.json) nothing is written,
+      - if the cache has them they are copied over,
+      - otherwise only the chunks of the file that were never cleaned before
+        are cleaned; tokenizing, <UNK> replacement and padding are redone
+        (they depend on word counts over the whole file).
+
+    Args:
+        source (str): Raw text file.
+        data_path (str): Output directory, e.g. data/interim.
+        n (int), min_count (int): As in prepare_ngrams.
+        cache_dir (str, optional): Defaults to <data_path>/cache.
+        max_cache_bytes (int): Size cap of the cache (least recently used
+            entries are evicted first).
+
+    Returns:
+        str: 'up to date', 'cached' or 'built'.
+    """
+    cache = PreprocessingCache(cache_dir or os.path.join(data_path, 'cache'), max_cache_bytes)
+    with open(source, 'rb') as f:
+        data = f.read()
+    params = {'n': n, 'min_count': min_count, 'cleaning': CLEANING_OPTIONS}
+    key = cache.key(hash_bytes(data), **params)
+
+    manifest_path = os.path.join(data_path, MANIFEST_FILE)
+    if os.path.exists(manifest_path) and all(os.path.exists(os.path.join(data_path, name)) for name in ARTIFACTS):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            if json.load(f).get('key') == key:
+                cache.get(key)
+                return 'up to date'
+
+    entry = cache.get(key)
+    status = 'cached'
+    if entry is None:
+        lines = cache.clean_chunks(split_chunks(data), _clean_text_block, CLEANING_OPTIONS)
+        print(f"Cleaned {cache.chunks_cleaned} of {cache.chunks_cleaned + cache.chunks_reused} chunks "
+              f"({cache.chunks_reused} reused from the cache)")
+        entry = cache.put(key, lambda directory: _write_artifacts(lines, directory, n, min_count))
+        status = 'built'
+
+    os.makedirs(data_path, exist_ok=True)
+    for name in ARTIFACTS:
+        target = os.path.join(data_path, name)
+        if os.path.isdir(os.path.join(entry, name)):
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.copytree(os.path.join(entry, name), target)
+        else:
+            shutil.copy2(os.path.join(entry, name), target)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'source': os.path.abspath(source), **params}, f, indent=2)
+    return status
+
+def main():
+    try:
+        # Store the data inside data/interim (cached under data/interim/cache)
+        data_path = os.path.join("./data", "interim")
+        status = build_training_artifacts('FRANKENSTEIN.txt', data_path, n=3)
+        print(f"Training data in {data_path}: {status}")
         #logging.info('Processed data saved to %s', data_path)
     except Exception as e:
         #logging.error('Failed to complete the data transformation process: %s', e)
@@ -0,0 +1,199 @@
+"""
+Content-addressed cache for the preprocessing artifacts in data/interim.
+
+Two kinds of entries live under one cache directory:
+
+    chunks/<hash>.txt   cleaned lines of one chunk of the source file, keyed by
+                        the chunk's raw bytes plus the cleaning options
+    entries/<key>/      processed.csv, training_data.csv and training_data/
+                        for one (source content, n, min_count, cleaning options)
+
+The source is cut into chunks at content-defined line boundaries (a line ends a
+chunk when its CRC32 is divisible by CHUNK_LINES), so editing a few lines only
+changes the chunks around the edit and inserting text does not shift every
+later boundary. Only chunks whose hash is new are cleaned again.
+
+Both kinds of entries are evicted least-recently-used first (by mtime, which
+is refreshed on every hit) once the cache holds more than `max_bytes`.
+"""
+import hashlib
+import json
+import os
+import shutil
+import zlib
+
+# Average number of lines per chunk, and a hard limit on chunk size
+CHUNK_LINES = 256
+MAX_CHUNK_BYTES = 1 << 20
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def hash_bytes(*parts):
+    """Hex SHA-256 of the concatenated byte strings."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def split_chunks(data):
+    """
+    Cuts raw file content into chunks that end on line boundaries.
+
+    Returns:
+        list of bytes: The chunks; b''.join(chunks) == data.
+    """
+    chunks, start, size = [], 0, 0
+    position = 0
+    while position < len(data):
+        end = data.find(b'\n', position)
+        end = len(data) if end < 0 else end + 1
+        line = data[position:end]
+        size += len(line)
+        position = end
+        if zlib.crc32(line) % CHUNK_LINES == 0 or size >= MAX_CHUNK_BYTES:
+            chunks.append(data[start:position])
+            start, size = position, 0
+    if start < len(data):
+        chunks.append(data[start:])
+    return chunks
+
+
+def _path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+class PreprocessingCache:
+    """
+    Artifact and chunk cache for data_preprocessing.build_training_artifacts.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory (str): Cache root (created on demand).
+            max_bytes (int): Size cap; least recently used entries are
+                removed after every write that pushes the cache above it.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_dir = os.path.join(directory, 'chunks')
+        self.entry_dir = os.path.join(directory, 'entries')
+        # Chunk hits / misses of the last clean_chunks() call
+        self.chunks_reused = 0
+        self.chunks_cleaned = 0
+
+    @staticmethod
+    def key(source_hash, **params):
+        """Key of an artifact entry: the source hash plus every parameter."""
+        return hash_bytes(source_hash.encode(), json.dumps(params, sort_keys=True).encode())
+
+    def clean_chunks(self, chunks, clean, options):
+        """
+        Cleaned lines of every chunk, reusing the cached ones.
+
+        Args:
+            chunks (list of bytes): Output of split_chunks().
+            clean (callable): Maps the raw text of a chunk to its list of
+                cleaned lines (must not contain newlines).
+            options (dict): Cleaning options; part of every chunk hash.
+
+        Returns:
+            list of str: The cleaned lines of all chunks, in order.
+        """
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        salt = json.dumps(options, sort_keys=True).encode()
+        self.chunks_reused = self.chunks_cleaned = 0
+        lines = []
+        for chunk in chunks:
+            path = os.path.join(self.chunk_dir, hash_bytes(salt, chunk) + '.txt')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8', newline='\n') as f:
+                    # Every line is stored with its '\n', so empty lines survive
+                    chunk_lines = f.read().split('\n')[:-1]
+                os.utime(path)
+                self.chunks_reused += 1
+            else:
+                chunk_lines = clean(chunk.decode('utf-8'))
+                self._write_atomic(path, ''.join(line + '\n' for line in chunk_lines))
+                self.chunks_cleaned += 1
+            lines.extend(chunk_lines)
+        return lines
+
+    def get(self, key):
+        """Directory of artifact entry `key`, or None on a miss."""
+        path = os.path.join(self.entry_dir, key)
+        if not os.path.isdir(path):
+            return None
+        os.utime(path)
+        return path
+
+    def put(self, key, write):
+        """
+        Creates artifact entry `key` by calling write(directory) on a
+        temporary directory that is then renamed into place, and enforces
+        the size cap.
+
+        Returns:
+            str: The entry directory.
+        """
+        os.makedirs(self.entry_dir, exist_ok=True)
+        path = os.path.join(self.entry_dir, key)
+        tmp = path + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        write(tmp)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+        return path
+
+    def size(self):
+        """Bytes currently held by the cache."""
+        return sum(size for _, size, _ in self._items())
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used chunks and entries until the cache fits
+        in max_bytes. `keep` (the entry just written) is never removed.
+
+        Returns:
+            int: Number of items removed.
+        """
+        items = sorted(self._items(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in items)
+        removed = 0
+        for path, size, _ in items:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def _items(self):
+        """(path, bytes, mtime) of every chunk file and artifact entry."""
+        items = []
+        for folder in (self.chunk_dir, self.entry_dir):
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                items.append((path, _path_size(path), os.path.getmtime(path)))
+        return items
+
+    @staticmethod
+    def _write_atomic(path, text):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(text)
+        os.replace(tmp, path)
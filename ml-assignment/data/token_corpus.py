@@ -0,0 +1,106 @@
+import os
+import numpy as np
+
+# File names inside a token corpus directory
+VOCAB_FILE = 'vocab.txt'
+TOKENS_FILE = 'tokens.npy'
+OFFSETS_FILE = 'offsets.npy'
+
+
+class TokenCorpus:
+    """
+    Padded training sentences stored as integer token IDs.
+
+    Instead of one stringified Python list per CSV row, the corpus is
+        vocab    list of tokens, the index of a token is its ID
+        tokens   flat int32 array with the IDs of every sentence back to back
+        offsets  int64 array; sentence i is tokens[offsets[i]:offsets[i + 1]]
+
+    Iterating yields each sentence as a list of strings, so a TokenCorpus
+    can be passed anywhere a list of token lists is expected.
+    """
+
+    def __init__(self, vocab, tokens, offsets):
+        self.vocab = vocab
+        self.tokens = tokens
+        self.offsets = offsets
+
+    @classmethod
+    def from_sentences(cls, sentences):
+        """Encodes an iterable of token lists (e.g. prepare_ngrams(...)['tokens'])."""
+        token_to_id = {}
+        ids, offsets = [], [0]
+        for sentence in sentences:
+            for token in sentence:
+                ids.append(token_to_id.setdefault(token, len(token_to_id)))
+            offsets.append(len(ids))
+        return cls(
+            list(token_to_id),
+            np.array(ids, dtype=np.int32),
+            np.array(offsets, dtype=np.int64),
+        )
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def sentence_ids(self, i):
+        """Returns the token IDs of sentence i (a view, no copy)."""
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getitem__(self, i):
+        return [self.vocab[token_id] for token_id in self.sentence_ids(i).tolist()]
+
+    def to_lists(self):
+        """
+        Every sentence as a list of strings, like list(corpus) but decoded with
+        one array lookup and one list slice per sentence.
+        """
+        flat = np.array(self.vocab, dtype=object)[self.tokens].tolist()
+        bounds = self.offsets.tolist()
+        return [flat[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def __iter__(self):
+        vocab = self.vocab
+        bounds = self.offsets.tolist()
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            yield [vocab[token_id] for token_id in self.tokens[start:end].tolist()]
+
+
+def save_token_corpus(sentences, directory):
+    """
+    Writes padded sentences (token lists or a TokenCorpus) as a token corpus directory:
+    vocab.txt (one token per line), tokens.npy and offsets.npy.
+
+    Returns:
+        TokenCorpus: The corpus that was written.
+    """
+    corpus = sentences if isinstance(sentences, TokenCorpus) else TokenCorpus.from_sentences(sentences)
+    if any('\n' in token for token in corpus.vocab):
+        raise ValueError("Tokens containing newlines cannot be stored in vocab.txt")
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, VOCAB_FILE), 'w', encoding='utf-8', newline='\n') as f:
+        f.write('\n'.join(corpus.vocab))
+    np.save(os.path.join(directory, TOKENS_FILE), corpus.tokens)
+    np.save(os.path.join(directory, OFFSETS_FILE), corpus.offsets)
+    return corpus
+
+
+def load_token_corpus(directory, mmap=True):
+    """
+    Reads a directory written by save_token_corpus.
+
+    Args:
+        directory (str): The corpus directory.
+        mmap (bool): Memory-map tokens.npy and offsets.npy instead of reading them.
+
+    Returns:
+        TokenCorpus
+    """
+    with open(os.path.join(directory, VOCAB_FILE), 'r', encoding='utf-8', newline='\n') as f:
+        text = f.read()
+    vocab = text.split('\n') if text else []
+    mmap_mode = 'r' if mmap else None
+    tokens = np.load(os.path.join(directory, TOKENS_FILE), mmap_mode=mmap_mode)
+    offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode=mmap_mode)
+    return TokenCorpus(vocab, tokens, offsets)
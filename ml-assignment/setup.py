@@ -5,5 +5,6 @@ setup(
     version="0.0.1",
     author="uttam",
     author_email="kputtam7@gmail.com",
-    packages=find_packages()
+    packages=find_packages(),
+    entry_points={"console_scripts": ["ngram = src.cli:main"]},
 )
\ No newline at end of file
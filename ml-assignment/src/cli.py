@@ -0,0 +1,90 @@
+"""
+Command-line entry point (`ngram`, see pyproject.toml / setup.py).
+
+    ngram train FRANKENSTEIN.txt -o model.bin [--min-count 2] [--max-bytes N]
+    ngram generate model.bin [-n 5] [--max-length 50] [--seed 0]
+                             [--temperature T] [--top-k K] [--top-p P]
+    ngram score model.bin ["a sentence" ...]     (one sentence per stdin line if none given)
+
+Start-up time matters for a CLI, so this module imports nothing heavy at load:
+each subcommand imports what it needs when it runs. `generate` and `score`
+memory-map a saved model and never import pandas or nltk; `train` streams
+the corpus (stream_training_sentences + fit_stream), which needs neither.
+"""
+import argparse
+import sys
+
+
+def train(args):
+    from data.data_preprocessing import stream_training_sentences
+    from src.ngram_model import TrigramModel
+
+    model = TrigramModel(backend='compact', max_bytes=args.max_bytes)
+    model.fit_stream(stream_training_sentences(args.corpus, min_count=args.min_count))
+    model.save(args.output)
+    print(f"Saved {model.num_trigrams} trigrams to {args.output}")
+
+
+def generate(args):
+    import random
+
+    from src.ngram_model import TrigramModel
+
+    model = TrigramModel.load(args.model, mmap=True)
+    if args.temperature == 1.0 and args.top_k is None and args.top_p is None:
+        texts = model.generate_batch(args.n, max_length=args.max_length, seed=args.seed)
+    else:
+        random.seed(args.seed)
+        texts = [model.generate(args.max_length, args.temperature, args.top_k, args.top_p)
+                 for _ in range(args.n)]
+    for text in texts:
+        print(text)
+
+
+def score(args):
+    from src.ngram_model import TrigramModel
+
+    model = TrigramModel.load(args.model, mmap=True)
+    sentences = args.sentences or [line.strip() for line in sys.stdin if line.strip()]
+    if not sentences:
+        raise SystemExit("score: no sentences given")
+    for sentence, logprob in zip(sentences, model.score_batch(sentences)):
+        print(f"{logprob:.4f}\t{sentence}")
+    print(f"perplexity: {model.perplexity(sentences):.2f}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ngram", description="Train, sample from and score trigram models.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("train", help="Train on a text file and save the model")
+    command.add_argument("corpus", help="Raw text file, one or more sentences per line")
+    command.add_argument("-o", "--output", default="model.bin")
+    command.add_argument("--min-count", type=int, default=2, help="Rarer words become <UNK>")
+    command.add_argument("--max-bytes", type=int, help="Cap on the count arrays (prunes rare trigrams)")
+    command.set_defaults(run=train)
+
+    command = commands.add_parser("generate", help="Sample texts from a saved model")
+    command.add_argument("model")
+    command.add_argument("-n", type=int, default=1, help="Number of texts")
+    command.add_argument("--max-length", type=int, default=50)
+    command.add_argument("--seed", type=int)
+    command.add_argument("--temperature", type=float, default=1.0)
+    command.add_argument("--top-k", type=int)
+    command.add_argument("--top-p", type=float)
+    command.set_defaults(run=generate)
+
+    command = commands.add_parser("score", help="Log-probability and perplexity of sentences")
+    command.add_argument("model")
+    command.add_argument("sentences", nargs="*")
+    command.set_defaults(run=score)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
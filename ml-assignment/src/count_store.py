@@ -0,0 +1,401 @@
+import numpy as np
+
+# Special tokens. They are always inserted first, so every Vocabulary
+# agrees on their IDs (0, 1 and 2).
+BOS = '<s>'
+EOS = '</s>'
+UNK = '<UNK>'
+BOS_ID, EOS_ID, UNK_ID = 0, 1, 2
+
+# Token IDs are stored as int32, so a context (w1, w2) fits into a single
+# int64 key: the high 32 bits hold w1 and the low 32 bits hold w2.
+ID_DTYPE = np.int32
+COUNT_DTYPE = np.int64
+
+
+def context_key(w1, w2):
+    """
+    Packs a (w1, w2) pair of token IDs into one int64 key.
+
+    Works on plain ints and on NumPy arrays alike.
+    """
+    return (np.asarray(w1, dtype=np.int64) << 32) | np.asarray(w2, dtype=np.int64)
+
+
+class Vocabulary:
+    """
+    Maps tokens to dense integer IDs and back.
+    """
+
+    def __init__(self, tokens=None):
+        self.token_to_id = {}
+        self.id_to_token = []
+        for token in (BOS, EOS, UNK):
+            self.add(token)
+        for token in tokens or ():
+            self.add(token)
+
+    @classmethod
+    def from_tokens(cls, id_to_token):
+        """
+        Rebuilds a vocabulary from its tokens in ID order (as saved to disk).
+        The first three tokens must be the special tokens.
+        """
+        if list(id_to_token[:3]) != [BOS, EOS, UNK]:
+            raise ValueError("Vocabulary must start with the special tokens <s>, </s>, <UNK>")
+        vocab = cls.__new__(cls)
+        vocab.id_to_token = list(id_to_token)
+        vocab.token_to_id = dict(zip(vocab.id_to_token, range(len(vocab.id_to_token))))
+        return vocab
+
+    def __len__(self):
+        return len(self.id_to_token)
+
+    def __contains__(self, token):
+        return token in self.token_to_id
+
+    def add(self, token):
+        """Returns the ID of `token`, assigning the next free ID if it is new."""
+        token_id = self.token_to_id.get(token)
+        if token_id is None:
+            token_id = len(self.id_to_token)
+            self.token_to_id[token] = token_id
+            self.id_to_token.append(token)
+        return token_id
+
+    def encode(self, tokens):
+        """
+        Converts a sequence of tokens into an int32 array of IDs.
+        Unseen tokens are added to the vocabulary.
+        """
+        add = self.add
+        return np.fromiter((add(token) for token in tokens), dtype=ID_DTYPE)
+
+    def decode(self, ids):
+        """Converts a sequence of IDs back into a list of tokens."""
+        id_to_token = self.id_to_token
+        return [id_to_token[i] for i in ids]
+
+
+def batch_searchsorted(haystack, needles):
+    """
+    np.searchsorted for large batches of unsorted needles.
+
+    Searching the needles in sorted order walks the haystack front to back,
+    which is several times more cache friendly than random probes.
+    """
+    needles = np.asarray(needles)
+    if needles.size < 1024:
+        return np.searchsorted(haystack, needles)
+    order = np.argsort(needles)
+    positions = np.empty(needles.shape, dtype=np.intp)
+    positions[order] = np.searchsorted(haystack, needles[order])
+    return positions
+
+
+def sentence_trigrams(encoded_sentences):
+    """
+    Turns encoded sentences (int arrays) into parallel (w1, w2, w3) arrays
+    holding every trigram occurrence. Sentences shorter than 3 contribute nothing.
+    """
+    w1, w2, w3 = [], [], []
+    for ids in encoded_sentences:
+        if len(ids) < 3:
+            continue
+        w1.append(ids[:-2])
+        w2.append(ids[1:-1])
+        w3.append(ids[2:])
+    if not w3:
+        empty = np.empty(0, dtype=ID_DTYPE)
+        return empty, empty, empty
+    return np.concatenate(w1), np.concatenate(w2), np.concatenate(w3)
+
+
+def flat_trigrams(ids, offsets, return_starts=False):
+    """
+    Vectorized sentence_trigrams for sentences stored back to back in one
+    flat ID array, sentence i being ids[offsets[i]:offsets[i + 1]].
+    With return_starts=True the position of each trigram's first word is
+    returned as a fourth array.
+    """
+    ids = np.asarray(ids)
+    valid = np.ones(len(ids), dtype=bool)
+    starts, ends = np.asarray(offsets[:-1]), np.asarray(offsets[1:])
+    # The last two positions of every sentence cannot start a trigram
+    for back in (1, 2):
+        positions = ends - back
+        valid[positions[positions >= starts]] = False
+    first = np.flatnonzero(valid)
+    if return_starts:
+        return ids[first], ids[first + 1], ids[first + 2], first
+    return ids[first], ids[first + 1], ids[first + 2]
+
+
+class CompactTrigramStore:
+    """
+    Array-backed trigram counts in CSR (compressed sparse row) layout.
+
+    Every distinct context (w1, w2) is one "row":
+        context_keys[r]                         packed (w1, w2) key, sorted ascending
+        successors[offsets[r]:offsets[r + 1]]   IDs of the words seen after it, sorted ascending
+        counts[offsets[r]:offsets[r + 1]]       how often each successor was seen
+
+    Compared with a defaultdict(Counter) of string tuples this needs
+    8 bytes per context plus 12 bytes per trigram, instead of hundreds.
+    The store is immutable: adding counts returns a new store.
+    """
+
+    ARRAY_NAMES = ('context_keys', 'offsets', 'successors', 'counts')
+
+    def __init__(self, context_keys, offsets, successors, counts):
+        self.context_keys = context_keys
+        self.offsets = offsets
+        self.successors = successors
+        self.counts = counts
+        # Built on first use by count_batch()
+        self._entry_keys = None
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.zeros(1, dtype=np.int64),
+            np.empty(0, dtype=ID_DTYPE),
+            np.empty(0, dtype=COUNT_DTYPE),
+        )
+
+    @classmethod
+    def from_triples(cls, w1, w2, w3, counts=None):
+        """
+        Builds a store from parallel arrays of trigram IDs.
+
+        Duplicate trigrams are summed, so the arrays can simply be every
+        trigram occurrence in the corpus (counts=None means 1 each).
+        """
+        keys = context_key(w1, w2)
+        w3 = np.asarray(w3, dtype=ID_DTYPE)
+        if counts is None:
+            counts = np.ones(len(w3), dtype=COUNT_DTYPE)
+        else:
+            counts = np.asarray(counts, dtype=COUNT_DTYPE)
+        if len(keys) == 0:
+            return cls.empty()
+
+        # 1. Sort by (context, successor) so equal trigrams become neighbours
+        order = np.lexsort((w3, keys))
+        keys, w3, counts = keys[order], w3[order], counts[order]
+
+        # 2. Collapse runs of equal trigrams into one entry with a summed count
+        is_new = np.empty(len(keys), dtype=bool)
+        is_new[0] = True
+        is_new[1:] = (keys[1:] != keys[:-1]) | (w3[1:] != w3[:-1])
+        starts = np.flatnonzero(is_new)
+        counts = np.add.reduceat(counts, starts)
+        keys, w3 = keys[starts], w3[starts]
+
+        # 3. Every run of equal context keys becomes one CSR row
+        is_new_context = np.empty(len(keys), dtype=bool)
+        is_new_context[0] = True
+        is_new_context[1:] = keys[1:] != keys[:-1]
+        row_starts = np.flatnonzero(is_new_context)
+        offsets = np.append(row_starts, len(keys)).astype(np.int64)
+
+        return cls(keys[row_starts], offsets, w3, counts)
+
+    def triples(self):
+        """Returns (w1, w2, w3, counts) arrays with one entry per stored trigram."""
+        keys = np.repeat(self.context_keys, np.diff(self.offsets))
+        w1 = (keys >> 32).astype(ID_DTYPE)
+        w2 = (keys & 0xFFFFFFFF).astype(ID_DTYPE)
+        return w1, w2, self.successors, self.counts
+
+    def add_triples(self, w1, w2, w3, counts=None):
+        """Returns a new store holding these counts plus the given trigrams."""
+        if counts is None:
+            counts = np.ones(len(w3), dtype=COUNT_DTYPE)
+        if self.num_trigrams == 0:
+            return CompactTrigramStore.from_triples(w1, w2, w3, counts)
+        old_w1, old_w2, old_w3, old_counts = self.triples()
+        return CompactTrigramStore.from_triples(
+            np.concatenate([old_w1, np.asarray(w1, dtype=ID_DTYPE)]),
+            np.concatenate([old_w2, np.asarray(w2, dtype=ID_DTYPE)]),
+            np.concatenate([old_w3, np.asarray(w3, dtype=ID_DTYPE)]),
+            np.concatenate([old_counts, np.asarray(counts, dtype=COUNT_DTYPE)]),
+        )
+
+    @staticmethod
+    def merge(stores):
+        """Sums the counts of several stores that share one vocabulary."""
+        columns = zip(*(store.triples() for store in stores))
+        return CompactTrigramStore.from_triples(*(np.concatenate(column) for column in columns))
+
+    def find_context(self, w1, w2):
+        """Returns the row index of context (w1, w2), or -1 if it was never seen."""
+        key = (int(w1) << 32) | int(w2)
+        # ndarray methods + .item() skip most of NumPy's per-call overhead
+        row = int(self.context_keys.searchsorted(key))
+        if row < len(self.context_keys) and self.context_keys.item(row) == key:
+            return row
+        return -1
+
+    def find_contexts(self, w1, w2):
+        """Vectorized find_context: returns an array of row indices (-1 = unseen)."""
+        keys = context_key(w1, w2)
+        rows = batch_searchsorted(self.context_keys, keys)
+        found = rows < len(self.context_keys)
+        found[found] = self.context_keys[rows[found]] == keys[found]
+        return np.where(found, rows, -1)
+
+    def row(self, row):
+        """Returns (successor IDs, counts) views for one context row."""
+        start, end = self.offsets.item(row), self.offsets.item(row + 1)
+        return self.successors[start:end], self.counts[start:end]
+
+    def count(self, w1, w2, w3):
+        """Returns how often the trigram (w1, w2, w3) was seen."""
+        row = self.find_context(w1, w2)
+        if row < 0:
+            return 0
+        start, end = self.offsets.item(row), self.offsets.item(row + 1)
+        i = start + int(self.successors[start:end].searchsorted(w3))
+        if i < end and self.successors.item(i) == w3:
+            return self.counts.item(i)
+        return 0
+
+    def count_batch(self, w1, w2, w3):
+        """
+        Vectorized count(): looks up many trigrams at once and returns their counts.
+
+        Each stored trigram gets a sorted int64 key (row << 32 | successor),
+        so the whole batch is answered by two np.searchsorted calls.
+        """
+        return self.lookup(w1, w2, w3)[1]
+
+    def lookup(self, w1, w2, w3):
+        """
+        Like count_batch, but also returns the context rows.
+
+        Returns:
+            (rows, counts): row of each (w1, w2) context (-1 = unseen) and
+            the count of each trigram (0 = unseen).
+        """
+        rows = self.find_contexts(w1, w2)
+        result = np.zeros(len(rows), dtype=COUNT_DTYPE)
+        if self.num_trigrams == 0:
+            return rows, result
+        if self._entry_keys is None:
+            entry_rows = np.repeat(np.arange(self.num_contexts, dtype=np.int64), np.diff(self.offsets))
+            self._entry_keys = (entry_rows << 32) | self.successors
+        keys = (rows << 32) | np.asarray(w3, dtype=np.int64)
+        idx = np.minimum(batch_searchsorted(self._entry_keys, keys), self.num_trigrams - 1)
+        found = (rows >= 0) & (self._entry_keys[idx] == keys)
+        result[found] = self.counts[idx[found]]
+        return rows, result
+
+    def prune(self, min_count=None, top_k=None):
+        """
+        Drops rarely seen trigrams.
+
+        Args:
+            min_count (int, optional): Remove trigrams seen fewer times.
+            top_k (int, optional): Keep only the k most frequent successors
+                of every context (ties go to the lower token ID).
+
+        Returns:
+            CompactTrigramStore: A new store; contexts left without any
+            successor disappear as well.
+        """
+        keep = np.ones(self.num_trigrams, dtype=bool)
+        if min_count is not None:
+            keep &= self.counts >= min_count
+        if top_k is not None:
+            # Rank successors within each row by descending count
+            rows = np.repeat(np.arange(self.num_contexts), np.diff(self.offsets))
+            order = np.lexsort((self.successors, -self.counts, rows))
+            rank = np.empty(self.num_trigrams, dtype=np.int64)
+            rank[order] = np.arange(self.num_trigrams) - self.offsets[rows[order]]
+            keep &= rank < top_k
+        return self._subset(keep)
+
+    def prune_to_size(self, max_bytes):
+        """
+        Keeps the most frequent trigrams that fit into `max_bytes` of arrays.
+
+        Returns:
+            CompactTrigramStore: self if it already fits, else a new store.
+        """
+        store = self
+        while store.nbytes > max_bytes and store.num_trigrams:
+            # Estimate how many trigrams fit, shrinking a little more each round
+            per_trigram = store.nbytes / store.num_trigrams
+            target = min(int(max_bytes / per_trigram), store.num_trigrams - 1)
+            order = np.argsort(-store.counts, kind='stable')
+            keep = np.zeros(store.num_trigrams, dtype=bool)
+            keep[order[:max(target, 0)]] = True
+            store = store._subset(keep)
+        return store
+
+    def _subset(self, keep):
+        """Returns a store with only the trigrams where `keep` is True."""
+        if keep.all():
+            return self
+        w1, w2, w3, counts = self.triples()
+        return CompactTrigramStore.from_triples(w1[keep], w2[keep], w3[keep], counts[keep])
+
+    @property
+    def num_contexts(self):
+        return len(self.context_keys)
+
+    @property
+    def num_trigrams(self):
+        return len(self.successors)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the count arrays."""
+        return (self.context_keys.nbytes + self.offsets.nbytes
+                + self.successors.nbytes + self.counts.nbytes)
+
+
+def store_from_nested_counts(model, vocab):
+    """
+    Converts the 'dict' backend layout (model[(w1, w2)][w3] = count)
+    into a CompactTrigramStore, adding every token to `vocab`.
+    """
+    add = vocab.add
+    w1, w2, w3, counts = [], [], [], []
+    for (a, b), successors in model.items():
+        a, b = add(a), add(b)
+        for word, count in successors.items():
+            w1.append(a)
+            w2.append(b)
+            w3.append(add(word))
+            counts.append(count)
+    return CompactTrigramStore.from_triples(
+        np.array(w1, dtype=ID_DTYPE), np.array(w2, dtype=ID_DTYPE),
+        np.array(w3, dtype=ID_DTYPE), np.array(counts, dtype=COUNT_DTYPE),
+    )
+
+
+def replace_rare_words(vocab, store, min_count):
+    """
+    Maps every word seen fewer than `min_count` times to <UNK>.
+
+    Word frequencies are read off the counts themselves: in padded
+    sentences each word occurrence is the last word (w3) of exactly one
+    trigram. The special tokens are always kept.
+
+    Returns:
+        (vocab, store): a new, smaller Vocabulary and the re-counted store.
+    """
+    _, _, successors, counts = store.triples()
+    word_counts = np.bincount(successors, weights=counts, minlength=len(vocab))
+    keep = word_counts >= min_count
+    keep[[BOS_ID, EOS_ID, UNK_ID]] = True
+
+    new_vocab = Vocabulary(token for token, kept in zip(vocab.id_to_token, keep) if kept)
+    remap = np.full(len(vocab), UNK_ID, dtype=ID_DTYPE)
+    remap[keep] = np.arange(np.count_nonzero(keep), dtype=ID_DTYPE)
+
+    w1, w2, w3, counts = store.triples()
+    return new_vocab, CompactTrigramStore.from_triples(remap[w1], remap[w2], remap[w3], counts)
@@ -0,0 +1,133 @@
+import heapq
+
+import numpy as np
+
+from src.count_store import BOS_ID, EOS_ID
+
+
+class DecodingTables:
+    """
+    Successor lists sorted by count, for top-k / top-p / temperature sampling
+    and beam search. Built once per frozen model (see TrigramModel._decoding_tables).
+
+    Within each CSR row the successors are reordered by descending count
+    (ties by token ID), with a global running total over that order:
+
+        successors, counts   the reordered store arrays
+        cumulative           running total of `counts` (int64)
+        logprob              log(count / row total) of every entry
+
+    The top-k candidates of a row are then its first k entries and the top-p
+    nucleus its shortest prefix whose counts reach p * row total (one binary
+    search on `cumulative`), so no decoding step sorts or normalizes counts.
+    """
+
+    def __init__(self, tables):
+        store = tables.store
+        self.offsets = store.offsets
+        self.row_base = tables.row_base
+        self.row_total = tables.row_total
+
+        # 1. Reorder every row by descending count
+        rows = np.repeat(np.arange(store.num_contexts), np.diff(store.offsets))
+        order = np.lexsort((store.successors, -store.counts, rows))
+        self.successors = store.successors[order]
+        self.counts = store.counts[order]
+
+        # 2. Running total in the new order (row totals and bases do not change)
+        self.cumulative = np.cumsum(self.counts)
+
+        # 3. Log-probabilities for beam search and temperature sampling
+        with np.errstate(divide='ignore'):
+            self.logprob = np.log(self.counts) - np.log(self.row_total.astype(np.float64))[rows]
+
+    def candidates(self, row, top_k=None, top_p=None):
+        """
+        Returns (start, stop): the slice of the sorted arrays kept for context
+        row `row` after the top-k and top-p cut-offs.
+        """
+        start, stop = self.offsets.item(row), self.offsets.item(row + 1)
+        if top_k is not None:
+            stop = min(stop, start + top_k)
+        if top_p is not None:
+            # Shortest prefix whose counts reach top_p of the row total
+            target = self.row_base.item(row) + top_p * self.row_total.item(row)
+            stop = min(stop, int(self.cumulative[start:stop].searchsorted(target)) + start + 1)
+        return start, stop
+
+    def sample(self, row, u, temperature=1.0, top_k=None, top_p=None):
+        """
+        Draws the next ID for context row `row` using uniform number u in [0, 1).
+
+        temperature=0 is greedy decoding (the most frequent successor).
+        """
+        start, stop = self.candidates(row, top_k, top_p)
+        if temperature == 0:
+            return self.successors.item(start)
+
+        if temperature == 1.0:
+            # Count-weighted draw over the kept prefix, as in InferenceTables.sample_next
+            base = self.row_base.item(row)
+            target = base + int(u * (self.cumulative.item(stop - 1) - base))
+            return self.successors.item(int(self.cumulative[start:stop].searchsorted(target, side='right')) + start)
+
+        # p ~ count ** (1 / T); the first entry has the largest count, so the
+        # exponent never exceeds 0
+        logprob = self.logprob[start:stop]
+        weights = np.cumsum(np.exp((logprob - logprob[0]) / temperature))
+        return self.successors.item(int(weights.searchsorted(u * weights[-1], side='right')) + start)
+
+    def generate_ids(self, store, max_length, uniform, temperature=1.0, top_k=None, top_p=None):
+        """Samples one sentence of token IDs (see InferenceTables.generate_ids)."""
+        w1, w2 = BOS_ID, BOS_ID
+        generated_ids = []
+        for _ in range(max_length):
+            row = store.find_context(w1, w2)
+            if row < 0:
+                break
+            next_id = self.sample(row, uniform(), temperature, top_k, top_p)
+            if next_id == EOS_ID:
+                break
+            generated_ids.append(next_id)
+            w1, w2 = w2, next_id
+        return generated_ids
+
+    def beam_search(self, store, prefix_ids, beam_width=5, n_best=1, max_length=20):
+        """
+        The `n_best` most probable continuations of `prefix_ids`.
+
+        Every step extends each of the `beam_width` best partial sequences by
+        its `beam_width` most frequent successors only (a prefix of its sorted
+        row) and keeps the `beam_width` best results. A sequence finishes at
+        </s>, at an unseen context or after `max_length` new tokens.
+
+        Returns:
+            list of (ids, logprob) pairs, best first; ids exclude the prefix
+            and the final </s>.
+        """
+        context = [BOS_ID, BOS_ID] + list(prefix_ids)
+        beams = [(0.0, [], context[-2], context[-1])]
+        finished = []
+
+        for _ in range(max_length):
+            expanded = []
+            for logprob, ids, w1, w2 in beams:
+                row = store.find_context(w1, w2)
+                if row < 0:
+                    finished.append((logprob, ids))
+                    continue
+                start, stop = self.candidates(row, top_k=beam_width)
+                for next_id, step in zip(self.successors[start:stop].tolist(),
+                                         self.logprob[start:stop].tolist()):
+                    if next_id == EOS_ID:
+                        finished.append((logprob + step, ids))
+                    else:
+                        expanded.append((logprob + step, ids + [next_id], w2, next_id))
+            beams = heapq.nlargest(beam_width, expanded, key=lambda beam: beam[0])
+            # Stop once no open beam can beat the n_best-th finished sequence
+            if not beams or (len(finished) >= n_best
+                             and beams[0][0] <= heapq.nlargest(n_best, finished)[-1][0]):
+                break
+
+        finished.extend((logprob, ids) for logprob, ids, _, _ in beams)
+        return [(ids, logprob) for logprob, ids in heapq.nlargest(n_best, finished, key=lambda f: f[0])]
@@ -1,28 +1,42 @@
-from ngram_model import TrigramModel
+import argparse
+import os
+
+from src.ngram_model import TrigramModel
+from data.corpus_reader import parallel_training_sentences, split_sentences
 from data.data_preprocessing import preprocess_dataframe, prepare_ngrams
-import pandas as pd
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                           "FRANKENSTEIN.txt")
 
 def preprocess_for_model(text):
     """Preprocess raw text exactly like your full pipeline."""
-    df = pd.DataFrame([text], columns=["text"])
-    # step 1: clean
+    # Imported here so that importing this module stays cheap (see src/cli.py)
+    import pandas as pd
+
+    # step 1: one row per sentence (a whole book in one row would be padded
+    # once, as a single giant "sentence")
+    df = pd.DataFrame(split_sentences(text), columns=["text"])
+    # step 2: clean
     df = preprocess_dataframe(df, "text")
-    # step 2: tokenize + pad + UNK replacement
+    # step 3: tokenize + pad + UNK replacement
     ngram_df = prepare_ngrams(df, "text", n=3)
     # return the list-of-tokens (not dataframe)
     return ngram_df["tokens"].tolist()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Train on a text file and print a generated text.")
+    parser.add_argument("corpus", nargs="?", default=CORPUS_PATH)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Processes used to clean and tokenize the corpus")
+    args = parser.parse_args()
+
     # Create a new TrigramModel
     model = TrigramModel()
 
-    # Train the model on the example corpus
-    with open("ml-intern-assessment\FRANKENSTEIN.txt", "r") as f:
-        text = f.read()
-    
-    text = preprocess_for_model(text)
-    model.fit(text)
+    # Train the model: the corpus is read in chunks, split into sentences and
+    # cleaned in parallel, and the padded sentences are counted as they arrive
+    model.fit_stream(parallel_training_sentences(args.corpus, n=3, n_jobs=args.jobs))
 
     # Generate new text
     generated_text = model.generate()
@@ -0,0 +1,115 @@
+import numpy as np
+
+from src.count_store import BOS_ID, EOS_ID
+
+
+class InferenceTables:
+    """
+    Read-only tables built once when a TrigramModel is frozen.
+
+    Sampling uses one global cumulative-count array over the CSR store:
+    for context row r the successors occupy [offsets[r], offsets[r + 1]),
+    and drawing u in [0, 1) picks the entry whose cumulative count first
+    exceeds  row_base[r] + floor(u * row_total[r]).
+    That is a single binary search per token instead of rebuilding the
+    candidate lists on every step, and it vectorizes over many contexts.
+    """
+
+    # Arrays written by TrigramModel.save() so a loaded model can skip the rebuild
+    ARRAY_NAMES = ('cumulative', 'row_base', 'row_total')
+
+    def __init__(self, vocab, store, arrays=None):
+        self.vocab = vocab
+        self.store = store
+        # Kneser-Ney tables (src/scoring.py), built on the first scoring call
+        self.scoring = None
+        # Count-sorted successor lists (src/decoding.py), built on the first
+        # top-k / top-p / temperature / beam search call
+        self.decoding = None
+
+        if arrays is not None:
+            for name in self.ARRAY_NAMES:
+                setattr(self, name, arrays[name])
+            return
+
+        # 1. Running total of all counts (int64, exact)
+        self.cumulative = np.cumsum(store.counts)
+
+        # 2. Cumulative count just before each row starts, and each row's total
+        starts, ends = store.offsets[:-1], store.offsets[1:]
+        before = np.concatenate(([0], self.cumulative))
+        self.row_base = before[starts]
+        self.row_total = before[ends] - self.row_base
+
+    def arrays(self):
+        """Returns the precomputed arrays by name (see ARRAY_NAMES)."""
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    def sample_next(self, w1, w2, u):
+        """
+        Draws the ID following context (w1, w2) using uniform number u in [0, 1).
+        Returns -1 if the context was never seen (dead end).
+        """
+        row = self.store.find_context(w1, w2)
+        if row < 0:
+            return -1
+        target = self.row_base.item(row) + int(u * self.row_total.item(row))
+        return self.store.successors.item(int(self.cumulative.searchsorted(target, side='right')))
+
+    def sample_next_batch(self, w1, w2, u):
+        """Vectorized sample_next over arrays of contexts and uniform numbers."""
+        rows = self.store.find_contexts(w1, w2)
+        next_ids = np.full(len(rows), -1, dtype=np.int64)
+        seen = rows >= 0
+        if not seen.any():
+            return next_ids
+        rows = rows[seen]
+        targets = self.row_base[rows] + (u[seen] * self.row_total[rows]).astype(np.int64)
+        next_ids[seen] = self.store.successors[np.searchsorted(self.cumulative, targets, side='right')]
+        return next_ids
+
+    def generate_ids(self, max_length, uniform):
+        """
+        Samples one sentence of token IDs. `uniform` is a zero-argument
+        callable returning floats in [0, 1), e.g. random.random.
+        """
+        w1, w2 = BOS_ID, BOS_ID
+        generated_ids = []
+        for _ in range(max_length):
+            next_id = self.sample_next(w1, w2, uniform())
+            if next_id < 0 or next_id == EOS_ID:
+                break
+            generated_ids.append(next_id)
+            w1, w2 = w2, next_id
+        return generated_ids
+
+    def generate_batch_ids(self, n, max_length, rng):
+        """
+        Advances `n` sequences in lockstep, one vectorized sampling call per step.
+
+        Returns:
+            (ids, lengths): an (n, max_length) int array and the number of
+            valid IDs in each row.
+        """
+        ids = np.full((n, max_length), EOS_ID, dtype=np.int64)
+        lengths = np.zeros(n, dtype=np.int64)
+        w1 = np.full(n, BOS_ID, dtype=np.int64)
+        w2 = np.full(n, BOS_ID, dtype=np.int64)
+        active = np.arange(n)
+
+        for step in range(max_length):
+            if len(active) == 0:
+                break
+            next_ids = self.sample_next_batch(w1[active], w2[active], rng.random(len(active)))
+
+            # Sequences that hit </s> or an unseen context are finished
+            keep = (next_ids >= 0) & (next_ids != EOS_ID)
+            active, next_ids = active[keep], next_ids[keep]
+
+            # Every still-active sequence has exactly `step` tokens so far
+            ids[active, step] = next_ids
+            lengths[active] += 1
+            w1[active] = w2[active]
+            w2[active] = next_ids
+
+        return ids, lengths
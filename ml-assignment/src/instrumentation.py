@@ -0,0 +1,142 @@
+"""
+Opt-in timing and metrics for the training and generation hot paths.
+
+Pass a Metrics object to the pipeline to switch instrumentation on:
+
+    metrics = Metrics(callback=print)
+    df = preprocess_dataframe(df, 'text', metrics=metrics)      # stage 'clean'
+    df = prepare_ngrams(df, 'text', metrics=metrics)            # 'tokenize', 'vocab', 'pad'
+    model = TrigramModel(metrics=metrics)
+    model.fit(df['tokens'])                                     # 'count'
+    model.generate()                                            # 'generate'
+    metrics.summary()
+
+Every measurement is also sent as an event dict to `callback`, e.g.
+logging_callback() forwards them to the `logging` module. Without a Metrics
+object the pipeline uses NULL_METRICS, whose methods do nothing, and the
+per-call generate bookkeeping is skipped entirely.
+"""
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Metrics:
+    """
+    Records per-stage timings, counters and gauges.
+
+    Stages are timed with `with metrics.stage(name, tokens=N):`; when a stage
+    reports how many tokens it processed, summary() also gives tokens/sec.
+    """
+
+    enabled = True
+
+    def __init__(self, callback=None):
+        """
+        Args:
+            callback (callable, optional): Called with one event dict per
+                measurement: {'event': 'stage', 'stage', 'seconds', ...},
+                {'event': 'counter', 'name', 'value'} or
+                {'event': 'gauge', 'name', 'value'}.
+        """
+        self.callback = callback
+        self.stages = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'tokens': 0})
+        self.counters = defaultdict(int)
+        self.gauges = {}
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """
+        Times the body of the `with` block as one call of stage `name`.
+
+        Extra fields (e.g. tokens=...) are added to the event; the yielded dict
+        can be filled in inside the block when a field is only known at the end.
+        """
+        start = time.perf_counter()
+        yield fields
+        seconds = time.perf_counter() - start
+        record = self.stages[name]
+        record['calls'] += 1
+        record['seconds'] += seconds
+        record['tokens'] += fields.get('tokens', 0)
+        self._emit({'event': 'stage', 'stage': name, 'seconds': seconds, **fields})
+
+    def count(self, name, value=1):
+        """Adds `value` to counter `name`."""
+        self.counters[name] += value
+        self._emit({'event': 'counter', 'name': name, 'value': value})
+
+    def gauge(self, name, value):
+        """Sets gauge `name` (e.g. the model size in bytes) to `value`."""
+        self.gauges[name] = value
+        self._emit({'event': 'gauge', 'name': name, 'value': value})
+
+    def _emit(self, event):
+        if self.callback is not None:
+            self.callback(event)
+
+    def summary(self):
+        """
+        Returns:
+            dict: {'stages': {name: {'calls', 'seconds', 'tokens', 'tokens_per_sec'}},
+                   'counters': {...}, 'gauges': {...},
+                   'generate': {'hit_rate', 'dead_end_rate'}} (the last one once
+                   something was generated).
+        """
+        stages = {}
+        for name, record in self.stages.items():
+            stages[name] = dict(record)
+            if record['tokens'] and record['seconds'] > 0:
+                stages[name]['tokens_per_sec'] = record['tokens'] / record['seconds']
+        summary = {'stages': stages, 'counters': dict(self.counters), 'gauges': dict(self.gauges)}
+
+        lookups = self.counters.get('generate.lookups', 0)
+        if lookups:
+            dead_ends = self.counters.get('generate.dead_ends', 0)
+            summary['generate'] = {
+                # Share of context lookups that found successors
+                'hit_rate': (lookups - dead_ends) / lookups,
+                # Share of samples that stopped at an unseen context
+                'dead_end_rate': dead_ends / self.counters['generate.samples'],
+            }
+        return summary
+
+    def reset(self):
+        """Forgets everything recorded so far."""
+        self.stages.clear()
+        self.counters.clear()
+        self.gauges.clear()
+
+
+class _NullMetrics:
+    """Stand-in used when instrumentation is off: every method is a no-op."""
+
+    enabled = False
+
+    @contextmanager
+    def stage(self, name, **fields):
+        yield fields
+
+    def count(self, name, value=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+def logging_callback(logger=None, level=logging.INFO):
+    """
+    Returns a Metrics callback that writes every event to a logger
+    (default: the 'ngram.metrics' logger).
+    """
+    logger = logger or logging.getLogger('ngram.metrics')
+
+    def callback(event):
+        details = ' '.join(f"{key}={value}" for key, value in event.items() if key != 'event')
+        logger.log(level, "%s %s", event['event'], details)
+
+    return callback
@@ -0,0 +1,143 @@
+"""
+Versioned binary file format for trained TrigramModels.
+
+Layout (all integers little-endian):
+
+    8 bytes   magic  b"TRIGRAM\\0"
+    4 bytes   format version (uint32)
+    4 bytes   header length H (uint32)
+    H bytes   UTF-8 JSON header:
+                {"arrays": {name: {"dtype": ..., "shape": [...], "offset": ...}}, ...}
+    ...       raw array data, every array starting on a 64-byte boundary
+              (header offsets are relative to the first aligned byte after the header)
+
+The vocabulary is stored as two arrays (UTF-8 bytes of all tokens and
+their character offsets), the counts as the CSR arrays of
+CompactTrigramStore and the sampling tables of InferenceTables.
+Because the arrays are raw and aligned they can be memory-mapped: loading
+only parses the header and the vocabulary, and many processes mapping
+the same file share its pages through the OS page cache.
+"""
+import json
+import mmap
+import struct
+
+import numpy as np
+
+from src.count_store import CompactTrigramStore, Vocabulary
+
+MAGIC = b"TRIGRAM\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def encode_vocab(vocab):
+    """Packs the tokens (in ID order) into a uint8 array and int64 char offsets."""
+    text = "".join(vocab.id_to_token)
+    lengths = [len(token) for token in vocab.id_to_token]
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return np.frombuffer(text.encode("utf-8"), dtype=np.uint8), offsets
+
+
+def decode_vocab(text_bytes, offsets):
+    text = bytes(text_bytes).decode("utf-8")
+    bounds = offsets.tolist()
+    return Vocabulary.from_tokens([text[a:b] for a, b in zip(bounds[:-1], bounds[1:])])
+
+
+def write_arrays(path, arrays, metadata=None):
+    """
+    Writes named NumPy arrays in the aligned layout described above.
+
+    Args:
+        path (str): Output file.
+        arrays (dict): name -> np.ndarray.
+        metadata (dict, optional): Extra JSON-serialisable header fields.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Offsets in the header are relative to the start of the data section,
+    # which begins at the first aligned position after the header.
+    entries, position = {}, 0
+    for name, array in arrays.items():
+        position = _align(position)
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": position}
+        position += array.nbytes
+
+    header_bytes = json.dumps(dict(metadata or {}, arrays=entries)).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(array.tobytes())
+        # Make sure trailing empty arrays still point inside the file
+        f.truncate(data_start + _align(position))
+
+
+def read_arrays(path, mmap_mode=True):
+    """
+    Reads a file written by write_arrays.
+
+    Returns:
+        (header, arrays): the JSON header and a dict of read-only arrays.
+        With mmap_mode=True the arrays are views into a shared read-only
+        memory map; otherwise the file is read into memory.
+    """
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size or not preamble.startswith(MAGIC):
+            raise ValueError(f"{path} is not a saved TrigramModel")
+        _, version, header_length = _PREAMBLE.unpack(preamble)
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {version}, "
+                             f"this code reads up to version {FORMAT_VERSION}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+        if mmap_mode:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            buffer = f.read()
+
+    data_start = _align(_PREAMBLE.size + header_length)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=dtype, count=count,
+                              offset=data_start + entry["offset"])
+        arrays[name] = array.reshape(entry["shape"])
+    return header, arrays
+
+
+def save_model(tables, path):
+    """Saves a vocabulary, CSR store and sampling tables (an InferenceTables)."""
+    vocab_bytes, vocab_offsets = encode_vocab(tables.vocab)
+    arrays = {"vocab_bytes": vocab_bytes, "vocab_offsets": vocab_offsets}
+    arrays.update({name: getattr(tables.store, name) for name in CompactTrigramStore.ARRAY_NAMES})
+    arrays.update(tables.arrays())
+    write_arrays(path, arrays, {"model": "TrigramModel"})
+
+
+def load_model_arrays(path, mmap_mode=True):
+    """
+    Loads a file written by save_model.
+
+    Returns:
+        (vocab, store, table_arrays): the Vocabulary, the CompactTrigramStore
+        and the remaining arrays by name (used to rebuild InferenceTables).
+    """
+    header, arrays = read_arrays(path, mmap_mode)
+    if header.get("model") != "TrigramModel":
+        raise ValueError(f"{path} does not contain a TrigramModel")
+    vocab = decode_vocab(arrays.pop("vocab_bytes"), arrays.pop("vocab_offsets"))
+    store = CompactTrigramStore(*(arrays.pop(name) for name in CompactTrigramStore.ARRAY_NAMES))
+    return vocab, store, arrays
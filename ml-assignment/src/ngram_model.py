@@ -1,49 +1,441 @@
+import os
 import random
-import pandas as pd
-import ast
+from itertools import islice
+import numpy as np
 from collections import defaultdict, Counter
+from src.count_store import (
+    BOS_ID, EOS_ID, UNK_ID, ID_DTYPE, CompactTrigramStore, Vocabulary, sentence_trigrams,
+    flat_trigrams, replace_rare_words, store_from_nested_counts,
+)
+from data.token_corpus import TokenCorpus, load_token_corpus
+from src.inference import InferenceTables
+from src.model_io import load_model_arrays, save_model
+from src.scoring import ScoringTables
+from src.decoding import DecodingTables
+from src.instrumentation import NULL_METRICS
+from src.ngram_trie import NGramTrie
+from src.utils import estimate_nested_counts_bytes, estimate_vocab_bytes
+
+BACKENDS = ('dict', 'compact')
 
 class TrigramModel:
-    def __init__(self):
+    def __init__(self, backend='dict', min_count=None, max_bytes=None, metrics=None):
         """
         Initializes the TrigramModel.
+
+        Args:
+            backend (str): How the counts are stored.
+                'dict'    -> nested dictionary of strings (simple, flexible).
+                'compact' -> integer token IDs + NumPy CSR arrays (far less memory).
+            min_count (int, optional): If set, words seen fewer times are
+                mapped to <UNK> when the model is frozen. The raw counts are
+                kept, so partial_fit() and merge() stay purely additive.
+            max_bytes (int, optional): 'compact' backend only. Hard cap on the
+                count arrays: whenever training pushes them above it, the
+                least frequent trigrams are dropped (lossy, see prune()).
+            metrics (Metrics, optional): Records timings of fit ('count') and
+                generate ('generate'), tokens/sec, context hit/dead-end counts
+                and the model size (see src/instrumentation.py). Off by default.
         """
-        # 1. Data Structure: Nested Dictionary
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        if max_bytes is not None and backend != 'compact':
+            raise ValueError("max_bytes needs the 'compact' backend")
+        self.backend = backend
+        self.min_count = min_count
+        self.max_bytes = max_bytes
+
+        # 1. Data Structure: Nested Dictionary ('dict' backend)
         # Structure: self.model[(w1, w2)][w3] = count
         # This maps a 'context' (tuple of 2 words) to a Counter of possible next words.
-        self.model = defaultdict(Counter)
-        
-    def fit(self, sentences):
+        self.model = defaultdict(Counter) if backend == 'dict' else None
+
+        # 2. Data Structure: Vocabulary + CSR arrays ('compact' backend)
+        # Tokens are mapped to integer IDs and the counts live in contiguous
+        # arrays, see src/count_store.py for the layout.
+        self.vocab = Vocabulary() if backend == 'compact' else None
+        self.store = CompactTrigramStore.empty() if backend == 'compact' else None
+
+        # 3. Inference tables, built by freeze() and dropped again by fit()
+        self.tables = None
+
+        # 4. One report per pruning step (see prune() and max_bytes)
+        self.pruning_log = []
+
+        # 5. Opt-in instrumentation (NULL_METRICS does nothing)
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+
+    @property
+    def num_contexts(self):
+        """Number of distinct (w1, w2) contexts learned so far."""
+        if self.backend == 'compact':
+            return self.store.num_contexts
+        return len(self.model)
+
+    @property
+    def num_trigrams(self):
+        """Number of distinct trigrams learned so far."""
+        if self.backend == 'compact':
+            return self.store.num_trigrams
+        return sum(len(successors) for successors in self.model.values())
+
+    def memory_footprint(self):
+        """
+        Estimated bytes held by the counts and vocabulary
+        (exact array sizes for 'compact', a sys.getsizeof walk for 'dict').
+        """
+        if self.backend == 'compact':
+            return self.store.nbytes + estimate_vocab_bytes(self.vocab)
+        return estimate_nested_counts_bytes(self.model)
+
+    def prune(self, min_count=None, top_k=None, max_bytes=None):
+        """
+        Removes rare trigrams to trade memory for quality.
+
+        Args:
+            min_count (int, optional): Drop trigrams seen fewer times.
+            top_k (int, optional): Keep only the k most frequent successors
+                of each context (ties are broken deterministically).
+            max_bytes (int, optional): 'compact' backend only. Then keep the
+                most frequent trigrams whose count arrays fit into max_bytes.
+
+        Returns:
+            dict: What was removed: policy, contexts_removed, trigrams_removed,
+            bytes_before, bytes_after. Also appended to self.pruning_log.
+        """
+        if max_bytes is not None and self.backend != 'compact':
+            raise ValueError("max_bytes needs the 'compact' backend")
+        before = self._size_snapshot()
+        self.tables = None
+
+        if self.backend == 'compact':
+            self.store = self.store.prune(min_count, top_k)
+            if max_bytes is not None:
+                self.store = self.store.prune_to_size(max_bytes)
+        else:
+            for context in list(self.model):
+                successors = self.model[context]
+                if min_count is not None:
+                    successors = {w: c for w, c in successors.items() if c >= min_count}
+                if top_k is not None:
+                    # sorted() is stable, so ties keep first-seen order
+                    successors = dict(sorted(successors.items(), key=lambda item: -item[1])[:top_k])
+                if successors:
+                    self.model[context] = Counter(successors)
+                else:
+                    del self.model[context]
+
+        policy = f"min_count={min_count}, top_k={top_k}, max_bytes={max_bytes}"
+        return self._log_pruning(policy, before)
+
+    def _size_snapshot(self):
+        return self.num_contexts, self.num_trigrams, self.memory_footprint()
+
+    def _log_pruning(self, policy, before):
+        contexts, trigrams, nbytes = before
+        report = {
+            'policy': policy,
+            'contexts_removed': contexts - self.num_contexts,
+            'trigrams_removed': trigrams - self.num_trigrams,
+            'bytes_before': nbytes,
+            'bytes_after': self.memory_footprint(),
+        }
+        self.pruning_log.append(report)
+        return report
+
+    def _enforce_memory_cap(self):
+        """Applies max_bytes after the store grew (no-op without a cap)."""
+        if self.max_bytes is not None and self.store.nbytes > self.max_bytes:
+            self.prune(max_bytes=self.max_bytes)
+
+    @property
+    def is_frozen(self):
+        """True while the model is in inference mode (see freeze())."""
+        return self.tables is not None
+
+    def freeze(self):
+        """
+        Switches the model to inference mode.
+
+        Precomputes cumulative-count sampling tables for every context once,
+        so generate() does a single binary search per token and
+        generate_batch() can sample many sequences at a time.
+        Calling fit() again unfreezes the model.
+
+        Returns:
+            TrigramModel: self, to allow model.freeze().generate().
+        """
+        self.tables = self._build_tables()
+        return self
+
+    def _build_tables(self):
+        """Builds InferenceTables over the compact view of the current counts."""
+        if self.backend == 'compact':
+            vocab, store = self.vocab, self.store
+        else:
+            vocab = Vocabulary()
+            store = store_from_nested_counts(self.model, vocab)
+        if self.min_count:
+            vocab, store = replace_rare_words(vocab, store, self.min_count)
+        return InferenceTables(vocab, store)
+
+    def save(self, path):
+        """
+        Saves the trained model in the binary format of src/model_io.py.
+
+        The file holds the vocabulary, the CSR counts and the sampling
+        tables, so a loaded model is immediately ready to generate.
+        """
+        save_model(self.tables or self._build_tables(), path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads a model written by save().
+
+        Args:
+            path (str): File written by save().
+            mmap (bool): Memory-map the arrays instead of reading them. Loading
+                then only parses the header and vocabulary, and all processes
+                that load the same file share one copy through the page cache.
+
+        Returns:
+            TrigramModel: A frozen model with the 'compact' backend.
+        """
+        vocab, store, table_arrays = load_model_arrays(path, mmap_mode=mmap)
+        model = cls(backend='compact')
+        model.vocab, model.store = vocab, store
+        model.tables = InferenceTables(vocab, store, table_arrays)
+        return model
+
+    def fit(self, sentences, n_jobs=1):
         """
         Trains the trigram model on the given text (list of token lists).
 
         Args:
-            sentences (list of lists): Padded sentences (e.g. from the training CSV).
+            sentences (list of lists): Padded sentences (e.g. from the training CSV),
+                or a TokenCorpus, which the 'compact' backend counts directly
+                from its ID arrays.
+            n_jobs (int): Number of worker processes. With n_jobs > 1 the
+                sentences are split into contiguous shards that are counted
+                in a process pool and merged in order, giving exactly the
+                same model as the serial fit.
         """
         print(f"Training on {len(sentences)} sentences...")
-        
-        for sentence in sentences:
-            # Iterate through the sentence to create trigrams
-            # We stop at len-2 because we need a lookahead of 3 items
-            for i in range(len(sentence) - 2):
-                w1 = sentence[i]       # History word 1
-                w2 = sentence[i+1]     # History word 2
-                w3 = sentence[i+2]     # Target word
-                
-                # The "Context" is the previous two words
-                context = (w1, w2)
-                
-                # Store the count: counts[w1, w2][w3] += 1
-                self.model[context][w3] += 1
-                
-        print(f"Training complete. Learned {len(self.model)} unique contexts.")
 
-    def generate(self, max_length=50):
+        # New counts make any precomputed sampling tables stale
+        self.tables = None
+
+        with self.metrics.stage('count', backend=self.backend, n_jobs=n_jobs) as fields:
+            if self.metrics.enabled:
+                fields['tokens'] = _count_tokens(sentences)
+
+            if self.backend == 'compact' and isinstance(sentences, TokenCorpus):
+                self._fit_token_corpus(sentences)
+            elif n_jobs > 1:
+                self._fit_parallel(list(sentences), n_jobs)
+            elif self.backend == 'compact':
+                self._fit_compact(sentences)
+            else:
+                count_trigrams(sentences, self.model)
+
+            if self.backend == 'compact':
+                self._enforce_memory_cap()
+        self._record_model_size()
+
+        print(f"Training complete. Learned {self.num_contexts} unique contexts.")
+
+    def _record_model_size(self):
+        """Reports the model size gauges (only when instrumentation is on)."""
+        if self.metrics.enabled:
+            self.metrics.gauge('model.contexts', self.num_contexts)
+            self.metrics.gauge('model.trigrams', self.num_trigrams)
+            self.metrics.gauge('model.memory_bytes', self.memory_footprint())
+
+    def _fit_compact(self, sentences):
+        """
+        Encodes every sentence to token IDs and adds all trigram occurrences
+        to the CSR store in one vectorized sort-and-count pass.
+        """
+        encoded = [self.vocab.encode(sentence) for sentence in sentences]
+        w1, w2, w3 = sentence_trigrams(encoded)
+        self.store = self.store.add_triples(w1, w2, w3)
+
+    def _fit_token_corpus(self, corpus):
+        """
+        Counts a TokenCorpus without decoding it: the corpus IDs are mapped
+        to model IDs with one lookup table and all trigrams are cut out of
+        the flat array at once.
+        """
+        remap = np.array([self.vocab.add(token) for token in corpus.vocab], dtype=ID_DTYPE)
+        ids = remap[corpus.tokens] if len(remap) else np.empty(0, dtype=ID_DTYPE)
+        self.store = self.store.add_triples(*flat_trigrams(ids, corpus.offsets))
+
+    def partial_fit(self, sentences):
+        """
+        Adds the counts of new padded sentences to the model without
+        reprocessing earlier data (fit() accumulates the same way).
+
+        Together with min_count this gives incremental training: pass raw
+        words (e.g. prepare_ngrams(..., min_count=1)) and the vocabulary
+        cut-off is applied once, when the model is frozen.
+
+        Returns:
+            TrigramModel: self.
+        """
+        self.fit(sentences)
+        return self
+
+    def merge(self, other):
+        """
+        Adds all counts of another TrigramModel into this one.
+
+        This is one pass over the other model's counts (plus one sort for
+        the 'compact' backend), so models trained on separate batches can
+        be combined cheaply. The backends do not need to match.
+
+        Returns:
+            TrigramModel: self.
+        """
+        self.tables = None
+
+        if self.backend == 'compact':
+            if other.backend == 'compact':
+                remap = np.array([self.vocab.add(token) for token in other.vocab.id_to_token],
+                                 dtype=ID_DTYPE)
+                w1, w2, w3, counts = other.store.triples()
+                other_store = CompactTrigramStore.from_triples(
+                    remap[w1], remap[w2], remap[w3], counts)
+            else:
+                other_store = store_from_nested_counts(other.model, self.vocab)
+            self.store = CompactTrigramStore.merge([self.store, other_store])
+            self._enforce_memory_cap()
+        elif other.backend == 'compact':
+            decode = other.vocab.id_to_token
+            for w1, w2, w3, count in zip(*(column.tolist() for column in other.store.triples())):
+                self.model[(decode[w1], decode[w2])][decode[w3]] += count
+        else:
+            for context, successors in other.model.items():
+                if successors:
+                    self.model[context].update(successors)
+        return self
+
+    def fit_stream(self, sentences, chunk_size=10_000):
+        """
+        Trains on an iterable of padded sentences without ever holding it in memory.
+
+        Works with any generator, e.g.
+            model.fit_stream(stream_training_sentences("FRANKENSTEIN.txt"))
+
+        Args:
+            sentences (iterable of lists): Padded sentences, consumed once.
+            chunk_size (int): 'compact' backend only. Sentences are encoded and
+                counted in chunks of this many, so memory stays bounded by
+                the model size plus one chunk.
+        """
+        print("Training on a stream of sentences...")
+        self.tables = None
+
+        with self.metrics.stage('count', backend=self.backend, streaming=True):
+            if self.backend == 'compact':
+                self._fit_compact_stream(iter(sentences), chunk_size)
+            else:
+                count_trigrams(sentences, self.model)
+        self._record_model_size()
+
+        print(f"Training complete. Learned {self.num_contexts} unique contexts.")
+
+    def _fit_compact_stream(self, sentences, chunk_size):
+        """
+        Counts each chunk into a small store and merges the pending chunk stores
+        into the main store once they are as large as it (like a log-structured
+        merge), so every trigram is re-sorted only O(log N) times in total.
+        """
+        pending, pending_size = [], 0
+        while True:
+            chunk = list(islice(sentences, chunk_size))
+            if not chunk:
+                break
+            w1, w2, w3 = sentence_trigrams([self.vocab.encode(sentence) for sentence in chunk])
+            chunk_store = CompactTrigramStore.from_triples(w1, w2, w3)
+            pending.append(chunk_store)
+            pending_size += chunk_store.num_trigrams
+            if pending_size >= self.store.num_trigrams:
+                self.store = CompactTrigramStore.merge([self.store] + pending)
+                pending, pending_size = [], 0
+                self._enforce_memory_cap()
+        if pending:
+            self.store = CompactTrigramStore.merge([self.store] + pending)
+            self._enforce_memory_cap()
+
+    def _fit_parallel(self, sentences, n_jobs):
+        """
+        Counts contiguous shards in a process pool, then reduces them in shard order.
+
+        Merging in order keeps first-seen order of contexts, successors and
+        vocabulary IDs the same as a single pass over all sentences.
+        """
+        shard_size = max(1, -(-len(sentences) // n_jobs))  # ceiling division
+        shards = [sentences[i:i + shard_size] for i in range(0, len(sentences), shard_size)]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            if self.backend == 'compact':
+                results = list(pool.map(_count_shard_compact, shards))
+            else:
+                results = list(pool.map(_count_shard_dict, shards))
+
+        if self.backend == 'compact':
+            # One concatenate + sort-and-count over every shard's (remapped) triples
+            parts = [self.store.triples()]
+            for tokens, store in results:
+                remap = np.array([self.vocab.add(token) for token in tokens], dtype=ID_DTYPE)
+                w1, w2, w3, counts = store.triples()
+                parts.append((remap[w1], remap[w2], remap[w3], counts))
+            self.store = CompactTrigramStore.from_triples(
+                *(np.concatenate(column) for column in zip(*parts)))
+        else:
+            for shard_counts in results:
+                for context, successors in shard_counts.items():
+                    self.model[context].update(successors)
+
+    def generate(self, max_length=50, temperature=1.0, top_k=None, top_p=None):
         """
         Generates new text using the trained trigram model.
         
         Uses Probabilistic Sampling (not greedy search).
+
+        Args:
+            max_length (int): Maximum number of words.
+            temperature (float): Sharpens (< 1) or flattens (> 1) the count
+                distribution; 0 always picks the most frequent word (greedy).
+            top_k (int, optional): Only sample among the k most frequent successors.
+            top_p (float, optional): Only sample among the most frequent
+                successors that together make up this share of the counts.
+            Any of the last three freezes the model (see DecodingTables).
         """
+        metrics = self.metrics
+        if metrics.enabled:
+            return self._generate_instrumented(metrics, max_length, temperature, top_k, top_p)
+        return self._sample_text(max_length, temperature, top_k, top_p)
+
+    def _sample_text(self, max_length, temperature, top_k, top_p):
+        """The sampling behind generate(), without instrumentation."""
+        if temperature != 1.0 or top_k is not None or top_p is not None:
+            _check_decoding_options(temperature, top_k, top_p)
+            decoding = self._decoding_tables()
+            generated_ids = decoding.generate_ids(self.tables.store, max_length, random.random,
+                                                  temperature, top_k, top_p)
+            return " ".join(self.tables.vocab.decode(generated_ids))
+
+        if self.tables is not None:
+            generated_ids = self.tables.generate_ids(max_length, random.random)
+            return " ".join(self.tables.vocab.decode(generated_ids))
+
+        if self.backend == 'compact':
+            return self._generate_compact(max_length)
+
         # 1. Start with the standard padding
         current_sequence = ['<s>', '<s>']
         generated_sentence = []
@@ -54,8 +446,9 @@ class TrigramModel:
             w2 = current_sequence[-1]
             context = (w1, w2)
             
-            # Retrieve possible next words (The Counter object)
-            possible_next_words = self.model[context]
+            # Retrieve possible next words (The Counter object, or None if unseen;
+            # .get() so that a lookup never adds an empty context to the defaultdict)
+            possible_next_words = self.model.get(context)
             
             # Dead End Check: If the model has never seen this sequence of 2 words, stop.
             if not possible_next_words:
@@ -85,27 +478,390 @@ class TrigramModel:
             
         return " ".join(generated_sentence)
 
+    def _generate_instrumented(self, metrics, max_length, *decoding_options):
+        """
+        generate() wrapped in a 'generate' stage of `metrics`. Why the sample
+        stopped is worked out afterwards from its last context, so the
+        sampling loops themselves carry no bookkeeping. `metrics` is passed
+        in rather than read from self during the call, so concurrent calls
+        never record into another call's object.
+        """
+        with metrics.stage('generate', samples=1) as fields:
+            text = self._sample_text(max_length, *decoding_options)
+            words = text.split()
+            fields['tokens'] = len(words)
+
+        context = (['<s>', '<s>'] + words)[-2:]
+        if len(words) == max_length:
+            stop, lookups = 'max_length', len(words)
+        elif self._has_successors(*context):
+            stop, lookups = 'eos', len(words) + 1
+        else:
+            stop, lookups = 'dead_ends', len(words) + 1
+        metrics.count('generate.samples')
+        metrics.count('generate.tokens', len(words))
+        metrics.count('generate.lookups', lookups)
+        metrics.count(f'generate.{stop}')
+        return text
+
+    def _has_successors(self, w1, w2):
+        """True if the context (w1, w2) was seen in training."""
+        if self.backend == 'dict' and self.tables is None:
+            return bool(self.model.get((w1, w2)))
+        vocab, store = (self.vocab, self.store) if self.tables is None else (self.tables.vocab, self.tables.store)
+        token_to_id = vocab.token_to_id
+        if w1 not in token_to_id or w2 not in token_to_id:
+            return False
+        return store.find_context(token_to_id[w1], token_to_id[w2]) >= 0
+
+    def _generate_compact(self, max_length):
+        """Same sampling loop as generate(), working on token IDs."""
+        w1, w2 = BOS_ID, BOS_ID
+        generated_ids = []
+
+        for _ in range(max_length):
+            row = self.store.find_context(w1, w2)
+
+            # Dead End Check: unseen context
+            if row < 0:
+                break
+
+            successors, counts = self.store.row(row)
+            next_id = random.choices(successors.tolist(), weights=counts.tolist(), k=1)[0]
+
+            if next_id == EOS_ID:
+                break
+
+            generated_ids.append(next_id)
+            w1, w2 = w2, next_id
+
+        return " ".join(self.vocab.decode(generated_ids))
+
+    def generate_batch(self, n, max_length=50, seed=None):
+        """
+        Generates `n` texts at once.
+
+        All sequences advance together and each step samples the next word
+        for every unfinished sequence with one vectorized NumPy call.
+        Freezes the model first if needed.
+
+        Args:
+            n (int): Number of texts to generate.
+            max_length (int): Maximum number of words per text.
+            seed (int, optional): Fixed seed -> identical output on every call.
+
+        Returns:
+            list of str: The generated texts.
+        """
+        if self.tables is None:
+            self.freeze()
+        rng = np.random.default_rng(seed)
+        with self.metrics.stage('generate', samples=n) as fields:
+            ids, lengths = self.tables.generate_batch_ids(n, max_length, rng)
+            fields['tokens'] = int(lengths.sum())
+        if self.metrics.enabled:
+            self._record_batch_stops(ids, lengths, max_length)
+        decode = self.tables.vocab.decode
+        return [" ".join(decode(row[:length].tolist())) for row, length in zip(ids, lengths)]
+
+    # --- Scoring ---
+
+    def _record_batch_stops(self, ids, lengths, max_length):
+        """generate_batch() version of the stop-reason counters of _generate_instrumented."""
+        n = len(lengths)
+        padded = np.concatenate([np.full((n, 2), BOS_ID, dtype=ids.dtype), ids], axis=1)
+        rows = np.arange(n)
+        # Last context of every sample: padded[lengths], padded[lengths + 1]
+        seen = self.tables.store.find_contexts(padded[rows, lengths], padded[rows, lengths + 1]) >= 0
+        full = lengths == max_length
+        dead_ends = int(np.count_nonzero(~full & ~seen))
+        self.metrics.count('generate.samples', n)
+        self.metrics.count('generate.tokens', int(lengths.sum()))
+        self.metrics.count('generate.lookups', int(lengths.sum()) + int(np.count_nonzero(~full)))
+        self.metrics.count('generate.max_length', int(np.count_nonzero(full)))
+        self.metrics.count('generate.eos', int(np.count_nonzero(~full & seen)))
+        self.metrics.count('generate.dead_ends', dead_ends)
+
+    def _decoding_tables(self):
+        """Freezes the model if needed and returns its count-sorted DecodingTables."""
+        if self.tables is None:
+            self.freeze()
+        if self.tables.decoding is None:
+            self.tables.decoding = DecodingTables(self.tables)
+        return self.tables.decoding
+
+    def beam_search(self, prefix='', beam_width=5, n_best=1, max_length=20):
+        """
+        Finds the most probable continuations of a prompt with beam search.
+
+        Args:
+            prefix (str or list): Prompt words (cleaned like the training
+                text); unknown words become <UNK>.
+            beam_width (int): Sequences kept, and successors tried per sequence, at every step.
+            n_best (int): Number of continuations returned.
+            max_length (int): Maximum number of new words.
+
+        Returns:
+            list of (text, logprob): Best first; logprob is the natural-log
+            probability of the continuation (including </s> if it ended there).
+        """
+        if beam_width < 1 or n_best < 1:
+            raise ValueError("beam_width and n_best must be at least 1")
+        decoding = self._decoding_tables()
+        tokens = prefix.split() if isinstance(prefix, str) else list(prefix)
+        token_to_id = self.tables.vocab.token_to_id
+        prefix_ids = [token_to_id.get(token, UNK_ID) for token in tokens]
+        results = decoding.beam_search(self.tables.store, prefix_ids, beam_width, n_best, max_length)
+        decode = self.tables.vocab.decode
+        return [(" ".join(decode(ids)), logprob) for ids, logprob in results]
+
+    def _scoring_tables(self):
+        """Freezes the model if needed and returns its Kneser-Ney ScoringTables."""
+        if self.tables is None:
+            self.freeze()
+        if self.tables.scoring is None:
+            self.tables.scoring = ScoringTables(self.tables)
+        return self.tables.scoring
+
+    def score_batch(self, sentences):
+        """
+        Scores many sentences at once with interpolated Kneser-Ney smoothing.
+
+        All trigrams of all sentences are looked up together as integer-ID
+        arrays, so there is no per-token dictionary access.
+
+        Args:
+            sentences (list): Strings or token lists. Sentences that do not
+                start with '<s>' are padded; unknown words count as <UNK>.
+
+        Returns:
+            np.ndarray: Natural-log probability of each sentence.
+        """
+        scoring = self._scoring_tables()
+        return scoring.score_ids(*scoring.encode_sentences(sentences))[0]
+
+    def logprob(self, sentence):
+        """Natural-log probability of one sentence (string or token list)."""
+        return float(self.score_batch([sentence])[0])
+
+    def perplexity(self, sentences):
+        """
+        Perplexity over a list of sentences:
+            exp( - total log-probability / number of predicted tokens )
+        Every word and the closing '</s>' count as predicted tokens.
+        """
+        scoring = self._scoring_tables()
+        logprobs, predicted = scoring.score_ids(*scoring.encode_sentences(sentences))
+        if predicted.sum() == 0:
+            raise ValueError("perplexity needs at least one sentence")
+        return float(np.exp(-logprobs.sum() / predicted.sum()))
+
+
+class NGramModel:
+    """
+    N-gram language model of any order n, backed by one NGramTrie.
+
+    The trie holds the counts of every order 1..n, so successors of a context
+    of any length < n come from the same structure (no dictionary per order).
+    Expects sentences padded for order n, i.e. prepare_ngrams(df, n=n).
+    """
+
+    def __init__(self, n=3):
+        """
+        Args:
+            n (int): Order of the model (3 = trigram).
+        """
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        self.n = n
+        self.vocab = Vocabulary()
+        # An empty trie until fit(), so an unfitted model generates '' and
+        # finds no successors, like TrigramModel
+        self.trie = NGramTrie.from_sentences(n, np.empty(0, dtype=ID_DTYPE), np.zeros(1, dtype=np.int64))
+
+    def fit(self, sentences):
+        """
+        Counts every k-gram (k <= n) of the padded sentences.
+        Calling fit() again replaces the earlier counts.
+        """
+        print(f"Training on {len(sentences)} sentences...")
+        self.vocab = Vocabulary()
+        encoded = [self.vocab.encode(sentence) for sentence in sentences]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in encoded], out=offsets[1:])
+        ids = np.concatenate(encoded) if encoded else np.empty(0, dtype=ID_DTYPE)
+        self.trie = NGramTrie.from_sentences(self.n, ids, offsets)
+        print(f"Training complete. Learned {self.num_contexts} unique contexts.")
+
+    @property
+    def num_contexts(self):
+        """Number of distinct (n-1)-word contexts that have successors."""
+        return int(np.count_nonzero(np.diff(self.trie.offsets[self.n - 1])))
+
+    def _encode_context(self, context):
+        """Token IDs of a context, or None if a token was never seen."""
+        token_to_id = self.vocab.token_to_id
+        if any(token not in token_to_id for token in context):
+            return None
+        return [token_to_id[token] for token in context]
+
+    def successors(self, context):
+        """
+        Next-word counts after `context` (a sequence of fewer than n tokens).
+
+        Returns:
+            Counter: {word: count}, empty for an unseen context.
+        """
+        if len(context) >= self.n:
+            raise ValueError(f"context must have fewer than {self.n} tokens")
+        ids = self._encode_context(context)
+        node = -1 if ids is None else self.trie.find(ids)
+        if node < 0:
+            return Counter()
+        words, counts = self.trie.children(node, len(context))
+        return Counter(dict(zip(self.vocab.decode(words.tolist()), counts.tolist())))
+
+    def count(self, ngram):
+        """Number of times the k-gram `ngram` (k <= n tokens) was seen."""
+        ids = self._encode_context(ngram)
+        return 0 if ids is None else self.trie.count(ids)
+
+    def generate(self, max_length=50, backoff=False):
+        """
+        Generates text by count-weighted sampling, like TrigramModel.generate().
+
+        Args:
+            max_length (int): Maximum number of words.
+            backoff (bool): At an unseen context, retry with shorter and shorter
+                contexts (down to the unigram counts) instead of stopping.
+        """
+        context = [BOS_ID] * (self.n - 1)
+        generated_ids = []
+
+        for _ in range(max_length):
+            words = None
+            for drop in range(len(context) + 1 if backoff else 1):
+                node = self.trie.find(context[drop:])
+                if node >= 0:
+                    words, counts = self.trie.children(node, len(context) - drop)
+                    if drop == len(context):
+                        # Unigram fallback: <s> is padding, never a next word
+                        keep = words != BOS_ID
+                        words, counts = words[keep], counts[keep]
+                    if len(words):
+                        break
+                    words = None
+
+            # Dead End Check: unseen context (and nothing left to back off to)
+            if words is None:
+                break
+
+            next_id = random.choices(words.tolist(), weights=counts.tolist(), k=1)[0]
+            if next_id == EOS_ID:
+                break
+
+            generated_ids.append(next_id)
+            context = (context + [next_id])[1:] if context else context
+
+        return " ".join(self.vocab.decode(generated_ids))
+
+def count_trigrams(sentences, counts):
+    """
+    Adds every trigram of `sentences` to `counts` (the nested dictionary layout).
+
+    Args:
+        sentences (list of lists): Padded sentences.
+        counts (defaultdict(Counter)): counts[(w1, w2)][w3] is incremented in place.
+    """
+    for sentence in sentences:
+        # Iterate through the sentence to create trigrams
+        # We stop at len-2 because we need a lookahead of 3 items
+        for i in range(len(sentence) - 2):
+            w1 = sentence[i]       # History word 1
+            w2 = sentence[i+1]     # History word 2
+            w3 = sentence[i+2]     # Target word
+
+            # The "Context" is the previous two words
+            context = (w1, w2)
+
+            # Store the count: counts[w1, w2][w3] += 1
+            counts[context][w3] += 1
+    return counts
+
+def _check_decoding_options(temperature, top_k, top_p):
+    if temperature < 0:
+        raise ValueError("temperature must be >= 0")
+    if top_k is not None and top_k < 1:
+        raise ValueError("top_k must be at least 1")
+    if top_p is not None and not 0 < top_p <= 1:
+        raise ValueError("top_p must be in (0, 1]")
+
+def _count_tokens(sentences):
+    """Number of tokens in a list of sentences or a TokenCorpus."""
+    if isinstance(sentences, TokenCorpus):
+        return len(sentences.tokens)
+    return sum(len(sentence) for sentence in sentences)
+
+def _count_shard_dict(sentences):
+    """
+    Process-pool worker for the 'dict' backend: counts one shard.
+
+    Plain dicts pickle considerably faster than Counter objects.
+    """
+    counts = count_trigrams(sentences, defaultdict(Counter))
+    return {context: dict(successors) for context, successors in counts.items()}
+
+def _count_shard_compact(sentences):
+    """
+    Process-pool worker for the 'compact' backend.
+
+    Returns the shard's local vocabulary (tokens in ID order) and its
+    already reduced CSR store, which is much smaller to send back than
+    the raw trigram occurrences.
+    """
+    vocab = Vocabulary()
+    w1, w2, w3 = sentence_trigrams([vocab.encode(sentence) for sentence in sentences])
+    return vocab.id_to_token, CompactTrigramStore.from_triples(w1, w2, w3)
+
+def load_training_data(corpus_dir="data/interim/training_data", csv_path="data/interim/training_data.csv"):
+    """
+    Loads the padded training sentences written by data_preprocessing.py.
+
+    Prefers the binary token corpus (memory-mapped, no parsing) and falls
+    back to the CSV, whose rows must be parsed with ast.literal_eval.
+
+    Returns:
+        TokenCorpus or pd.Series of lists, or None if neither file exists.
+    """
+    if os.path.isdir(corpus_dir):
+        return load_token_corpus(corpus_dir)
+    # Only the CSV fallback needs pandas; importing it costs ~0.3 s at start-up
+    import ast
+    import pandas as pd
+
+    try:
+        # IMPORTANT: 'converters' is needed to turn the string "['a','b']" back into a real list
+        ngram_df = pd.read_csv(csv_path, converters={'tokens': ast.literal_eval})
+    except FileNotFoundError:
+        return None
+    return ngram_df['tokens']
+
 def main():
     print("Loading Data...")
     
-    # Load the CSV we created in data_preprocessing.py
-    # IMPORTANT: 'converters' is needed to turn the string "['a','b']" back into a real list
-    try:
-        ngram_df = pd.read_csv(
-            "data/interim/training_data.csv", 
-            converters={'tokens': ast.literal_eval}
-        )
-    except FileNotFoundError:
+    # Load the training data we created in data_preprocessing.py
+    sentences = load_training_data()
+    if sentences is None:
         print("Error: Training data not found.")
         return
 
     # Initialize
-    model = TrigramModel()
+    model = TrigramModel(backend='compact')
     
     # Train
-    # Pass the Series of lists to the fit method
-    print(ngram_df['tokens'][:50])
-    #model.fit(ngram_df['tokens'])
+    model.fit(sentences)
+    # Sampling from the compact store goes through the precomputed tables
+    model.freeze()
     
     # Generate
     print("\n" + "="*40)
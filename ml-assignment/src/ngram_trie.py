@@ -0,0 +1,120 @@
+import numpy as np
+
+from src.count_store import COUNT_DTYPE, batch_searchsorted
+
+# A node key packs (parent node index, last word ID) into one int64,
+# the same way context_key() packs a (w1, w2) pair.
+WORD_MASK = 0xFFFFFFFF
+
+
+class NGramTrie:
+    """
+    Counts of every k-gram for k = 1..n in one array-based trie over token IDs.
+
+    Level k has one node per distinct k-gram (w1 .. wk). A node is identified
+    by its key (index of its parent node at level k - 1) << 32 | wk, and each
+    level stores its keys sorted plus the matching counts:
+
+        keys[k - 1]    int64, sorted -> the children of a node are contiguous
+        counts[k - 1]  int64         -> c(w1 .. wk)
+        offsets[k]     int64         -> children of node i at level k are
+                                        keys[k][offsets[k][i]:offsets[k][i + 1]]
+
+    The root (level 0) is node 0, so level-1 keys are just the word IDs.
+    Successor queries for a context of any length m < n walk m levels down
+    and return one contiguous slice of level m + 1, so a single structure
+    replaces one dictionary per order.
+    """
+
+    def __init__(self, n, keys, counts):
+        self.n = n
+        self.keys = keys
+        self.counts = counts
+        # The root's children are all of level 1; below that, the children of
+        # node i start where the keys with parent i start
+        self.offsets = [np.array([0, len(keys[0])], dtype=np.int64)]
+        for k in range(1, n):
+            parents = np.arange(len(keys[k - 1]) + 1, dtype=np.int64) << 32
+            self.offsets.append(np.searchsorted(keys[k], parents))
+
+    @classmethod
+    def from_sentences(cls, n, ids, offsets):
+        """
+        Builds the trie from sentences stored back to back in one flat ID
+        array (sentence i is ids[offsets[i]:offsets[i + 1]]).
+
+        Level by level: every window start that still has k tokens left in
+        its sentence gets key (its level k-1 node << 32) | ids[start + k - 1];
+        np.unique turns those keys into the sorted level-k nodes, their counts
+        and each start's new node index.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        # Tokens left in the sentence from every position on (inclusive)
+        sentence_ends = np.repeat(offsets[1:], np.diff(offsets))
+        starts = np.arange(len(ids), dtype=np.int64)
+        remaining = sentence_ends - starts
+        node = np.zeros(len(ids), dtype=np.int64)
+
+        keys, counts = [], []
+        for k in range(1, n + 1):
+            has_window = remaining >= k
+            starts, node, remaining = starts[has_window], node[has_window], remaining[has_window]
+            level_keys, node, level_counts = np.unique(
+                (node << 32) | ids[starts + k - 1], return_inverse=True, return_counts=True)
+            keys.append(level_keys)
+            counts.append(level_counts.astype(COUNT_DTYPE))
+        return cls(n, keys, counts)
+
+    def find(self, context):
+        """
+        Node index of a context (sequence of token IDs, at most n long) at
+        level len(context), or -1 if it was never seen. () is the root, 0.
+        """
+        node = 0
+        for level, word in enumerate(context):
+            keys = self.keys[level]
+            key = (node << 32) | int(word)
+            node = keys.searchsorted(key)
+            if node == len(keys) or keys.item(node) != key:
+                return -1
+        return int(node)
+
+    def find_batch(self, contexts):
+        """
+        Vectorized find() for an (m, L) array of contexts of the same length L.
+        """
+        contexts = np.asarray(contexts, dtype=np.int64)
+        nodes = np.zeros(len(contexts), dtype=np.int64)
+        for level in range(contexts.shape[1]):
+            keys = self.keys[level]
+            query = (nodes << 32) | contexts[:, level]
+            found = nodes >= 0
+            positions = np.minimum(batch_searchsorted(keys, query), max(len(keys) - 1, 0))
+            found &= len(keys) > 0
+            found[found] = keys[positions[found]] == query[found]
+            nodes = np.where(found, positions, -1)
+        return nodes
+
+    def children(self, node, level):
+        """
+        Successors of node `node` at `level` (0 = root): (word IDs, counts) views.
+        """
+        start, end = self.offsets[level][node], self.offsets[level][node + 1]
+        return self.keys[level][start:end] & WORD_MASK, self.counts[level][start:end]
+
+    def count(self, ngram):
+        """Number of times the k-gram `ngram` (k <= n token IDs) was seen."""
+        node = self.find(ngram)
+        if node < 0 or not len(ngram):
+            return 0
+        return int(self.counts[len(ngram) - 1][node])
+
+    def num_nodes(self, k):
+        """Number of distinct k-grams."""
+        return len(self.keys[k - 1])
+
+    @property
+    def nbytes(self):
+        """Bytes held by the trie arrays."""
+        return sum(array.nbytes for level in (self.keys, self.counts, self.offsets) for array in level)
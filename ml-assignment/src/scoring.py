@@ -0,0 +1,142 @@
+import numpy as np
+
+from src.count_store import BOS, BOS_ID, EOS, UNK_ID, batch_searchsorted, flat_trigrams
+
+# Used for an order whose count-of-counts do not define a discount
+DEFAULT_DISCOUNT = 0.75
+
+
+def estimate_discount(counts):
+    """
+    Kneser-Ney discount D = n1 / (n1 + 2 * n2), where n1 and n2 are the number
+    of n-grams seen exactly once and exactly twice.
+    """
+    n1 = np.count_nonzero(counts == 1)
+    n2 = np.count_nonzero(counts == 2)
+    if n1 == 0:
+        return DEFAULT_DISCOUNT
+    return n1 / (n1 + 2 * n2)
+
+
+class ScoringTables:
+    """
+    Interpolated Kneser-Ney tables for scoring text with a trained trigram model.
+
+        P3(w3 | w1 w2) = max(c(w1 w2 w3) - D3, 0) / c(w1 w2 .)
+                         + D3 * N(w1 w2 .) / c(w1 w2 .) * P2(w3 | w2)
+        P2(w3 | w2)    = max(N(. w2 w3) - D2, 0) / N(. w2 .)
+                         + D2 * N(w2 .) / N(. w2 .) * P1(w3)
+        P1(w3)         = max(N(. w3) - D1, 0) / N(. .)
+                         + D1 * N(.) / N(. .) / (V - 1)
+
+    c() are raw counts and N() numbers of distinct words filling the dots
+    (continuation counts); an unseen context falls back to the next order.
+    P1 mixes in a uniform distribution over the V - 1 predictable tokens
+    (every token but <s>), so no token ever gets probability zero.
+
+    Everything a lookup needs is precomputed here as arrays: per-context
+    totals and backoff weights for the trigram level, a sorted bigram key
+    array plus per-word totals for the bigram level, and the full P1 vector.
+    Scoring is then a handful of vectorized searches over integer IDs.
+    """
+
+    def __init__(self, tables):
+        self.vocab = tables.vocab
+        self.store = store = tables.store
+        vocab_size = len(self.vocab)
+        w1, w2, w3, counts = store.triples()
+
+        # 1. Trigram level: per-context total, number of successors, discount
+        self.d3 = estimate_discount(counts)
+        self.context_total = tables.row_total.astype(np.float64)
+        context_types = np.diff(store.offsets).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.context_backoff = self.d3 * context_types / self.context_total
+
+        # 2. Bigram level: continuation count N(. w2 w3) = distinct w1 before (w2, w3)
+        self.bigram_keys, continuation = np.unique(
+            (w2.astype(np.int64) << 32) | w3, return_counts=True)
+        self.bigram_counts = continuation
+        bigram_w2 = (self.bigram_keys >> 32).astype(np.int64)
+        bigram_w3 = (self.bigram_keys & 0xFFFFFFFF).astype(np.int64)
+        self.d2 = estimate_discount(continuation)
+        self.word_total = np.bincount(bigram_w2, weights=continuation, minlength=vocab_size)
+        word_types = np.bincount(bigram_w2, minlength=vocab_size).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.word_backoff = self.d2 * word_types / self.word_total
+
+        # 3. Unigram level: N(. w3) = distinct w2 before w3, precomputed for every word
+        unigram = np.bincount(bigram_w3, minlength=vocab_size).astype(np.float64)
+        self.d1 = estimate_discount(unigram[unigram > 0])
+        uniform = 1.0 / max(vocab_size - 1, 1)
+        total = unigram.sum()
+        if total > 0:
+            types = np.count_nonzero(unigram)
+            self.p1 = (np.maximum(unigram - self.d1, 0) + self.d1 * types * uniform) / total
+        else:
+            self.p1 = np.full(vocab_size, uniform)
+        self.p1[BOS_ID] = 0.0
+
+    def probability(self, w1, w2, w3):
+        """
+        Vectorized P3(w3 | w1 w2) for arrays of token IDs.
+        """
+        w2 = np.asarray(w2, dtype=np.int64)
+        w3 = np.asarray(w3, dtype=np.int64)
+
+        # Unigram level: direct table lookup
+        p = self.p1[w3]
+
+        # Bigram level
+        if len(self.bigram_keys):
+            keys = (w2 << 32) | w3
+            idx = np.minimum(batch_searchsorted(self.bigram_keys, keys), len(self.bigram_keys) - 1)
+            continuation = np.where(self.bigram_keys[idx] == keys, self.bigram_counts[idx], 0)
+            total = self.word_total[w2]
+            seen = total > 0
+            p[seen] = (np.maximum(continuation[seen] - self.d2, 0) / total[seen]
+                       + self.word_backoff[w2[seen]] * p[seen])
+
+        # Trigram level
+        rows, counts = self.store.lookup(w1, w2, w3)
+        seen = rows >= 0
+        if seen.any():
+            r = rows[seen]
+            p[seen] = (np.maximum(counts[seen] - self.d3, 0) / self.context_total[r]
+                       + self.context_backoff[r] * p[seen])
+        return p
+
+    def score_ids(self, ids, offsets):
+        """
+        Log-probabilities (natural log) of sentences stored as flat padded ID arrays.
+
+        Returns:
+            (logprobs, predicted): per-sentence log-probability and the
+            number of predicted tokens in each sentence.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        w1, w2, w3, starts = flat_trigrams(ids, offsets, return_starts=True)
+        # Which sentence each trigram belongs to
+        sentence = np.searchsorted(offsets, starts, side='right') - 1
+        log_p = np.log(self.probability(w1, w2, w3))
+        n = len(offsets) - 1
+        return (np.bincount(sentence, weights=log_p, minlength=n),
+                np.bincount(sentence, minlength=n))
+
+    def encode_sentences(self, sentences):
+        """
+        Converts sentences (strings or token lists) into flat ID arrays.
+
+        Unpadded sentences get '<s> <s>' ... '</s>' added; tokens missing
+        from the vocabulary become <UNK>.
+        """
+        token_to_id = self.vocab.token_to_id
+        ids, offsets = [], [0]
+        for sentence in sentences:
+            tokens = sentence.split() if isinstance(sentence, str) else list(sentence)
+            if not tokens or tokens[0] != BOS:
+                tokens = [BOS, BOS] + tokens + [EOS]
+            ids.extend(token_to_id.get(token, UNK_ID) for token in tokens)
+            offsets.append(len(ids))
+        return np.array(ids, dtype=np.int64), np.array(offsets, dtype=np.int64)
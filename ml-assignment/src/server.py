@@ -0,0 +1,343 @@
+"""
+Local generation/scoring server around a saved TrigramModel (standard library only).
+
+The model file (written by TrigramModel.save) is memory-mapped once per
+worker. Requests are plain HTTP/1.1 with JSON bodies, over TCP or a Unix socket:
+
+    POST /generate  {"n": 4, "max_length": 30}      -> {"texts": [...]}
+    POST /score     {"sentences": ["the cat", ...]} -> {"logprobs": [...], "tokens": [...]}
+    GET  /stats                                     -> queue depth, batch sizes, latency percentiles
+
+Concurrent requests are coalesced: a Batcher collects everything that
+arrives within `max_wait_ms` (up to `max_batch` samples/sentences) and serves
+it with one generate_batch() / score_batch() call, run in a worker thread so
+the event loop keeps accepting requests meanwhile.
+
+With --workers N the listening socket is created once and N forked
+processes accept from it; each maps the same model file, so the arrays are
+shared through the page cache (fork is POSIX only).
+
+Usage:
+    python -m src.server --model model.bin [--port 8000 | --unix /tmp/ngram.sock] [--workers N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from src.ngram_model import TrigramModel
+
+# Latencies kept for the /stats percentiles
+LATENCY_WINDOW = 1000
+# Largest n * max_length one /generate request may ask for; larger requests
+# get a 400 instead of exhausting memory in the shared batch
+MAX_REQUEST_WORDS = 100_000
+
+
+class Batcher:
+    """
+    Coalesces concurrent requests into batched calls.
+
+    submit() queues a request and waits for its result. A single consumer
+    task takes the first waiting request, keeps collecting until `max_batch`
+    items are queued or `max_wait_ms` passed, then runs `process(items)` (a
+    blocking function returning one result per item) in a thread.
+    """
+
+    def __init__(self, process, max_batch=256, max_wait_ms=2.0):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.batched_items = 0
+        self._task = None
+
+    @property
+    def depth(self):
+        """Requests waiting to be batched."""
+        return self.queue.qsize()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item, size=1):
+        """Queues `item` (worth `size` batch slots) and returns its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, size, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = batch[0][1]
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(entry)
+                size += entry[1]
+
+            self.batches += 1
+            self.batched_items += size
+            items = [item for item, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.process, items)
+            except Exception as error:  # report the failure to every waiting request
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class GenerationServer:
+    """
+    Serves one loaded model: routes requests to the generate and score batchers
+    and keeps the statistics reported by /stats.
+    """
+
+    def __init__(self, model, max_batch=256, max_wait_ms=2.0, max_request_words=MAX_REQUEST_WORDS):
+        self.model = model.freeze() if not model.is_frozen else model
+        self.max_request_words = max_request_words
+        self.generate_batcher = Batcher(self._generate, max_batch, max_wait_ms)
+        self.score_batcher = Batcher(self._score, max_batch, max_wait_ms)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.started = time.time()
+
+    def _generate(self, requests):
+        """One generate_batch() call for many {'n', 'max_length'} requests."""
+        total = sum(request['n'] for request in requests)
+        max_length = max(request['max_length'] for request in requests)
+        texts = self.model.generate_batch(total, max_length=max_length)
+        results, start = [], 0
+        for request in requests:
+            # Samples are drawn word by word, so cutting a longer sample after
+            # max_length words is the same as sampling with that max_length
+            chunk = texts[start:start + request['n']]
+            results.append([" ".join(text.split()[:request['max_length']]) for text in chunk])
+            start += request['n']
+        return results
+
+    def _score(self, requests):
+        """One score_batch() call for the sentences of many requests."""
+        sentences = [sentence for request in requests for sentence in request]
+        scoring = self.model._scoring_tables()
+        # Same call as score_batch(), keeping the predicted-token counts so
+        # clients can compute perplexities
+        logprobs, tokens = scoring.score_ids(*scoring.encode_sentences(sentences))
+        results, start = [], 0
+        for request in requests:
+            stop = start + len(request)
+            results.append({'logprobs': logprobs[start:stop].tolist(), 'tokens': tokens[start:stop].tolist()})
+            start = stop
+        return results
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        stats = {
+            'pid': os.getpid(),
+            'uptime_s': time.time() - self.started,
+            'requests': self.requests,
+            'queue_depth': {'generate': self.generate_batcher.depth, 'score': self.score_batcher.depth},
+        }
+        for name, batcher in (('generate', self.generate_batcher), ('score', self.score_batcher)):
+            stats[f'{name}_batches'] = batcher.batches
+            stats[f'{name}_mean_batch_size'] = batcher.batched_items / batcher.batches if batcher.batches else 0.0
+        if len(latencies):
+            stats['latency_ms'] = {f'p{q}': float(np.percentile(latencies, q)) for q in (50, 90, 99)}
+        return stats
+
+    def _generate_request(self, payload):
+        """Validated {'n', 'max_length'} of a /generate payload; raises ValueError."""
+        request = {'n': payload.get('n', 1), 'max_length': payload.get('max_length', 50)}
+        for name, value in request.items():
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise ValueError(f"{name} must be a positive integer")
+        if request['n'] * request['max_length'] > self.max_request_words:
+            raise ValueError(f"n * max_length must be at most {self.max_request_words}")
+        return request
+
+    def _score_request(self, payload):
+        """
+        Validated sentences of a /score payload; raises ValueError. Checked down
+        to every token, so one bad request cannot fail the whole batch.
+        """
+        sentences = payload['sentences']
+        if not isinstance(sentences, list) or not all(
+                isinstance(sentence, str)
+                or (isinstance(sentence, list) and all(isinstance(token, str) for token in sentence))
+                for sentence in sentences):
+            raise ValueError("sentences must be a list of strings or lists of string tokens")
+        return sentences
+
+    async def handle(self, method, path, body):
+        """Returns (status, JSON-serializable response) for one request."""
+        if method == 'GET' and path == '/stats':
+            return 200, self.stats()
+        if method != 'POST' or path not in ('/generate', '/score'):
+            return 404, {'error': f'no route for {method} {path}'}
+        try:
+            payload = json.loads(body or b'{}')
+            if not isinstance(payload, dict):
+                raise ValueError("the request body must be a JSON object")
+            if path == '/generate':
+                request = self._generate_request(payload)
+                return 200, {'texts': await self.generate_batcher.submit(request, request['n'])}
+            sentences = self._score_request(payload)
+            return 200, await self.score_batcher.submit(sentences, max(len(sentences), 1))
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {'error': str(error)}
+
+    async def serve_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive: answers requests until the client closes."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, response = await self.handle(method, path, body)
+                data = json.dumps(response).encode()
+                reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found'}[status]
+                writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                self.requests += 1
+                self.latencies.append(time.perf_counter() - start)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, sock):
+        """Accepts connections on an already bound, listening socket forever."""
+        self.generate_batcher.start()
+        self.score_batcher.start()
+        if sock.family == getattr(socket, 'AF_UNIX', None):
+            server = await asyncio.start_unix_server(self.serve_connection, sock=sock)
+        else:
+            server = await asyncio.start_server(self.serve_connection, sock=sock)
+        async with server:
+            await server.serve_forever()
+
+
+def open_listening_socket(host='127.0.0.1', port=8000, unix_path=None):
+    """Binds the TCP or Unix socket that every worker accepts from."""
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(unix_path)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+async def request(reader, writer, method, path, payload=None):
+    """
+    Minimal client: sends one request over an open keep-alive connection.
+
+    Returns:
+        tuple: (HTTP status, decoded JSON response).
+    """
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def run_worker(model_path, sock, max_batch, max_wait_ms, max_request_words=MAX_REQUEST_WORDS):
+    """Loads (memory-maps) the model and serves until interrupted."""
+    model = TrigramModel.load(model_path, mmap=True)
+    server = GenerationServer(model, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                              max_request_words=max_request_words)
+    try:
+        asyncio.run(server.serve(sock))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a saved TrigramModel over HTTP.")
+    parser.add_argument("--model", required=True, help="File written by TrigramModel.save()")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-request-words", type=int, default=MAX_REQUEST_WORDS,
+                        help="Largest n * max_length of one /generate request")
+    args = parser.parse_args(argv)
+
+    # Turn SIGTERM into SystemExit, so the parent still stops its workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    sock = open_listening_socket(args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"Serving {args.model} on {where} with {args.workers} worker(s)")
+
+    children = []
+    for _ in range(args.workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(args.model, sock, args.max_batch, args.max_wait_ms, args.max_request_words)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    try:
+        run_worker(args.model, sock, args.max_batch, args.max_wait_ms, args.max_request_words)
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+
+
+if __name__ == '__main__':
+    main()
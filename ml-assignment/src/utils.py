@@ -0,0 +1,32 @@
+import sys
+
+
+def estimate_nested_counts_bytes(model):
+    """
+    Estimates the memory held by the 'dict' backend layout
+    (model[(w1, w2)][w3] = count), counting every distinct string once.
+    """
+    total = sys.getsizeof(model)
+    strings = {}
+    for context, successors in model.items():
+        total += sys.getsizeof(context) + sys.getsizeof(successors)
+        for word in context:
+            strings[id(word)] = word
+        for word in successors:
+            strings[id(word)] = word
+    return total + sum(sys.getsizeof(word) for word in strings.values())
+
+
+def estimate_vocab_bytes(vocab):
+    """Estimates the memory held by a Vocabulary (dict, list and token strings)."""
+    return (sys.getsizeof(vocab.token_to_id) + sys.getsizeof(vocab.id_to_token)
+            + sum(sys.getsizeof(token) for token in vocab.id_to_token))
+
+
+def format_bytes(n):
+    """Formats a byte count for humans, e.g. 1536 -> '1.5 KiB'."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
@@ -0,0 +1,47 @@
+import pandas as pd
+from data.data_preprocessing import (
+    clean_texts, preprocess_dataframe, preprocess_text, preprocess_text_fast,
+)
+
+SAMPLES = [
+    "Visit https://example.com/path?q=1 or www.test.org NOW!!",
+    "Chapter 12: The year 1818, page ²³ and ٣ Arabic-Indic digits.",
+    "Tabs\tand\nnewlines\x1c　and spaces   ",
+    "Punctuation; colon: dash - quotes \"x\" 'y' (z) [w] {v} ~ | \\ ^",
+    "Arabic semicolon ؛ between؛words",
+    "Unicode İstanbul ÉCOLE ΣΊΣΥΦΟΣ straße",
+    "",
+    "   ",
+    "http://",
+    "h1ttp://not-a-url.com www2.still",
+    # Lowercasing depends on the next character (final sigma), so digits
+    # must be removed first
+    "a9Σ", "aΣ9b", "ΟΔΟΣ1 ΣΟΦΟΣ2Α", "x\u0345Σ٣y",
+]
+
+def test_fast_cleaning_matches_reference():
+    for text in SAMPLES:
+        assert preprocess_text_fast(text) == preprocess_text(text), text
+
+def test_fast_cleaning_matches_for_every_code_point():
+    # Every character alone and between letters, in one long string per block
+    for start in range(0, 0x110000, 0x1000):
+        chars = [chr(cp) for cp in range(start, start + 0x1000) if not 0xD800 <= cp < 0xE000]
+        text = "a".join(chars)
+        assert preprocess_text_fast(text) == preprocess_text(text), hex(start)
+
+def test_fast_cleaning_matches_around_context_sensitive_letters():
+    # Digits, punctuation and URLs between sigmas and other cased letters
+    import itertools
+    parts = ["a", "Σ", "İ", "9", "٣", ".", "'", " ", "\u0345", "www.x"]
+    for combo in itertools.product(parts, repeat=4):
+        text = "".join(combo)
+        assert preprocess_text_fast(text) == preprocess_text(text), text
+
+def test_preprocess_dataframe_parallel_matches_serial():
+    texts = SAMPLES * 50
+    serial = preprocess_dataframe(pd.DataFrame({"text": texts}), "text")
+    parallel = preprocess_dataframe(pd.DataFrame({"text": texts}), "text", n_jobs=2)
+    assert serial["text"].tolist() == parallel["text"].tolist()
+    assert serial["text"].tolist() == [preprocess_text(t) for t in texts]
+    assert clean_texts(texts, n_jobs=2, chunk_size=7) == serial["text"].tolist()
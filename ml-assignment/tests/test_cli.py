@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+from src.cli import main
+
+CORPUS = "the cat sat on the mat.\nthe dog sat on the log.\nthe cat ran.\n"
+
+def test_train_generate_score(tmp_path, capsys):
+    corpus = tmp_path / 'corpus.txt'
+    corpus.write_text(CORPUS, encoding='utf-8')
+    model = str(tmp_path / 'model.bin')
+
+    main(['train', str(corpus), '-o', model, '--min-count', '1'])
+    capsys.readouterr()
+
+    main(['generate', model, '-n', '4', '--seed', '0'])
+    first = capsys.readouterr().out.splitlines()
+    main(['generate', model, '-n', '4', '--seed', '0'])
+    assert capsys.readouterr().out.splitlines() == first
+    assert len(first) == 4 and all(line.split()[0] == 'the' for line in first)
+
+    main(['generate', model, '-n', '2', '--temperature', '0'])
+    assert capsys.readouterr().out.splitlines() == ['the cat sat on the mat'] * 2
+
+    main(['score', model, 'the cat sat', 'the dog ran'])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3 and lines[-1].startswith('perplexity: ')
+    assert float(lines[0].split('\t')[0]) < 0
+
+def test_generation_path_does_not_import_pandas():
+    code = ("import sys, src.cli, src.ngram_model, data.data_preprocessing; "
+            "print('pandas' in sys.modules, 'nltk' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.split() == ['False', 'False']
@@ -0,0 +1,79 @@
+from data.corpus_reader import chunk_ranges, parallel_training_sentences, split_sentences
+from data.data_preprocessing import stream_training_sentences
+from src.generate import preprocess_for_model
+from src.ngram_model import TrigramModel
+
+PARAGRAPHS = [
+    "It was on a dreary night of November. I beheld the accomplishment\nof my toils!",
+    "Mr. Kirwin said: \"Who are you?\" Nobody answered.",
+    "Chapter 5",
+    "Wrapped lines are joined,\nand a sentence may continue\non the next line.",
+]
+TEXT = "\n\n".join(PARAGRAPHS * 200) + "\n"
+
+def write_corpus(tmp_path):
+    path = tmp_path / 'corpus.txt'
+    path.write_text(TEXT, encoding='utf-8')
+    return str(path)
+
+def test_split_sentences():
+    assert split_sentences("\n\n".join(PARAGRAPHS)) == [
+        "It was on a dreary night of November.",
+        "I beheld the accomplishment of my toils!",
+        "Mr. Kirwin said: \"Who are you?\"",
+        "Nobody answered.",
+        "Chapter 5",
+        "Wrapped lines are joined, and a sentence may continue on the next line.",
+    ]
+
+def test_chunks_cover_file_and_end_on_paragraphs(tmp_path):
+    path = write_corpus(tmp_path)
+    ranges = chunk_ranges(path, chunk_bytes=500)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(TEXT.encode())
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    data = TEXT.encode()
+    assert all(data[end - 2:end] == b"\n\n" for _, end in ranges[:-1])
+
+def test_output_does_not_depend_on_chunking_or_jobs(tmp_path):
+    path = write_corpus(tmp_path)
+    expected = list(parallel_training_sentences(path, chunk_bytes=1 << 20))
+    assert len(expected) == 6 * 200
+    assert expected[0] == ['<s>', '<s>', 'it', 'was', 'on', 'a', 'dreary', 'night', 'of', 'november', '</s>']
+    assert list(parallel_training_sentences(path, chunk_bytes=300, n_jobs=2)) == expected
+
+    # One sentence per line reproduces the streaming pipeline exactly
+    assert (list(parallel_training_sentences(path, chunk_bytes=300, segment='line'))
+            == list(stream_training_sentences(path)))
+
+def test_fit_stream_and_generate_preprocessing(tmp_path):
+    path = write_corpus(tmp_path)
+    streamed = TrigramModel()
+    streamed.fit_stream(parallel_training_sentences(path, chunk_bytes=300))
+    listed = TrigramModel()
+    listed.fit(list(parallel_training_sentences(path)))
+    assert streamed.model == listed.model
+
+    # The whole text is split into sentences, not padded as one row
+    assert preprocess_for_model(TEXT) == list(parallel_training_sentences(path))
+
+def test_output_does_not_depend_on_chunking_without_blank_lines(tmp_path):
+    # Hard-wrapped text with no paragraph breaks: sentences span lines
+    path = tmp_path / 'wrapped.txt'
+    path.write_text("\n".join(PARAGRAPHS * 50) + "\n", encoding='utf-8')
+    for segment in ('sentence', 'line'):
+        expected = list(parallel_training_sentences(str(path), min_count=1, segment=segment))
+        for chunk_bytes in (100, 300):
+            got = parallel_training_sentences(str(path), min_count=1, chunk_bytes=chunk_bytes, segment=segment)
+            assert list(got) == expected, (segment, chunk_bytes)
+
+def test_small_chunks_of_multibyte_text_decode(tmp_path):
+    # No newline at all, so ranges end on spaces or, failing that, between characters
+    path = tmp_path / 'multibyte.txt'
+    path.write_text("é word. " * 200 + "é" * 30, encoding='utf-8')
+    expected = list(parallel_training_sentences(str(path), min_count=1))
+    assert len(expected) == 201
+    assert list(parallel_training_sentences(str(path), min_count=1, chunk_bytes=101)) == expected
+    # A word longer than the chunk size is split, but every byte range still decodes
+    tokens = [token for sentence in parallel_training_sentences(str(path), min_count=1, chunk_bytes=7)
+              for token in sentence[2:-1]]
+    assert "".join(tokens) == "éword" * 200 + "é" * 30
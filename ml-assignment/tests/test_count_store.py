@@ -0,0 +1,61 @@
+import random
+import numpy as np
+from src.ngram_model import TrigramModel
+from src.count_store import CompactTrigramStore, Vocabulary, BOS_ID, EOS_ID, UNK_ID
+
+SENTENCES = [
+    ['<s>', '<s>', 'the', 'cat', 'sat', '</s>'],
+    ['<s>', '<s>', 'the', 'cat', 'ran', '</s>'],
+    ['<s>', '<s>', 'the', 'dog', 'sat', '</s>'],
+    ['<s>', '<s>', '<UNK>', 'cat', 'sat', '</s>'],
+]
+
+def test_vocabulary_reserves_special_tokens():
+    vocab = Vocabulary(['the', 'cat'])
+    assert (vocab.add('<s>'), vocab.add('</s>'), vocab.add('<UNK>')) == (BOS_ID, EOS_ID, UNK_ID)
+    ids = vocab.encode(['the', 'cat', 'dog'])
+    assert ids.dtype == np.int32
+    assert vocab.decode(ids) == ['the', 'cat', 'dog']
+
+def test_compact_counts_match_dict_backend():
+    dict_model = TrigramModel()
+    dict_model.fit(SENTENCES)
+    compact_model = TrigramModel(backend='compact')
+    compact_model.fit(SENTENCES)
+
+    assert compact_model.num_contexts == dict_model.num_contexts
+    assert compact_model.store.num_trigrams == sum(len(c) for c in dict_model.model.values())
+
+    vocab = compact_model.vocab
+    triples = [(w1, w2, w3) for (w1, w2), nxt in dict_model.model.items() for w3 in nxt]
+    ids = np.array([[vocab.token_to_id[t] for t in tri] for tri in triples])
+    batch = compact_model.store.count_batch(ids[:, 0], ids[:, 1], ids[:, 2])
+    for (w1, w2, w3), i, c in zip(triples, ids, batch):
+        expected = dict_model.model[(w1, w2)][w3]
+        assert compact_model.store.count(*i) == expected
+        assert c == expected
+
+def test_compact_fit_accumulates_like_dict():
+    once = TrigramModel(backend='compact')
+    once.fit(SENTENCES + SENTENCES)
+    twice = TrigramModel(backend='compact')
+    twice.fit(SENTENCES)
+    twice.fit(SENTENCES)
+    for name in ('context_keys', 'offsets', 'successors', 'counts'):
+        assert np.array_equal(getattr(once.store, name), getattr(twice.store, name))
+
+def test_compact_generate():
+    random.seed(0)
+    model = TrigramModel(backend='compact')
+    model.fit(SENTENCES)
+    words = model.generate().split()
+    assert words[0] in ('the', '<UNK>')
+    assert words[-1] in ('sat', 'ran')
+
+def test_compact_empty_store():
+    store = CompactTrigramStore.empty()
+    assert store.find_context(BOS_ID, BOS_ID) == -1
+    assert store.count_batch(np.array([0]), np.array([0]), np.array([3])).tolist() == [0]
+    model = TrigramModel(backend='compact')
+    model.fit("")
+    assert model.generate() == ""
@@ -0,0 +1,73 @@
+import math
+import random
+from collections import Counter
+import numpy as np
+import pytest
+from src.ngram_model import TrigramModel
+
+# After '<s> <s>': 'a' three times, 'b' once; 'a' is followed by 'x' (2) or 'y' (1)
+SENTENCES = [
+    ['<s>', '<s>', 'a', 'x', '</s>'],
+    ['<s>', '<s>', 'a', 'x', '</s>'],
+    ['<s>', '<s>', 'a', 'y', 'z', '</s>'],
+    ['<s>', '<s>', 'b', '</s>'],
+]
+
+def trained(backend='dict'):
+    model = TrigramModel(backend=backend)
+    model.fit(SENTENCES)
+    return model
+
+def first_words(model, n=300, **options):
+    random.seed(0)
+    return Counter(model.generate(max_length=1, **options) for _ in range(n))
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+def test_rows_are_sorted_by_count(backend):
+    model = trained(backend)
+    decoding = model._decoding_tables()
+    store = model.tables.store
+    for row in range(store.num_contexts):
+        start, end = store.offsets[row], store.offsets[row + 1]
+        counts = decoding.counts[start:end]
+        assert np.all(np.diff(counts) <= 0)
+        assert sorted(decoding.successors[start:end].tolist()) == sorted(store.successors[start:end].tolist())
+
+def test_greedy_top_k_and_top_p():
+    model = trained()
+    assert model.generate(temperature=0) == 'a x'
+    assert first_words(model, top_k=1) == Counter({'a': 300})
+    # 'a' alone covers 3/4 of the counts after '<s> <s>'
+    assert first_words(model, top_p=0.75) == Counter({'a': 300})
+    assert set(first_words(model, top_p=0.8)) == {'a', 'b'}
+
+def test_temperature_sharpens_and_flattens():
+    model = trained()
+    cold = first_words(model, n=2000, temperature=0.5)['b'] / 2000   # 1 / (1 + 3**2) = 0.1
+    plain = first_words(model, n=2000, top_k=2)['b'] / 2000          # 0.25
+    hot = first_words(model, n=2000, temperature=4.0)['b'] / 2000    # 1 / (1 + 3**0.25) ~ 0.43
+    assert cold < plain < hot
+    assert abs(cold - 0.1) < 0.03 and abs(hot - 0.43) < 0.04
+
+def test_invalid_options():
+    model = trained()
+    for options in ({'temperature': -1}, {'top_k': 0}, {'top_p': 0}, {'top_p': 1.5}):
+        with pytest.raises(ValueError):
+            model.generate(**options)
+    with pytest.raises(ValueError):
+        model.beam_search(beam_width=0)
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+def test_beam_search_finds_most_probable_sentences(backend):
+    model = trained(backend)
+    # P(a x) = 3/4 * 2/3 = 1/2,  P(b) = 1/4,  P(a y z) = 3/4 * 1/3 = 1/4
+    results = model.beam_search(beam_width=3, n_best=3)
+    assert [text for text, _ in results[:1]] == ['a x']
+    assert sorted(text for text, _ in results[1:]) == ['a y z', 'b']
+    assert math.isclose(results[0][1], math.log(0.5))
+    assert math.isclose(results[1][1], math.log(0.25))
+
+    # Continuations of a prompt exclude the prompt itself
+    assert model.beam_search('a', n_best=1) == [('x', pytest.approx(math.log(2 / 3)))]
+    # beam_width=1 is greedy search
+    assert model.beam_search(beam_width=1)[0][0] == model.generate(temperature=0)
@@ -0,0 +1,60 @@
+from collections import Counter
+import pandas as pd
+import pytest
+from src.ngram_model import TrigramModel
+from data.data_preprocessing import prepare_ngrams
+
+TEXTS = [
+    "the cat sat on the mat",
+    "the dog sat on the log",
+    "a cat ran to the dog",
+    "the bird flew over the mat",
+    "a dog sat down",
+    "the cat ran away",
+]
+
+def frozen_counts(model):
+    """Trigram counts of the frozen tables as a Counter of string triples."""
+    tables = model.tables
+    decode = tables.vocab.id_to_token
+    return Counter({(decode[a], decode[b], decode[c]): n
+                    for a, b, c, n in zip(*(col.tolist() for col in tables.store.triples()))})
+
+def sentences(texts, min_count):
+    return prepare_ngrams(pd.DataFrame({'text': texts}), 'text', n=3, min_count=min_count)['tokens'].tolist()
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+def test_partial_fit_with_deferred_unk_matches_batch_training(backend):
+    batch = TrigramModel(backend=backend)
+    batch.fit(sentences(TEXTS, min_count=2))
+    batch.freeze()
+
+    incremental = TrigramModel(backend=backend, min_count=2)
+    for i in range(0, len(TEXTS), 2):
+        incremental.partial_fit(sentences(TEXTS[i:i + 2], min_count=1))
+    incremental.freeze()
+
+    assert frozen_counts(incremental) == frozen_counts(batch)
+    assert '<UNK>' in incremental.tables.vocab
+    assert 'bird' not in incremental.tables.vocab
+
+@pytest.mark.parametrize('backends', [('dict', 'dict'), ('dict', 'compact'),
+                                      ('compact', 'dict'), ('compact', 'compact')])
+def test_merge_equals_training_on_all_data(backends):
+    first, second = sentences(TEXTS[:3], 1), sentences(TEXTS[3:], 1)
+    everything = TrigramModel(backend=backends[0])
+    everything.fit(first + second)
+
+    left = TrigramModel(backend=backends[0])
+    left.fit(first)
+    right = TrigramModel(backend=backends[1])
+    right.fit(second)
+    assert left.merge(right) is left
+    assert frozen_counts(left.freeze()) == frozen_counts(everything.freeze())
+
+def test_partial_fit_after_freeze_unfreezes():
+    model = TrigramModel(backend='compact', min_count=2)
+    model.partial_fit(sentences(TEXTS[:2], 1)).freeze()
+    before = sum(frozen_counts(model).values())
+    assert not model.partial_fit(sentences(TEXTS[2:], 1)).is_frozen
+    assert sum(frozen_counts(model.freeze()).values()) > before
@@ -0,0 +1,59 @@
+import random
+import pytest
+from src.ngram_model import TrigramModel
+
+SENTENCES = [
+    ['<s>', '<s>', 'the', 'cat', 'sat', '</s>'],
+    ['<s>', '<s>', 'the', 'cat', 'ran', '</s>'],
+    ['<s>', '<s>', 'the', 'dog', 'sat', 'down', '</s>'],
+    ['<s>', '<s>', 'a', 'dog', 'ran', '</s>'],
+]
+
+def seen_trigrams():
+    return {tuple(s[i:i + 3]) for s in SENTENCES for i in range(len(s) - 2)}
+
+def assert_valid(text):
+    tokens = ['<s>', '<s>'] + text.split()
+    for i in range(len(tokens) - 2):
+        assert tuple(tokens[i:i + 3]) in seen_trigrams()
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+def test_frozen_generate_follows_counts(backend):
+    random.seed(1)
+    model = TrigramModel(backend=backend)
+    model.fit(SENTENCES)
+    model.freeze()
+    assert model.is_frozen
+    for _ in range(20):
+        assert_valid(model.generate())
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+def test_generate_batch_is_reproducible(backend):
+    model = TrigramModel(backend=backend)
+    model.fit(SENTENCES)
+    first = model.generate_batch(50, max_length=10, seed=123)
+    second = model.generate_batch(50, max_length=10, seed=123)
+    assert first == second
+    assert len(first) == 50
+    for text in first:
+        assert_valid(text)
+
+def test_generate_batch_matches_count_distribution():
+    model = TrigramModel(backend='compact')
+    model.fit(SENTENCES)
+    texts = model.generate_batch(4000, seed=0)
+    share_the = sum(t.startswith('the ') for t in texts) / len(texts)
+    assert abs(share_the - 0.75) < 0.03
+
+def test_generate_batch_respects_max_length_and_fit_unfreezes():
+    model = TrigramModel()
+    model.fit(SENTENCES)
+    assert all(len(t.split()) <= 2 for t in model.generate_batch(20, max_length=2, seed=0))
+    assert model.is_frozen
+    model.fit([['<s>', '<s>', 'birds', 'fly', '</s>']])
+    assert not model.is_frozen
+
+def test_generate_batch_on_empty_model():
+    model = TrigramModel(backend='compact')
+    model.fit([])
+    assert model.generate_batch(3, seed=0) == ['', '', '']
@@ -0,0 +1,107 @@
+import logging
+import random
+import pandas as pd
+import pytest
+from src.ngram_model import TrigramModel
+from src.instrumentation import Metrics, logging_callback
+from data.data_preprocessing import preprocess_dataframe, prepare_ngrams
+
+TEXTS = [
+    "The cat sat on the mat.",
+    "The dog sat on the log!",
+    "A cat ran to the dog",
+    "The cat sat down",
+]
+
+def test_pipeline_stages_are_recorded():
+    events = []
+    metrics = Metrics(callback=events.append)
+    df = preprocess_dataframe(pd.DataFrame({'text': TEXTS}), 'text', metrics=metrics)
+    sentences = prepare_ngrams(df, 'text', metrics=metrics)['tokens'].tolist()
+    model = TrigramModel(metrics=metrics)
+    model.fit(sentences)
+
+    summary = metrics.summary()
+    assert list(summary['stages']) == ['clean', 'tokenize', 'vocab', 'pad', 'count']
+    assert summary['stages']['tokenize']['tokens'] == 22
+    assert summary['stages']['count']['tokens'] == sum(len(s) for s in sentences)
+    assert summary['stages']['count']['tokens_per_sec'] > 0
+    assert summary['gauges']['model.contexts'] == model.num_contexts
+    assert summary['gauges']['model.memory_bytes'] > 0
+    assert [e['stage'] for e in events if e['event'] == 'stage'] == list(summary['stages'])
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+@pytest.mark.parametrize('frozen', [False, True])
+def test_generate_hit_and_dead_end_counters(backend, frozen):
+    sentences = prepare_ngrams(pd.DataFrame({'text': TEXTS}), 'text', min_count=1)['tokens'].tolist()
+    metrics = Metrics()
+    model = TrigramModel(backend=backend, metrics=metrics)
+    model.fit(sentences)
+    if frozen:
+        model.freeze()
+
+    random.seed(0)
+    texts = [model.generate(max_length=3) for _ in range(20)]
+    counters = metrics.counters
+    assert counters['generate.samples'] == 20
+    assert counters['generate.tokens'] == sum(len(t.split()) for t in texts)
+    assert counters['generate.max_length'] == sum(len(t.split()) == 3 for t in texts)
+    # Every sentence ends with </s>, so sampling never reaches an unseen context
+    assert counters['generate.dead_ends'] == 0
+    assert counters['generate.eos'] + counters['generate.max_length'] == 20
+    assert metrics.summary()['generate']['hit_rate'] == 1.0
+
+    # Instrumentation does not change what is generated
+    plain = TrigramModel(backend=backend)
+    plain.fit(sentences)
+    if frozen:
+        plain.freeze()
+    random.seed(0)
+    assert [plain.generate(max_length=3) for _ in range(20)] == texts
+
+def test_concurrent_generate_calls_record_every_sample():
+    from concurrent.futures import ThreadPoolExecutor
+
+    sentences = prepare_ngrams(pd.DataFrame({'text': TEXTS}), 'text', min_count=1)['tokens'].tolist()
+    seen = []
+    metrics = Metrics(callback=lambda event: seen.append(model.metrics is metrics))
+    model = TrigramModel(metrics=metrics)
+    model.fit(sentences)
+    seen.clear()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: model.generate(max_length=3), range(400)))
+    # The model's metrics object is never swapped out while a call runs
+    assert all(seen)
+    assert metrics.counters['generate.samples'] == 400
+    assert metrics.stages['generate']['calls'] == 400
+
+def test_dead_end_is_detected():
+    metrics = Metrics()
+    model = TrigramModel(metrics=metrics)
+    # The context ('b', 'c') never continues: no </s> was added
+    model.fit([['<s>', '<s>', 'a', 'b', 'c']])
+    assert model.generate() == 'a b c'
+    assert metrics.counters['generate.dead_ends'] == 1
+    assert metrics.counters['generate.lookups'] == 4
+    assert metrics.summary()['generate'] == {'hit_rate': 0.75, 'dead_end_rate': 1.0}
+
+def test_generate_batch_counters():
+    metrics = Metrics()
+    model = TrigramModel(backend='compact', metrics=metrics)
+    model.fit([['<s>', '<s>', 'a', 'b', 'c'], ['<s>', '<s>', 'a', 'b', '</s>']])
+    texts = model.generate_batch(50, max_length=10, seed=1)
+    counters = metrics.counters
+    assert counters['generate.samples'] == 50
+    assert counters['generate.dead_ends'] == texts.count('a b c')
+    assert counters['generate.eos'] == texts.count('a b')
+    assert metrics.summary()['stages']['generate']['tokens'] == sum(len(t.split()) for t in texts)
+
+def test_logging_callback(caplog):
+    metrics = Metrics(callback=logging_callback())
+    with caplog.at_level(logging.INFO, logger='ngram.metrics'):
+        with metrics.stage('count', tokens=10):
+            pass
+        metrics.gauge('model.contexts', 3)
+    assert 'stage stage=count' in caplog.text
+    assert 'gauge name=model.contexts value=3' in caplog.text
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from src.ngram_model import TrigramModel
+from src.model_io import FORMAT_VERSION, MAGIC
+
+SENTENCES = [
+    ['<s>', '<s>', 'the', 'cat', 'sat', '</s>'],
+    ['<s>', '<s>', 'the', 'cat', 'ran', '</s>'],
+    ['<s>', '<s>', 'a', 'dög', 'sat', 'down', '</s>'],
+]
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load_roundtrip(tmp_path, backend, mmap):
+    model = TrigramModel(backend=backend)
+    model.fit(SENTENCES)
+    path = tmp_path / 'model.bin'
+    model.save(path)
+
+    loaded = TrigramModel.load(path, mmap=mmap)
+    assert loaded.is_frozen
+    assert loaded.num_contexts == model.num_contexts
+    model.freeze()
+    assert loaded.vocab.id_to_token == model.tables.vocab.id_to_token
+    for name in ('context_keys', 'offsets', 'successors', 'counts'):
+        assert np.array_equal(getattr(loaded.store, name), getattr(model.tables.store, name))
+    assert loaded.generate_batch(20, seed=7) == model.generate_batch(20, seed=7)
+
+def test_loaded_model_can_keep_training(tmp_path):
+    model = TrigramModel(backend='compact')
+    model.fit(SENTENCES)
+    model.save(tmp_path / 'model.bin')
+    loaded = TrigramModel.load(tmp_path / 'model.bin')
+    loaded.fit(SENTENCES)
+    assert loaded.store.counts.sum() == 2 * model.store.counts.sum()
+
+def test_save_empty_model_and_reject_bad_files(tmp_path):
+    TrigramModel(backend='compact').save(tmp_path / 'empty.bin')
+    assert TrigramModel.load(tmp_path / 'empty.bin').generate() == ''
+
+    (tmp_path / 'bad.bin').write_bytes(b'not a model at all')
+    with pytest.raises(ValueError):
+        TrigramModel.load(tmp_path / 'bad.bin')
+
+    data = bytearray((tmp_path / 'empty.bin').read_bytes())
+    assert data.startswith(MAGIC)
+    data[8:12] = (FORMAT_VERSION + 1).to_bytes(4, 'little')
+    (tmp_path / 'future.bin').write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        TrigramModel.load(tmp_path / 'future.bin')
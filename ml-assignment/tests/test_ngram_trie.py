@@ -0,0 +1,81 @@
+import random
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+from src.ngram_model import NGramModel, TrigramModel
+from src.ngram_trie import NGramTrie
+from data.data_preprocessing import prepare_ngrams
+
+TEXTS = [
+    "the cat sat on the mat",
+    "the dog sat on the log",
+    "a cat ran to the dog",
+    "the cat sat down",
+]
+
+def padded(n):
+    return prepare_ngrams(pd.DataFrame({'text': TEXTS}), 'text', n=n, min_count=1)['tokens'].tolist()
+
+def kgram_counts(sentences, k):
+    return Counter(tuple(s[i:i + k]) for s in sentences for i in range(len(s) - k + 1))
+
+@pytest.mark.parametrize('n', [1, 2, 3, 4])
+def test_trie_counts_every_order(n):
+    sentences = padded(n)
+    model = NGramModel(n)
+    model.fit(sentences)
+    for k in range(1, n + 1):
+        expected = kgram_counts(sentences, k)
+        assert model.trie.num_nodes(k) == len(expected)
+        assert all(model.count(gram) == count for gram, count in expected.items())
+        # Successors of every (k-1)-word context, read from the same trie
+        for context in {gram[:-1] for gram in expected}:
+            assert model.successors(context) == Counter(
+                {gram[-1]: count for gram, count in expected.items() if gram[:-1] == context})
+    assert model.count(('never',)) == 0
+    if n > 1:
+        assert model.successors(('never',) * (n - 1)) == Counter()
+
+def test_order_three_matches_trigram_model():
+    sentences = padded(3)
+    trigram = TrigramModel()
+    trigram.fit(sentences)
+    model = NGramModel(3)
+    model.fit(sentences)
+    assert model.num_contexts == trigram.num_contexts
+    for context, successors in trigram.model.items():
+        assert model.successors(context) == successors
+
+def test_find_batch_matches_find():
+    ids = np.array([0, 0, 3, 4, 5, 1, 0, 0, 3, 5, 1])
+    trie = NGramTrie.from_sentences(3, ids, [0, 6, 11])
+    contexts = np.array([[0, 0], [0, 3], [3, 4], [3, 5], [4, 3], [9, 9]])
+    assert trie.find_batch(contexts).tolist() == [trie.find(c) for c in contexts]
+    assert trie.find([4, 3]) == -1
+
+def test_generate_and_backoff():
+    model = NGramModel(3)
+    # ('b', 'c') never continues: without backoff generation stops there
+    model.fit([['<s>', '<s>', 'a', 'b', 'c'], ['<s>', '<s>', 'c', 'd', '</s>']])
+    random.seed(0)
+    assert model.generate() in ('a b c', 'c d')
+    random.seed(0)
+    texts = {model.generate(max_length=6, backoff=True) for _ in range(30)}
+    # Backing off from ('b', 'c') to ('c',) continues with 'd'
+    assert any(text.startswith('a b c d') for text in texts)
+    assert all('<s>' not in text.split() for text in texts)
+
+def test_unfitted_model_is_empty():
+    model = NGramModel(3)
+    assert model.generate() == '' and model.generate(backoff=True) == ''
+    assert model.successors(('<s>', '<s>')) == Counter() and model.successors(()) == Counter()
+    assert model.count(('<s>',)) == 0 and model.num_contexts == 0
+
+def test_invalid_order():
+    with pytest.raises(ValueError):
+        NGramModel(0)
+    model = NGramModel(2)
+    model.fit(padded(2))
+    with pytest.raises(ValueError):
+        model.successors(('the', 'cat'))
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from src.ngram_model import TrigramModel
+
+SENTENCES = [
+    ['<s>', '<s>', 'the', 'cat', 'sat', '</s>'],
+    ['<s>', '<s>', 'the', 'cat', 'ran', '</s>'],
+    ['<s>', '<s>', 'a', 'dog', 'sat', 'down', '</s>'],
+    ['<s>', '<s>', 'the', 'dog', 'ran', '</s>'],
+    ['<s>', '<s>', 'a', 'cat', 'sat', 'down', '</s>'],
+] * 3
+
+@pytest.mark.parametrize('n_jobs', [2, 3])
+def test_parallel_dict_fit_is_identical(n_jobs):
+    serial = TrigramModel()
+    serial.fit(SENTENCES)
+    parallel = TrigramModel()
+    parallel.fit(SENTENCES, n_jobs=n_jobs)
+    # Same counts *and* same insertion order (which drives sampling order)
+    assert [(c, list(s.items())) for c, s in serial.model.items()] == \
+           [(c, list(s.items())) for c, s in parallel.model.items()]
+
+@pytest.mark.parametrize('n_jobs', [2, 3])
+def test_parallel_compact_fit_is_identical(n_jobs):
+    serial = TrigramModel(backend='compact')
+    serial.fit(SENTENCES)
+    parallel = TrigramModel(backend='compact')
+    parallel.fit(SENTENCES, n_jobs=n_jobs)
+    assert serial.vocab.id_to_token == parallel.vocab.id_to_token
+    for name in ('context_keys', 'offsets', 'successors', 'counts'):
+        a, b = getattr(serial.store, name), getattr(parallel.store, name)
+        assert a.dtype == b.dtype and np.array_equal(a, b)
+
+def test_parallel_fit_on_empty_input():
+    model = TrigramModel(backend='compact')
+    model.fit([], n_jobs=2)
+    assert model.num_contexts == 0
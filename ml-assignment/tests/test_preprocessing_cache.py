@@ -0,0 +1,71 @@
+import os
+import pandas as pd
+from data.data_preprocessing import build_training_artifacts, preprocess_dataframe, prepare_ngrams
+from data.preprocessing_cache import PreprocessingCache, split_chunks
+
+LINES = [f"Line {i}: the cat sat on mat number {i % 7}, see http://x.org/{i}" for i in range(3000)]
+
+def test_split_chunks_is_lossless_and_local():
+    data = "\n".join(LINES).encode()
+    chunks = split_chunks(data)
+    assert b"".join(chunks) == data and len(chunks) > 3
+    assert all(chunk.endswith(b"\n") for chunk in chunks[:-1])
+
+    # Inserting a line only changes the chunk it lands in
+    edited = "\n".join(LINES[:1500] + ["something new"] + LINES[1500:]).encode()
+    assert len(set(split_chunks(edited)) - set(chunks)) == 1
+
+def test_only_changed_chunks_are_cleaned(tmp_path):
+    cache = PreprocessingCache(str(tmp_path))
+    cleaned = []
+
+    def clean(text):
+        cleaned.append(text)
+        return [line.upper() for line in text.splitlines()]
+
+    chunks = split_chunks("\n".join(LINES).encode())
+    first = cache.clean_chunks(chunks, clean, {'version': 1})
+    assert first == [line.upper() for line in LINES] and len(cleaned) == len(chunks)
+
+    edited = split_chunks("\n".join(LINES[:1500] + [""] + LINES[1500:]).encode())
+    second = cache.clean_chunks(edited, clean, {'version': 1})
+    assert second == [line.upper() for line in LINES[:1500] + [""] + LINES[1500:]]
+    assert (cache.chunks_cleaned, cache.chunks_reused) == (1, len(edited) - 1)
+
+    # Other cleaning options never reuse chunks
+    cache.clean_chunks(chunks, clean, {'version': 2})
+    assert cache.chunks_reused == 0
+
+def test_artifacts_match_pipeline_and_are_reused(tmp_path):
+    source = tmp_path / 'corpus.txt'
+    source.write_text("\n".join(LINES) + "\n\n", encoding='utf-8')
+    out = str(tmp_path / 'interim')
+
+    assert build_training_artifacts(str(source), out) == 'built'
+    df = preprocess_dataframe(pd.DataFrame(LINES, columns=['text']), 'text')
+    expected = prepare_ngrams(df, 'text', n=3)
+    assert pd.read_csv(os.path.join(out, 'processed.csv'))['text'].tolist() == df['text'].tolist()
+    with open(os.path.join(out, 'training_data.csv'), encoding='utf-8') as f:
+        assert f.read() == expected.to_csv(index=False)
+
+    assert build_training_artifacts(str(source), out) == 'up to date'
+    assert build_training_artifacts(str(source), out, n=4) == 'built'
+    assert build_training_artifacts(str(source), out) == 'cached'
+
+def test_eviction_keeps_newest_entry_under_cap(tmp_path):
+    cache = PreprocessingCache(str(tmp_path), max_bytes=1500)
+
+    def writer(size):
+        def write(directory):
+            with open(os.path.join(directory, 'blob'), 'wb') as f:
+                f.write(b'x' * size)
+        return write
+
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, writer(1000))
+        os.utime(os.path.join(cache.entry_dir, key), (i, i))
+    assert sorted(os.listdir(cache.entry_dir)) == ['c']
+    assert cache.size() <= 1500
+    # An entry larger than the cap is still kept until something newer arrives
+    cache.put('d', writer(5000))
+    assert sorted(os.listdir(cache.entry_dir)) == ['d']
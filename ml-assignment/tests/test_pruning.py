@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+from src.ngram_model import TrigramModel
+from src.count_store import CompactTrigramStore
+from data.data_preprocessing import prepare_ngrams
+
+TEXTS = [
+    "the cat sat on the mat",
+    "the cat sat on the log",
+    "the cat ran to the dog",
+    "the dog sat on the mat",
+    "a dog sat down",
+]
+
+SENTENCES = prepare_ngrams(pd.DataFrame({'text': TEXTS}), 'text', n=3, min_count=1)['tokens'].tolist()
+
+def trained(backend, **kwargs):
+    model = TrigramModel(backend=backend, **kwargs)
+    model.fit(SENTENCES)
+    return model
+
+def counts_of(model):
+    model.freeze()
+    tables = model.tables
+    decode = tables.vocab.id_to_token
+    return {(decode[a], decode[b], decode[c]): n
+            for a, b, c, n in zip(*(col.tolist() for col in tables.store.triples()))}
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+def test_min_count_pruning_reports_what_was_removed(backend):
+    model = trained(backend)
+    full = counts_of(model)
+    report = model.prune(min_count=2)
+
+    kept = {key: n for key, n in full.items() if n >= 2}
+    assert counts_of(model) == kept
+    assert report['trigrams_removed'] == len(full) - len(kept)
+    assert report['contexts_removed'] == (len({key[:2] for key in full}) - len({key[:2] for key in kept}))
+    assert report['bytes_after'] < report['bytes_before']
+    assert model.pruning_log == [report]
+
+def test_sampling_does_not_change_the_dict_model():
+    model = TrigramModel(backend='dict')
+    # ('b', 'c') never continues, so every sample ends in that dead end
+    model.fit([['<s>', '<s>', 'a', 'b', 'c']] * 2 + [['<s>', '<s>', 'a', 'd', '</s>']])
+    model.prune(min_count=2)
+    contexts, footprint = model.num_contexts, model.memory_footprint()
+    assert {model.generate() for _ in range(5)} == {'a b c'}
+    assert model.num_contexts == contexts and model.memory_footprint() == footprint
+    assert model.prune(min_count=2)['contexts_removed'] == 0
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+def test_top_k_keeps_most_frequent_successors(backend):
+    model = trained(backend)
+    model.prune(top_k=1)
+    counts = counts_of(model)
+    # ('cat', 'sat') is followed by 'on' twice; ('on', 'the') has 'mat' twice, 'log' once
+    assert counts[('cat', 'sat', 'on')] == 2
+    assert counts[('on', 'the', 'mat')] == 2
+    assert ('on', 'the', 'log') not in counts
+    contexts = [key[:2] for key in counts]
+    assert len(contexts) == len(set(contexts))
+
+def test_store_prune_to_size_keeps_most_frequent():
+    w1 = [0, 0, 0, 3, 3]
+    w2 = [0, 0, 0, 4, 4]
+    w3 = [3, 4, 5, 5, 6]
+    store = CompactTrigramStore.from_triples(w1, w2, w3, [5, 1, 4, 1, 3])
+    small = store.prune_to_size(store.nbytes - 1)
+    assert small.nbytes < store.nbytes
+    # Only one of the two trigrams seen once was dropped
+    assert small.num_trigrams == 4
+    assert int(small.counts.sum()) == 13
+    assert store.prune_to_size(store.nbytes) is store
+
+def test_memory_cap_is_enforced_during_training():
+    full = trained('compact')
+    cap = full.store.nbytes // 2
+    capped = trained('compact', max_bytes=cap)
+    assert capped.store.nbytes <= cap
+    assert capped.pruning_log and capped.pruning_log[-1]['policy'].endswith(f"max_bytes={cap}")
+    assert len(capped.generate(max_length=10).split()) <= 10
+
+def test_memory_cap_requires_compact_backend():
+    with pytest.raises(ValueError):
+        TrigramModel(backend='dict', max_bytes=1024)
+
+def test_memory_footprint_shrinks_with_compact_backend():
+    assert trained('compact').memory_footprint() < trained('dict').memory_footprint()
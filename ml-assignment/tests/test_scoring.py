@@ -0,0 +1,83 @@
+import math
+from collections import Counter
+import numpy as np
+import pytest
+from src.ngram_model import TrigramModel
+
+SENTENCES = [
+    ['<s>', '<s>', 'the', 'cat', 'sat', '</s>'],
+    ['<s>', '<s>', 'the', 'cat', 'ran', '</s>'],
+    ['<s>', '<s>', 'the', 'dog', 'sat', 'down', '</s>'],
+    ['<s>', '<s>', 'a', 'dog', 'ran', '</s>'],
+    ['<s>', '<s>', 'a', 'cat', 'sat', 'down', '</s>'],
+    ['<s>', '<s>', '<UNK>', 'sat', '</s>'],
+]
+
+def reference_kn(sentences, vocab, d1, d2, d3):
+    """Straightforward dictionary implementation of the same interpolated Kneser-Ney."""
+    tri = Counter(tuple(s[i:i + 3]) for s in sentences for i in range(len(s) - 2))
+    ctx_total, ctx_types = Counter(), Counter()
+    for (a, b, c), n in tri.items():
+        ctx_total[a, b] += n
+        ctx_types[a, b] += 1
+    cont2 = Counter((b, c) for (a, b, c) in tri)
+    w2_total, w2_types = Counter(), Counter()
+    for (b, c), n in cont2.items():
+        w2_total[b] += n
+        w2_types[b] += 1
+    cont1 = Counter(c for (b, c) in cont2)
+    n_bigrams = len(cont2)
+    predictable = [w for w in vocab if w != '<s>']
+
+    def p1(w):
+        return (max(cont1[w] - d1, 0) + d1 * len(cont1) / len(predictable)) / n_bigrams
+
+    def p2(b, c):
+        if not w2_total[b]:
+            return p1(c)
+        return max(cont2[b, c] - d2, 0) / w2_total[b] + d2 * w2_types[b] / w2_total[b] * p1(c)
+
+    def p3(a, b, c):
+        if not ctx_total[a, b]:
+            return p2(b, c)
+        return (max(tri[a, b, c] - d3, 0) / ctx_total[a, b]
+                + d3 * ctx_types[a, b] / ctx_total[a, b] * p2(b, c))
+    return p3
+
+@pytest.fixture
+def model():
+    model = TrigramModel(backend='compact')
+    model.fit(SENTENCES)
+    return model
+
+def test_scores_match_reference_implementation(model):
+    scoring = model._scoring_tables()
+    p3 = reference_kn(SENTENCES, model.vocab.id_to_token, scoring.d1, scoring.d2, scoring.d3)
+    for sentence in ['the cat sat down', 'a dog sat', 'the cat ran away', 'zebra', '']:
+        tokens = ['<s>', '<s>'] + [w if w in model.vocab else '<UNK>' for w in sentence.split()] + ['</s>']
+        expected = sum(math.log(p3(*tokens[i:i + 3])) for i in range(len(tokens) - 2))
+        assert model.logprob(sentence) == pytest.approx(expected)
+
+def test_distribution_sums_to_one(model):
+    scoring = model._scoring_tables()
+    vocab = model.vocab
+    words = np.arange(1, len(vocab))  # everything except <s>
+    for context in [('<s>', '<s>'), ('the', 'cat'), ('cat', 'sat'), ('dog', 'down'), ('zzz', 'the')]:
+        ids = [vocab.token_to_id.get(w, 2) for w in context]
+        p = scoring.probability(np.full(len(words), ids[0]), np.full(len(words), ids[1]), words)
+        assert p.sum() == pytest.approx(1.0)
+        assert (p > 0).all()
+
+def test_batch_perplexity_and_backends_agree(model):
+    dict_model = TrigramModel()
+    dict_model.fit(SENTENCES)
+    texts = ['the cat sat', ['<s>', '<s>', 'a', 'dog', 'ran', '</s>'], 'unknown words here']
+    batch = model.score_batch(texts)
+    assert batch.shape == (3,)
+    assert np.allclose(batch, [model.logprob(t) for t in texts])
+    assert np.allclose(batch, dict_model.score_batch(texts))
+    # Seen text is more likely than gibberish
+    assert model.perplexity(['the cat sat']) < model.perplexity(['sat the down cat'])
+    # 4 + 4 + 4 predicted tokens (each word plus </s>)
+    expected = math.exp(-batch.sum() / 12)
+    assert model.perplexity(texts) == pytest.approx(expected)
@@ -0,0 +1,132 @@
+import asyncio
+import socket
+import numpy as np
+import pytest
+from src.ngram_model import TrigramModel
+from src.server import GenerationServer, open_listening_socket, request
+
+SENTENCES = [
+    ['<s>', '<s>', 'the', 'cat', 'sat', '</s>'],
+    ['<s>', '<s>', 'the', 'dog', 'sat', 'down', '</s>'],
+    ['<s>', '<s>', 'a', 'cat', 'ran', '</s>'],
+]
+
+def trained():
+    model = TrigramModel(backend='compact')
+    model.fit(SENTENCES)
+    return model
+
+def connect(sock):
+    """Opens a client connection to a listening socket."""
+    if sock.family == getattr(socket, 'AF_UNIX', None):
+        return asyncio.open_unix_connection(sock.getsockname())
+    return asyncio.open_connection(*sock.getsockname())
+
+async def serving(server, sock, client):
+    """Runs `client(reader, writer)` against `server` listening on `sock`."""
+    task = asyncio.get_running_loop().create_task(server.serve(sock))
+    try:
+        reader, writer = await connect(sock)
+        try:
+            return await client(reader, writer)
+        finally:
+            writer.close()
+    finally:
+        task.cancel()
+
+def test_generate_score_and_stats():
+    model = trained()
+    server = GenerationServer(model)
+
+    async def client(reader, writer):
+        generated = await request(reader, writer, 'POST', '/generate', {'n': 3, 'max_length': 2})
+        scored = await request(reader, writer, 'POST', '/score', {'sentences': ['the cat sat', 'a dog']})
+        missing = await request(reader, writer, 'GET', '/nowhere')
+        invalid = await request(reader, writer, 'POST', '/generate', {'n': 0})
+        stats = await request(reader, writer, 'GET', '/stats')
+        return generated, scored, missing, invalid, stats
+
+    generated, scored, missing, invalid, stats = asyncio.run(
+        serving(server, open_listening_socket(port=0), client))
+
+    status, response = generated
+    assert status == 200 and len(response['texts']) == 3
+    assert all(len(text.split()) <= 2 for text in response['texts'])
+
+    status, response = scored
+    assert status == 200
+    assert np.allclose(response['logprobs'], model.score_batch(['the cat sat', 'a dog']))
+    assert response['tokens'] == [4, 3]
+
+    assert missing[0] == 404 and invalid[0] == 400
+    status, response = stats
+    assert response['requests'] == 4
+    assert response['queue_depth'] == {'generate': 0, 'score': 0}
+    assert set(response['latency_ms']) == {'p50', 'p90', 'p99'}
+
+def test_invalid_payloads_are_rejected():
+    server = GenerationServer(trained(), max_request_words=1000)
+    payloads = [
+        ('/generate', []), ('/generate', "x"), ('/score', [1]),
+        ('/generate', {'n': 1e12}), ('/generate', {'n': 10 ** 12}), ('/generate', {'n': 2, 'max_length': 501}),
+        ('/generate', {'n': "3"}), ('/generate', {'max_length': True}),
+    ]
+
+    async def client(reader, writer):
+        responses = [await request(reader, writer, 'POST', path, payload) for path, payload in payloads]
+        # The connection and the batcher still serve valid requests
+        responses.append(await request(reader, writer, 'POST', '/generate', {'n': 2, 'max_length': 500}))
+        return responses
+
+    responses = asyncio.run(serving(server, open_listening_socket(port=0), client))
+    assert [status for status, _ in responses[:-1]] == [400] * len(payloads)
+    assert 'at most 1000' in responses[5][1]['error']
+    assert responses[-1][0] == 200 and len(responses[-1][1]['texts']) == 2
+
+def test_concurrent_requests_are_coalesced():
+    server = GenerationServer(trained(), max_batch=256, max_wait_ms=50)
+    sock = open_listening_socket(port=0)
+
+    async def client(reader, writer):
+        connections = [await connect(sock) for _ in range(8)]
+        try:
+            return await asyncio.gather(*(request(r, w, 'POST', '/generate', {'n': 2, 'max_length': 5})
+                                          for r, w in connections))
+        finally:
+            for _, w in connections:
+                w.close()
+
+    responses = asyncio.run(serving(server, sock, client))
+    assert all(status == 200 and len(response['texts']) == 2 for status, response in responses)
+    # 8 requests arriving within the wait window share far fewer sampling calls
+    assert server.generate_batcher.batches < 8
+    assert server.generate_batcher.batched_items == 16
+
+def test_bad_score_request_does_not_fail_its_batch():
+    server = GenerationServer(trained(), max_batch=256, max_wait_ms=50)
+    sock = open_listening_socket(port=0)
+    payloads = [{'sentences': [[['x']]]}, {'sentences': ['a b']}, {'sentences': [['the', 1]]}, {'sentences': [['the', 'cat']]}]
+
+    async def client(reader, writer):
+        connections = [await connect(sock) for _ in payloads]
+        try:
+            return await asyncio.gather(*(request(r, w, 'POST', '/score', payload)
+                                          for (r, w), payload in zip(connections, payloads)))
+        finally:
+            for _, w in connections:
+                w.close()
+
+    responses = asyncio.run(serving(server, sock, client))
+    assert [status for status, _ in responses] == [400, 200, 400, 200]
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="needs Unix sockets")
+def test_unix_socket_with_loaded_model(tmp_path):
+    path = str(tmp_path / 'model.bin')
+    trained().save(path)
+    server = GenerationServer(TrigramModel.load(path, mmap=True))
+
+    async def client(reader, writer):
+        return await request(reader, writer, 'POST', '/generate', {'n': 1})
+
+    status, response = asyncio.run(serving(server, open_listening_socket(unix_path=str(tmp_path / 's.sock')), client))
+    assert status == 200 and len(response['texts']) == 1
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.ngram_model import TrigramModel
+from data.data_preprocessing import (
+    preprocess_dataframe, prepare_ngrams, stream_training_sentences,
+)
+
+TEXT = """The cat sat on the mat.
+Visit https://example.com for 2 more cats!
+
+The dog sat on the log; the cat ran.
+A dog, a cat, and the mat.
+"""
+
+def write_corpus(tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    return path
+
+def test_stream_matches_dataframe_pipeline(tmp_path):
+    path = write_corpus(tmp_path)
+    lines = [line.strip() for line in TEXT.splitlines() if line.strip()]
+    df = preprocess_dataframe(pd.DataFrame(lines, columns=["text"]), "text")
+    expected = prepare_ngrams(df, "text", n=3)["tokens"].tolist()
+    assert list(stream_training_sentences(path, n=3)) == expected
+
+@pytest.mark.parametrize("backend", ["dict", "compact"])
+def test_fit_stream_matches_fit(tmp_path, backend):
+    path = write_corpus(tmp_path)
+    sentences = list(stream_training_sentences(path))
+    model = TrigramModel(backend=backend)
+    model.fit(sentences)
+    streamed = TrigramModel(backend=backend)
+    # A tiny chunk size exercises the chunk merging
+    streamed.fit_stream(stream_training_sentences(path), chunk_size=1)
+    if backend == "dict":
+        assert streamed.model == model.model
+    else:
+        for name in ("context_keys", "offsets", "successors", "counts"):
+            assert np.array_equal(getattr(streamed.store, name), getattr(model.store, name))
@@ -0,0 +1,85 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+from src.ngram_model import TrigramModel, load_training_data
+from src.count_store import flat_trigrams, sentence_trigrams
+from data.token_corpus import TokenCorpus, save_token_corpus, load_token_corpus
+from data.data_preprocessing import encode_ngrams, prepare_ngrams
+
+SENTENCES = [
+    ['<s>', '<s>', 'the', 'cat', 'sat', '</s>'],
+    ['<s>', '<s>', '</s>'],
+    ['<s>', '<s>', 'a', 'dog', 'sat', 'down', '</s>'],
+    ['x'],
+    ['<s>', '<s>', 'the', '<UNK>', 'ran', '</s>'],
+]
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_token_corpus_roundtrip(tmp_path, mmap):
+    save_token_corpus(SENTENCES, tmp_path / 'corpus')
+    corpus = load_token_corpus(tmp_path / 'corpus', mmap=mmap)
+    assert len(corpus) == len(SENTENCES)
+    assert list(corpus) == SENTENCES
+    assert corpus[2] == SENTENCES[2]
+    assert corpus.tokens.dtype == np.int32
+    assert isinstance(corpus.tokens, np.memmap) == mmap
+
+def test_flat_trigrams_match_per_sentence():
+    corpus = TokenCorpus.from_sentences(SENTENCES)
+    per_sentence = [corpus.sentence_ids(i) for i in range(len(corpus))]
+    for a, b in zip(flat_trigrams(corpus.tokens, corpus.offsets), sentence_trigrams(per_sentence)):
+        assert np.array_equal(a, b)
+
+@pytest.mark.parametrize('backend', ['dict', 'compact'])
+def test_fit_from_token_corpus(tmp_path, backend):
+    save_token_corpus(SENTENCES, tmp_path / 'corpus')
+    from_lists = TrigramModel(backend=backend)
+    from_lists.fit(SENTENCES)
+    from_corpus = TrigramModel(backend=backend)
+    from_corpus.fit(load_token_corpus(tmp_path / 'corpus'))
+    if backend == 'dict':
+        assert from_corpus.model == from_lists.model
+    else:
+        assert from_corpus.vocab.id_to_token == from_lists.vocab.id_to_token
+        for name in ('context_keys', 'offsets', 'successors', 'counts'):
+            assert np.array_equal(getattr(from_corpus.store, name), getattr(from_lists.store, name))
+
+def test_load_training_data_prefers_token_corpus(tmp_path):
+    csv_path = tmp_path / 'training_data.csv'
+    pd.DataFrame({'tokens': SENTENCES}).to_csv(csv_path, index=False)
+    corpus_dir = tmp_path / 'training_data'
+    assert list(load_training_data(corpus_dir, csv_path)) == SENTENCES
+    save_token_corpus(SENTENCES, corpus_dir)
+    loaded = load_training_data(corpus_dir, csv_path)
+    assert isinstance(loaded, TokenCorpus)
+    assert list(loaded) == SENTENCES
+    assert load_training_data(tmp_path / 'missing', tmp_path / 'missing.csv') is None
+
+def reference_prepare_ngrams(texts, n, min_count):
+    """The original token-by-token implementation of prepare_ngrams."""
+    token_lists = [text.split() for text in texts if text.split()]
+    counts = Counter(token for tokens in token_lists for token in tokens)
+    return [['<s>'] * (n - 1) + [t if counts[t] >= min_count else '<UNK>' for t in tokens] + ['</s>']
+            for tokens in token_lists]
+
+@pytest.mark.parametrize('n, min_count', [(3, 2), (2, 1), (4, 3), (1, 2)])
+def test_encode_ngrams_matches_prepare_ngrams(n, min_count):
+    texts = ['the cat sat', '', 'a dog sat down', 'the cat ran', '<s> the <UNK> </s>', 'rare', 'the']
+    df = pd.DataFrame({'text': texts})
+    expected = reference_prepare_ngrams(texts, n, min_count)
+
+    corpus = encode_ngrams(df, 'text', n=n, min_count=min_count)
+    assert corpus.tokens.dtype == np.int32 and corpus.offsets[-1] == len(corpus.tokens)
+    assert corpus.vocab[:3] == ['<s>', '</s>', '<UNK>']
+    assert corpus.to_lists() == list(corpus) == expected
+    assert prepare_ngrams(df, 'text', n=n, min_count=min_count)['tokens'].tolist() == expected
+
+def test_fit_encoded_corpus():
+    df = pd.DataFrame({'text': ['the cat sat', 'the cat ran', 'a cat sat']})
+    from_lists = TrigramModel()
+    from_lists.fit(prepare_ngrams(df, 'text', min_count=1)['tokens'].tolist())
+    from_ids = TrigramModel(backend='compact')
+    from_ids.fit(encode_ngrams(df, 'text', min_count=1))
+    assert from_ids.num_trigrams == from_lists.num_trigrams
+    assert from_ids.logprob('the cat sat') == pytest.approx(from_lists.logprob('the cat sat'))